@@ -0,0 +1,202 @@
+"""
+Account book module (local open orders and balances, reconciled with the exchange)
+
+@Developer: Stan
+@ModuleVersion: 1.0.0
+@PythonVersion: 3.13
+
+"""
+import time
+from os import getenv
+from typing import Any, Collection, Mapping, Self
+
+
+class AccountBook:
+    """
+    Local copy of the bot's open orders and of its pair's balances.
+
+    Orders placed by the bot are added as soon as the exchange accepts them and their funds are moved from `free` to
+    `used` right away (optimistic update), so the next cycles know the account state without asking the exchange.
+    The book is reconciled with `fetch_open_orders` / `fetch_balance` every `reconcile_interval` seconds, and sooner
+    when it can't be right: open orders are fetched whenever there are any, unless fills are pushed to the book
+    (`has_fill_feed`, e.g. by a `MarketFeed` with order streams), since otherwise only the exchange knows when they
+    fill; balances after a fill or a cancel (amounts of fills and partial fills are only known to the exchange).
+    So the requests saved are open orders checks while the bot has none (or all of them with a fill feed), and
+    balance checks between placements.
+
+    Bots trading on one account (e.g. pairs sharing the quote asset under the orchestrator) share its balances, so
+    their books are linked with `share_balances`: any change of one book's balances makes the others' balances due.
+    """
+
+    def __init__(self: Self, base_asset: str, quote_asset: str, reconcile_interval: float = 300.0) -> None:
+        """
+        Initialize book (empty, due for reconciliation)
+
+        :param base_asset: e.g. `XMR`
+        :param quote_asset: e.g. `USDT`
+        :param reconcile_interval: seconds the book is trusted without the exchange (0 reconciles every cycle)
+        """
+
+        self.base_asset: str = base_asset
+        self.quote_asset: str = quote_asset
+        self.reconcile_interval: float = reconcile_interval
+        self.orders: dict[str, dict[str, Any]] = {}
+        self.balance: dict[str, dict[str, float]] | None = None
+        self.orders_reconciled_at: float | None = None
+        self.balance_reconciled_at: float | None = None
+        self.peers: list[AccountBook] = []
+        self.has_fill_feed: bool = False
+
+    @classmethod
+    def from_env(cls, base_asset: str, quote_asset: str) -> Self:
+        """
+        Book from `ACCOUNT_RECONCILE_INTERVAL` variable
+
+        :param base_asset: e.g. `XMR`
+        :param quote_asset: e.g. `USDT`
+        :return: AccountBook instance
+        """
+
+        return cls(base_asset, quote_asset, reconcile_interval=float(getenv("ACCOUNT_RECONCILE_INTERVAL") or 300))
+
+    @staticmethod
+    def share_balances(books: Collection["AccountBook"]) -> None:
+        """
+        Link books of bots trading on the same account
+
+        :param books: books sharing balances
+        :return: None
+        """
+
+        for book in books:
+            book.peers = [peer for peer in books if peer is not book]
+
+    def invalidate_balance(self: Self) -> None:
+        """
+        Make the balance due (e.g. the exchange reported insufficient funds)
+
+        :return: None
+        """
+
+        self.balance_reconciled_at = None
+
+    def invalidate_orders(self: Self) -> None:
+        """
+        Make open orders due (e.g. the fill feed had an error, fills may have been missed)
+
+        :return: None
+        """
+
+        self.orders_reconciled_at = None
+
+    def _balance_changed(self: Self, is_known: bool = False) -> None:
+        """
+        Balances moved: they are due for peers, and for this book too unless it has applied the change
+
+        :param is_known: this book's balance already reflects the change
+        :return: None
+        """
+
+        if not is_known:
+            self.invalidate_balance()
+        for peer in self.peers:
+            peer.invalidate_balance()
+
+    def _is_expired(self: Self, reconciled_at: float | None) -> bool:
+        return reconciled_at is None or time.monotonic() - reconciled_at >= self.reconcile_interval
+
+    def orders_due(self: Self) -> bool:
+        """
+        Whether open orders must be fetched from the exchange (always while there are any and their fills
+        aren't pushed, they may have filled)
+
+        :return: bool
+        """
+
+        return self._is_expired(self.orders_reconciled_at) or (bool(self.orders) and not self.has_fill_feed)
+
+    def balance_due(self: Self) -> bool:
+        return self.balance is None or self._is_expired(self.balance_reconciled_at)
+
+    def open_orders(self: Self) -> list[dict[str, Any]]:
+        return list(self.orders.values())
+
+    def reconcile_orders(self: Self, open_orders: Collection[Mapping[str, Any]]) -> None:
+        """
+        Replace local open orders with the exchange's (orders gone since are filled or cancelled,
+        so the balance is due too)
+
+        :param open_orders: ccxt orders
+        :return: None
+        """
+
+        orders: dict[str, dict[str, Any]] = {str(order.get("id")): dict(order) for order in open_orders}
+        if self.orders.keys() - orders.keys():
+            self._balance_changed()
+
+        self.orders = orders
+        self.orders_reconciled_at = time.monotonic()
+
+    def reconcile_balance(self: Self, balance: Mapping[str, Any]) -> None:
+        """
+        Replace local balances of the pair's assets with the exchange's
+
+        :param balance: ccxt balance
+        :return: None
+        """
+
+        self.balance = {
+            asset: {"free": float(balance[asset]["free"] or 0.0), "used": float(balance[asset].get("used") or 0.0)}
+            for asset in (self.base_asset, self.quote_asset)
+        }
+        self.balance_reconciled_at = time.monotonic()
+
+    def record_order(self: Self,
+                     order: Mapping[str, Any],
+                     order_type: str,
+                     side: str,
+                     amount: float,
+                     price: float) -> None:
+        """
+        Add an order accepted by the exchange and reserve its funds
+
+        :param order: ccxt order returned by `create_order` (only its `id` is required)
+        :param order_type: `limit` or `market`
+        :param side: `buy` or `sell`
+        :param amount: in base asset
+        :param price: in quote asset
+        :return: None
+        """
+
+        self.orders[str(order.get("id"))] = {
+            "type": order_type, "side": side, "amount": amount, "price": price, "status": "open",
+            **{key: value for key, value in order.items() if value is not None}
+        }
+
+        if self.balance is not None:
+            asset, reserved = (self.quote_asset, amount * price) if side == "buy" else (self.base_asset, amount)
+            self.balance[asset]["free"] -= reserved
+            self.balance[asset]["used"] += reserved
+        self._balance_changed(is_known=True)
+
+    def record_fill(self: Self, order: Mapping[str, Any]) -> None:
+        """
+        Remove a filled order (e.g. pushed by the exchange), the balance is due
+
+        :param order: ccxt order
+        :return: None
+        """
+
+        self.orders.pop(str(order.get("id")), None)
+        self._balance_changed()
+
+    def record_cancel(self: Self, order_id: str) -> None:
+        """
+        Remove a cancelled order, the balance is due (the order may have been filled partially)
+
+        :param order_id: ccxt order id
+        :return: None
+        """
+
+        self.orders.pop(str(order_id), None)
+        self._balance_changed()
@@ -0,0 +1,444 @@
+# Python default library ---------
+import asyncio
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Collection, Literal, Mapping, Self
+# --------------------------------
+
+# External modules ---------------
+import ccxt
+import ccxt.async_support as ccxt_async
+from ccxt import Exchange
+from ccxt.base.errors import InsufficientFunds, InvalidOrder
+# --------------------------------
+
+# Own modules --------------------
+from market_feed import MarketEvent, MarketFeed
+from trading_bot import TradingBot
+# --------------------------------
+
+
+class AsyncTradingBot(TradingBot):
+    """
+    Same bot logic as `TradingBot`, built on `ccxt.async_support`.
+
+    Independent exchange requests are issued concurrently, the (blocking) predictor runs in a worker thread,
+    and sleeping never blocks the event loop, so one process can drive many bots with `asyncio.gather`.
+    """
+
+    # Latest pushed (bid, ask, loop time) in event-driven mode
+    top_of_book: tuple[float, float, float] | None = None
+
+    # Pushed top of book older than this (seconds) is not used instead of `fetch_order_book`
+    TOP_OF_BOOK_MAX_AGE: float = 5.0
+
+    # Background refresh of cached markets
+    markets_task: asyncio.Task | None = None
+
+    def create_exchange(self: Self) -> Exchange:
+        """
+        Instantiate and authenticate the ccxt async exchange
+
+        :return: Exchange instance (async)
+        """
+
+        exchange: Exchange = getattr(ccxt_async, self.exchange_name)()
+        exchange.set_sandbox_mode(enabled=False)
+        exchange.apiKey = self.exchange_api_key
+        exchange.secret = self.exchange_secret
+        exchange.password = self.exchange_password
+        return exchange
+
+    async def get_open_orders(self: Self) -> Collection[Any]:
+        if self.account.orders_due():
+            self.account.reconcile_orders(
+                await self.timed_call("fetch_open_orders", self.exchange.fetch_open_orders, self.symbol)
+            )
+        else:
+            self.count("requests_saved", request="fetch_open_orders")
+        return self.account.open_orders()
+
+    async def get_balance(self: Self) -> Mapping[str, Any]:
+        if self.account.balance_due():
+            self.account.reconcile_balance(await self.timed_call("fetch_balance", self.exchange.fetch_balance))
+        else:
+            self.count("requests_saved", request="fetch_balance")
+        return self.account.balance
+
+    async def timed_call(self: Self,
+                         stage: str,
+                         function: Callable[..., Awaitable[Any]],
+                         *args: Any,
+                         retry: bool = True,
+                         is_failure: Callable[[Any], bool] | None = None,
+                         **kwargs: Any) -> Any:
+        """
+        Await a request of a stage through its circuit breaker (with retries), timed
+        (every request of an `asyncio.gather` gets its own duration)
+
+        :param stage: stage (and endpoint) name
+        :param function: coroutine function of the request
+        :param retry: retry network errors with backoff
+        :param is_failure: marks a returned result as failure
+        :return: result of the request
+        """
+
+        with self.timed(stage):
+            return await self.resilience.call_async(stage, function, *args, retry=retry, is_failure=is_failure,
+                                                    **kwargs)
+
+    async def fetch_data(self: Self) -> Any:
+        if self.candle_store:
+            return await self.timed_call("fetch_ohlcv", self.candle_store.async_sync, self.exchange,
+                                         self.data_vector_length)
+
+        return await self.timed_call("fetch_ohlcv", self.exchange.fetch_ohlcv, self.symbol, self.timeframe,
+                                     limit=self.data_vector_length)
+
+    async def order(self: Self,
+                    order_type: Literal["market", "limit"],
+                    buy_or_sell: Literal["buy", "sell"],
+                    amount: float,
+                    price: float = None) -> Mapping[str, Any]:
+        try:
+            amount, price, transaction_cost = self.check_order(buy_or_sell, amount, price)
+            order_id: Mapping[str, Any] = await self.timed_call(
+                "create_order",
+                self.exchange.create_order,
+                retry=False,
+                symbol=self.symbol,
+                type=order_type,
+                side=buy_or_sell,
+                amount=amount,
+                price=price
+            )
+
+        except (InvalidOrder, InsufficientFunds, ValueError) as error:
+            self.output_order_rejection(error)
+            return {}
+
+        return self.output_placed_order(order_id, order_type, buy_or_sell, amount, price, transaction_cost)
+
+    async def refresh_markets(self: Self) -> None:
+        """
+        Refresh expired cached markets in a background task (cycles go on with the cached ones),
+        load them before the cycle if nothing is cached
+
+        :return: None
+        """
+
+        if self.markets_cache and self.markets_cache.start_refresh(self.exchange):
+            if self.markets_cache.fetched_at is None:
+                await self.run_markets_refresh()
+            else:
+                self.markets_task = asyncio.create_task(self.run_markets_refresh())
+
+    async def run_markets_refresh(self: Self) -> None:
+        try:
+            await self.markets_cache.async_refresh(self.exchange)
+        except Exception as error:
+            self.user_output(f"\t[WARNING]\tCould not refresh markets:\n\t\t{error}.\n")
+
+    async def prepare_order(self: Self) -> tuple[float | None, float | None, float | None, float | None]:
+        """
+        Balance and order book are requested concurrently
+
+        :return: (price_buy, price_sell, amount_buy, amount_sell) or tuple of Nones
+        """
+
+        self.user_output("\n\t[INFO]\tFetch the current info for the symbol.")
+
+        # Fresh pushed top of book saves the order book request
+        if self.top_of_book and asyncio.get_running_loop().time() - self.top_of_book[2] <= self.TOP_OF_BOOK_MAX_AGE:
+            balance: Any = await self.get_balance()
+            orderbook: Any = {"bids": [[self.top_of_book[0]]], "asks": [[self.top_of_book[1]]]}
+
+        else:
+            balance, orderbook = await asyncio.gather(
+                self.get_balance(),
+                self.timed_call("fetch_order_book", self.exchange.fetch_order_book, symbol=self.symbol),
+                return_exceptions=True
+            )
+
+        # Balance errors are handled by `main`, same as in the sync bot
+        if isinstance(balance, BaseException):
+            raise balance
+
+        try:
+            if isinstance(orderbook, BaseException):
+                raise orderbook
+            bid, ask = self.best_bid_ask(orderbook)
+
+        except Exception as error:
+            self.user_output(f"\t[WARNING]\t...Retrying because of some error:\n\t\t{error}.\n")
+            await self.self_sleep()
+            return None, None, None, None
+
+        return self.quote_order(balance, bid, ask)
+
+    async def run_if_open_orders(self: Self, open_orders: Collection[Any]) -> bool:
+        """
+        Cancel all open orders (in one request or concurrently) on achieving Limit value.
+
+        :param open_orders:
+        :return: bool, if the while cycle of orders should be skipped to the next iteration
+        """
+
+        if self.is_cancel_due():
+            results: dict[str, BaseException | None] = await self.cancel_orders(
+                [order.get("id") for order in open_orders], is_all=True
+            )
+            self.output_cancel_results(results)
+            return True
+
+        return False
+
+    async def cancel_orders(self: Self,
+                            order_ids: Collection[str],
+                            is_all: bool = False) -> dict[str, BaseException | None]:
+        """
+        Same as `TradingBot.cancel_orders`: one bulk request where the exchange has one, or concurrent
+        `cancel_order` requests on the event loop
+
+        :param order_ids: ccxt order ids
+        :param is_all: `order_ids` are all open orders of the pair
+        :return: order id -> None if cancelled, else the error
+        """
+
+        if not order_ids:
+            return {}
+
+        endpoint: str | None = self.bulk_cancel_endpoint(is_all)
+        if endpoint is None:
+            answers: list[Any] = await asyncio.gather(*(
+                self.timed_call("cancel_order", self.exchange.cancel_order, id=order_id, symbol=self.symbol)
+                for order_id in order_ids
+            ), return_exceptions=True)
+            return {
+                order_id: answer if isinstance(answer, BaseException) else None
+                for order_id, answer in zip(order_ids, answers)
+            }
+
+        args: tuple[Any, ...] = (self.symbol,) if endpoint == "cancel_all_orders" else (list(order_ids), self.symbol)
+        try:
+            await self.timed_call(endpoint, getattr(self.exchange, endpoint), *args)
+        except Exception as error:
+            return dict.fromkeys(order_ids, error)
+        return dict.fromkeys(order_ids)
+
+    async def run_if_not_open_orders(self: Self) -> bool:
+        """
+        Try to make new orders, if there aren't any.
+
+        :return: if the while cycle of orders should be skipped to the next iteration
+        """
+
+        self.user_output("\t[INFO]\t🟢 No open orders.")
+        self.cancel_order_counter = 0
+
+        data: Any = await self.fetch_data()
+        self.user_output("\t[INFO]\t📊 Got data: "
+                         f"({self.data_vector_length} x {self.timeframe}).")
+
+        try:
+            # Predictors are blocking (HTTP or CPU), keep them off the event loop
+            prediction_main: Any = await self.timed_call("predict", asyncio.to_thread, self.predict_up_or_down, data,
+                                                         retry=False, is_failure=lambda prediction: not prediction)
+            side: Literal["buy", "sell", "hold"] | None = self.order_side(prediction_main)
+            if side is None:
+                await self.self_sleep()
+                return True
+
+            if side != "hold":
+                price_buy, price_sell, amount_buy, amount_sell = await self.prepare_order()
+                if amount_buy is None:
+                    return True
+
+                new_order: Mapping[str, Any] = await self.order(
+                    order_type="limit",
+                    buy_or_sell=side,
+                    amount=amount_buy if side == "buy" else amount_sell,
+                    price=price_buy if side == "buy" else price_sell
+                )
+                if new_order:
+                    self.user_output(f"\t[ORDER]\t{side.capitalize()} order id: {new_order.get("id")}")
+
+        except Exception as error:
+            self.default_sleep_message(error, "ProbablyAIButCouldBeAnything")
+            await self.self_sleep()
+            return True
+
+        return False
+
+    def output_start_message(self: Self) -> None:
+        self.user_output(f"\t[INFO]\t🏦 Exchange: `{self.exchange_name}` (async).\n"
+                         "\t[INFO]\t💼 Algorithm trust percentage (reinvestment rate): "
+                         f"{self.algorithm_trust_percentage * 100}%.\n"
+                         "\t[INFO]\t📈 Algorithm premium: "
+                         f"{round(self.premium * 100, 4)}%.\n"
+                         "\t[INFO]\t📉 Lower limit: "
+                         f"{self.min_transaction_value_in_base} "
+                         f"{self.base_asset}.\n\n"
+                         f"\t[INFO]\t🚀 Started algorithm with pair `{self.symbol}`.")
+
+    async def cycle(self: Self, is_candle_closed: bool | None = None) -> bool:
+        """
+        Single iteration of the main loop (errors are reported, not raised).
+
+        :param is_candle_closed: whether the cycle follows a candle close (default: asks the scheduler)
+        :return: bool, if the bot should sleep before the next cycle
+        """
+
+        self.output_memory_monitor()
+        self.output_metrics()
+        await self.refresh_markets()
+
+        try:
+            current_time = datetime.now()
+            self.user_output(f"\n\t[INFO]\t⌚️ Current time:"
+                             f" {current_time.strftime('%B %d, %Y %I:%M:%S %p')}")
+
+            with self.timed_cycle():
+                self.has_open_orders = None
+                if is_candle_closed is None:
+                    is_candle_closed = self.scheduler.start_cycle() if self.scheduler else True
+
+                self.user_output("\t[INFO]\t👀 Checking for open orders for trading pair")
+                open_orders: Collection[Any] = await self.get_open_orders()
+                self.has_open_orders = bool(open_orders)
+                if not open_orders:
+                    return not await self.run_if_not_open_orders()
+
+                # Polls between candle closes only look for fills
+                if not is_candle_closed:
+                    return True
+
+                return not await self.run_if_open_orders(open_orders=open_orders)
+
+        except ccxt.NetworkError as error:
+            self.count("cycle_errors", error="network")
+            self.default_sleep_message(error, "NetworkError")
+
+        except ccxt.ExchangeError as error:
+            self.count("cycle_errors", error="exchange")
+            self.default_sleep_message(error, "ExchangeError")
+
+        except Exception as error:
+            self.count("cycle_errors", error="other")
+            self.default_sleep_message(error, "Some other")
+
+        return True
+
+    async def main(self: Self, infinite_loop_condition: bool) -> None:
+        """
+        Main bot cycle logic (coroutine).
+
+        :param infinite_loop_condition: bool value
+        :return: None
+        """
+
+        self.output_start_message()
+
+        try:
+            while infinite_loop_condition:
+                if await self.cycle():
+                    await self.wait_for_next_cycle()
+
+        except KeyboardInterrupt:
+            self.user_output("[END]\tEND `main` module on KeyboardInterrupt.")
+
+        # Cancellation must reach the canceller (e.g. `asyncio.run` on Ctrl+C, the orchestrator)
+        except asyncio.CancelledError:
+            self.user_output("[END]\tEND `main` module on cancellation.")
+            raise
+
+        finally:
+            await self.exchange.close()
+
+        self.user_output("[END]\t👋🏻 END `main` module.")
+
+    async def main_event_driven(self: Self, feed: MarketFeed) -> None:
+        """
+        Event-driven bot logic: a cycle runs as soon as a candle closes or an own order fills (no timer).
+        With a feed pushing fills, the account book is trusted between reconciles (open orders aren't polled).
+
+        :param feed: source of market events (e.g. WebSocketFeed, SimulatedFeed)
+        :return: None
+        """
+
+        self.output_start_message()
+        self.account.has_fill_feed = feed.has_fills
+
+        try:
+            event: MarketEvent
+            async for event in feed.events():
+                match event.kind:
+                    case "top_of_book":
+                        bid, ask = event.data
+                        self.top_of_book = (bid, ask, asyncio.get_running_loop().time())
+
+                    case "candle_closed":
+                        self.user_output(f"\n\t[INFO]\t🕯️ Candle closed ({self.timeframe}).")
+                        await self.event_cycle(is_candle_closed=True)
+
+                    case "order_filled":
+                        self.user_output(f"\t[ORDER]\tOrder filled with id: {event.data.get("id")}")
+                        self.account.record_fill(event.data)
+                        await self.event_cycle(is_candle_closed=False)
+
+                    # Fills may have been missed while the stream was down
+                    case "error":
+                        self.user_output(f"\t[WARNING]\tMarket data stream error:\n\t\t{event.data}.\n")
+                        self.account.invalidate_orders()
+
+        except KeyboardInterrupt:
+            self.user_output("[END]\tEND `main` module on KeyboardInterrupt.")
+
+        # Cancellation must reach the canceller (e.g. `asyncio.run` on Ctrl+C, the orchestrator)
+        except asyncio.CancelledError:
+            self.user_output("[END]\tEND `main` module on cancellation.")
+            raise
+
+        finally:
+            await feed.close()
+            await self.exchange.close()
+
+        self.user_output("[END]\t👋🏻 END `main` module.")
+
+    async def event_cycle(self: Self, is_candle_closed: bool) -> None:
+        """
+        Cycles for one event: repeated right away while a cycle asks to (e.g. after cancels), with a backoff after
+        a failed cycle (otherwise the next event is awaited)
+
+        :param is_candle_closed: whether the event is a candle close
+        :return: None
+        """
+
+        while not await self.cycle(is_candle_closed=is_candle_closed):
+            is_candle_closed = False
+
+        if self.has_open_orders is None:
+            await self.self_sleep()
+
+    async def wait_for_next_cycle(self: Self) -> None:
+        """
+        Invoke asyncio.sleep until the next cycle is due.
+
+        :return: None
+        """
+
+        delay: float = self.next_cycle_delay()
+        self.user_output(f"\t[INFO]\t🙈 Pause for {round(delay, 1)} seconds.")
+        await asyncio.sleep(delay)
+
+    async def self_sleep(self: Self) -> None:
+        """
+        Invoke asyncio.sleep after a failure (see `backoff_delay`).
+
+        :return: None
+        """
+
+        delay: float = self.backoff_delay()
+        self.count("sleeps")
+        self.user_output(f"\t[INFO]\t🙈 Pause for {round(delay, 3)} seconds.")
+        await asyncio.sleep(delay)
+        self.slept_seconds += delay
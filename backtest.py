@@ -0,0 +1,288 @@
+"""
+Backtesting module
+
+@Developer: Stan
+@ModuleVersion: 1.0.0
+@PythonVersion: 3.13
+
+"""
+from dataclasses import dataclass, field
+from os import getenv
+from typing import Any, Self
+
+import ccxt
+import numpy as np
+from ccxt import Exchange
+from dotenv import load_dotenv
+
+from candle_store import CandleStore
+from indicators import crossover_signals, ohlcv_columns, parse_indicator_name
+from predict import PredictionApp
+
+
+@dataclass
+class BacktestTrade:
+    """Single simulated limit order"""
+
+    side: str
+    placed_at: int
+    price: float
+    amount: float
+    filled_at: int | None = None
+    fee: float = 0.0
+
+
+@dataclass
+class BacktestResult:
+    """Outcome of a backtest run"""
+
+    initial_value: float
+    final_value: float
+    final_base: float
+    final_quote: float
+    candles: int
+    trades: list[BacktestTrade] = field(default_factory=list)
+
+    @property
+    def filled(self: Self) -> list[BacktestTrade]:
+        return [trade for trade in self.trades if trade.filled_at is not None]
+
+    @property
+    def cancelled(self: Self) -> list[BacktestTrade]:
+        return [trade for trade in self.trades if trade.filled_at is None]
+
+    @property
+    def fees(self: Self) -> float:
+        return sum(trade.fee for trade in self.trades)
+
+    @property
+    def return_percentage(self: Self) -> float:
+        return (self.final_value / self.initial_value - 1) * 100 if self.initial_value else 0.0
+
+    def summary(self: Self) -> str:
+        return (f"\t[TEST]\t{self.candles} candles, {len(self.trades)} orders "
+                f"({len(self.filled)} filled, {len(self.cancelled)} cancelled), "
+                f"fees ≈ {round(self.fees, 4)} (quote).\n"
+                f"\t[TEST]\tPortfolio value: {round(self.initial_value, 4)} -> {round(self.final_value, 4)} "
+                f"(quote), return {round(self.return_percentage, 2)}%.")
+
+
+class Backtester:
+    """
+    Replay OHLCV history through a `PredictionApp` backend and simulate `TradingBot` orders.
+
+    Pricing follows `TradingBot.prepare_order`, except that the mid-price is the candle close
+    (historical order books aren't available). A limit order fills on the first later candle
+    whose low (buy) / high (sell) reaches its price, or is cancelled after `cancel_order_limit` candles.
+    Like the bot, no new orders are placed while one is open.
+
+    PANDAS signals of supported indicators are computed over the whole history at once, so they match the `streaming`
+    engine (indicators warmed up since the first candle), not the windowed `stockstats` / `numpy` engines, which
+    restart the indicators on every `DATA_VECTOR_LENGTH` window: about 1% of their decisions differ.
+    """
+
+    def __init__(self: Self,
+                 prediction_app: PredictionApp,
+                 fee: float,
+                 premium_over_fees: float,
+                 algorithm_trust_percentage: float,
+                 data_vector_length: int,
+                 min_transaction_value_in_base: float = 0.0,
+                 cancel_order_limit: int = 3) -> None:
+        """
+        Initialize backtester
+
+        :param prediction_app: instance to take the predictor from
+        :param fee: DEFAULT_EXCHANGE_FEE
+        :param premium_over_fees: PREMIUM_OVER_EXCHANGE_FEES
+        :param algorithm_trust_percentage: ALGORITHM_TRUST_PERCENTAGE
+        :param data_vector_length: DATA_VECTOR_LENGTH
+        :param min_transaction_value_in_base: MIN_TRANSACTION_VALUE_IN_BASE
+        :param cancel_order_limit: CANCEL_ORDER_LIMIT (candles to wait before cancelling)
+        """
+
+        self.prediction_app: PredictionApp = prediction_app
+        self.fee: float = fee
+        self.premium: float = premium_over_fees + fee
+        self.algorithm_trust_percentage: float = algorithm_trust_percentage
+        self.data_vector_length: int = data_vector_length
+        self.min_transaction_value_in_base: float = min_transaction_value_in_base
+        self.cancel_order_limit: int = cancel_order_limit
+
+    @classmethod
+    def from_env(cls, prediction_app: PredictionApp, env_file_path: str | None = None) -> Self:
+        """
+        Create backtester with the same variables as `TradingBot`
+
+        :param prediction_app: instance to take the predictor from
+        :param env_file_path: main .env file
+        :return: Backtester instance
+        """
+
+        load_dotenv(dotenv_path=env_file_path or ".env")
+        return cls(
+            prediction_app=prediction_app,
+            fee=float(getenv("DEFAULT_EXCHANGE_FEE")),
+            premium_over_fees=float(getenv("PREMIUM_OVER_EXCHANGE_FEES")),
+            algorithm_trust_percentage=float(getenv("ALGORITHM_TRUST_PERCENTAGE")),
+            data_vector_length=int(getenv("DATA_VECTOR_LENGTH")),
+            min_transaction_value_in_base=float(getenv("MIN_TRANSACTION_VALUE_IN_BASE") or 0),
+            cancel_order_limit=int(getenv("CANCEL_ORDER_LIMIT")) or 3
+        )
+
+    def is_vectorized(self: Self) -> bool:
+        """
+        If the signals can be computed in a single pass over the whole history
+
+        :return: bool
+        """
+
+        if self.prediction_app.prediction_api != "PANDAS":
+            return False
+
+        try:
+            for name in (self.prediction_app.price_type_column_name, *self.prediction_app.indicators):
+                parse_indicator_name(name)
+
+        except ValueError:
+            return False
+
+        return True
+
+    def signals(self: Self, history: np.ndarray) -> np.ndarray:
+        """
+        Prediction for every candle: 1 is "up", -1 is "down", 0 is "hold".
+        First `data_vector_length - 1` candles are always 0 (not enough data for the live bot).
+        Vectorized signals are those of the `streaming` engine, whatever `PREDICTION_PANDAS_ENGINE` is (see class).
+
+        :param history: float array of shape (n, 6)
+        :return: int8 array of shape (n,)
+        """
+
+        out: np.ndarray = np.zeros(len(history), dtype=np.int8)
+
+        if self.is_vectorized():
+            # Whole series in one pass (same as the streaming engine, not the windowed ones)
+            signal_buy, signal_sell = crossover_signals(
+                columns=ohlcv_columns(history),
+                price_type_column_name=self.prediction_app.price_type_column_name,
+                indicators=sorted(self.prediction_app.indicators),
+                wait_for_n_signal_lags=self.prediction_app.wait_for_n_signal_lags
+            )
+            out[signal_buy] = 1
+            out[signal_sell] = -1
+
+        else:
+            predict = self.prediction_app.predict_up_or_down
+            codes: dict[Any, int] = {"up": 1, "down": -1}
+            for end in range(self.data_vector_length, len(history) + 1):
+                out[end - 1] = codes.get(predict(history[end - self.data_vector_length:end]), 0)
+
+        out[:self.data_vector_length - 1] = 0
+        return out
+
+    def run(self: Self,
+            history: Any,
+            initial_base: float = 0.0,
+            initial_quote: float = 1000.0,
+            signals: np.ndarray | None = None) -> BacktestResult:
+        """
+        Simulate the bot over the given history
+
+        :param history: ccxt OHLCV rows or a float array of shape (n, 6) (e.g. `CandleStore.history()`)
+        :param initial_base: starting free balance of base asset
+        :param initial_quote: starting free balance of quote asset
+        :param signals: precomputed output of `signals` (computed if not given)
+        :return: BacktestResult
+        """
+
+        history = np.asarray(history, dtype=np.float64)
+        if signals is None:
+            signals = self.signals(history)
+
+        columns: dict[str, np.ndarray] = ohlcv_columns(history)
+        close, low, high = columns["close"], columns["low"], columns["high"]
+        base, quote = initial_base, initial_quote
+        trades: list[BacktestTrade] = []
+
+        # Only candles with a decision matter, the rest are skipped
+        candidates: np.ndarray = np.flatnonzero(signals)
+        busy_until: int = -1
+        for index in candidates.tolist():
+            if index <= busy_until or index + 1 >= len(history):
+                continue
+
+            # Same formulas as `TradingBot.prepare_order`
+            if signals[index] > 0:
+                price: float = float(close[index]) * (1 - self.premium)
+                amount: float = self.algorithm_trust_percentage * quote / price
+                reached: np.ndarray = low[index + 1:index + 1 + self.cancel_order_limit] <= price
+            else:
+                price: float = float(close[index]) * (1 + self.premium)
+                amount: float = self.algorithm_trust_percentage * base
+                reached: np.ndarray = high[index + 1:index + 1 + self.cancel_order_limit] >= price
+
+            if amount <= self.min_transaction_value_in_base:
+                continue
+
+            trade: BacktestTrade = BacktestTrade(
+                side="buy" if signals[index] > 0 else "sell", placed_at=index, price=price, amount=amount
+            )
+            trades.append(trade)
+
+            if reached.any():
+                trade.filled_at = index + 1 + int(reached.argmax())
+                trade.fee = amount * price * self.fee
+                if trade.side == "buy":
+                    quote -= amount * price
+                    base += amount * (1 - self.fee)
+                else:
+                    base -= amount
+                    quote += amount * price - trade.fee
+
+                busy_until = trade.filled_at
+
+            else:
+                busy_until = index + self.cancel_order_limit
+
+        first_close: float = float(close[0]) if len(close) else 0.0
+        last_close: float = float(close[-1]) if len(close) else 0.0
+        return BacktestResult(
+            initial_value=initial_quote + initial_base * first_close,
+            final_value=quote + base * last_close,
+            final_base=base,
+            final_quote=quote,
+            candles=len(history),
+            trades=trades
+        )
+
+
+def run_backtest(prediction_app: PredictionApp,
+                 env_file_path: str | None = None,
+                 since: str | None = None) -> BacktestResult:
+    """
+    Backtest on the local candle store of the configured pair (downloading history from `since` first)
+
+    :param prediction_app: instance to take the predictor from
+    :param env_file_path: main .env file
+    :param since: ISO 8601 date to download history from (public endpoint, no API keys needed)
+    :return: BacktestResult
+    """
+
+    backtester: Backtester = Backtester.from_env(prediction_app, env_file_path)
+    exchange_name: str = getenv("DEFAULT_EXCHANGE_NAME")
+    store: CandleStore = CandleStore(
+        directory=getenv("CANDLE_STORE_DIR") or "candles",
+        exchange_name=exchange_name,
+        symbol=getenv("TRADING_PAIR"),
+        timeframe=getenv("TIMEFRAME")
+    )
+
+    if since:
+        exchange: Exchange = getattr(ccxt, exchange_name)()
+        added: int = store.backfill(exchange, since=exchange.parse8601(since))
+        print(f"\t[INFO]\t📊 Downloaded {added} candles ({store.count} stored).")
+
+    result: BacktestResult = backtester.run(store.history())
+    print(result.summary())
+    return result
@@ -0,0 +1,238 @@
+"""
+Candle store module
+
+@Developer: Stan
+@ModuleVersion: 1.0.0
+@PythonVersion: 3.13
+
+"""
+import json
+import os
+from os import PathLike
+from typing import Any, Self, Sequence
+
+import numpy as np
+from ccxt import Exchange
+
+
+class CandleStore:
+    """
+    Persistent columnar OHLCV storage for a single (exchange, symbol, timeframe).
+
+    Candles are kept in a memory-mapped float64 file of shape (capacity, 6)
+    (timestamp, open, high, low, close, volume) plus a small json file with metadata.
+    Only candles that are newer than (or equal to) the last stored one are downloaded, page by page until the
+    current candle (exchanges may return fewer candles per request than `page_limit`).
+    Single writer per file is assumed.
+    """
+
+    VERSION: int = 1
+    COLUMNS: int = 6
+    INITIAL_CAPACITY: int = 4096
+
+    def __init__(self: Self,
+                 directory: str | PathLike,
+                 exchange_name: str,
+                 symbol: str,
+                 timeframe: str,
+                 page_limit: int = 500) -> None:
+        """
+        Open (or create) the store
+
+        :param directory: where to keep the files
+        :param exchange_name: ccxt exchange id
+        :param symbol: e.g. `XMR/USDT`
+        :param timeframe: e.g. `1m`
+        :param page_limit: maximum candles per request while catching up
+        """
+
+        self.symbol: str = symbol
+        self.timeframe: str = timeframe
+        self.timeframe_ms: int = int(Exchange.parse_timeframe(timeframe) * 1000)
+        self.page_limit: int = page_limit
+
+        os.makedirs(directory, exist_ok=True)
+        file_name: str = f"{exchange_name}_{symbol.replace('/', '-')}_{timeframe}"
+        self.data_path: str = os.path.join(directory, f"{file_name}.f64")
+        self.meta_path: str = os.path.join(directory, f"{file_name}.json")
+
+        self.count: int = 0
+        if os.path.exists(self.meta_path) and os.path.exists(self.data_path):
+            with open(self.meta_path, "r") as file:
+                meta: dict = json.load(file)
+            if meta.get("version") == self.VERSION:
+                self.count = int(meta["count"])
+
+        capacity: int = os.path.getsize(self.data_path) // (8 * self.COLUMNS) if self.count else 0
+        self._map(max(capacity, self.count, self.INITIAL_CAPACITY))
+
+    def _map(self: Self, capacity: int) -> None:
+        """
+        (Re)map data file with given capacity (rows). Views taken earlier stay valid.
+
+        :param capacity: number of rows
+        :return: None
+        """
+
+        mode: str = "r+b" if os.path.exists(self.data_path) else "w+b"
+        with open(self.data_path, mode) as file:
+            file.truncate(capacity * 8 * self.COLUMNS)
+
+        self.capacity: int = capacity
+        self.data: np.memmap = np.memmap(self.data_path, dtype=np.float64, mode="r+",
+                                         shape=(capacity, self.COLUMNS))
+
+    def _save_meta(self: Self) -> None:
+        """
+        Flush rows and atomically write metadata (rows past `count` are ignored after a crash)
+
+        :return: None
+        """
+
+        self.data.flush()
+        temporary_path: str = f"{self.meta_path}.tmp"
+        with open(temporary_path, "w") as file:
+            json.dump({"version": self.VERSION, "count": self.count, "symbol": self.symbol,
+                       "timeframe": self.timeframe}, file)
+        os.replace(temporary_path, self.meta_path)
+
+    @property
+    def last_timestamp(self: Self) -> int | None:
+        return int(self.data[self.count - 1, 0]) if self.count else None
+
+    def append(self: Self, rows: Sequence[Sequence[Any]], replace: bool = False) -> int:
+        """
+        Merge candles into the store. The last stored candle is overwritten by a newer version of it,
+        older candles are ignored.
+
+        :param rows: ccxt OHLCV rows (oldest first)
+        :param replace: drop everything stored before merging
+        :return: number of new candles
+        """
+
+        if replace:
+            self.count = 0
+
+        last: int | None = self.last_timestamp
+        new_rows: list[Sequence[Any]] = [row for row in rows if last is None or row[0] >= last]
+        if not new_rows:
+            return 0
+
+        start: int = self.count - 1 if last is not None and new_rows[0][0] == last else self.count
+        if start + len(new_rows) > self.capacity:
+            self._map(max(2 * self.capacity, start + len(new_rows)))
+
+        self.data[start:start + len(new_rows)] = np.asarray(new_rows, dtype=np.float64)
+        added: int = start + len(new_rows) - self.count
+        self.count = start + len(new_rows)
+        self._save_meta()
+        return added
+
+    def window(self: Self, length: int) -> np.ndarray:
+        """
+        Last `length` candles (a view into the memory map, nothing is copied)
+
+        :param length: number of candles
+        :return: float array of shape (<= length, 6)
+        """
+
+        return self.data[max(0, self.count - length):self.count]
+
+    def history(self: Self) -> np.ndarray:
+        """
+        All stored candles (a view into the memory map)
+
+        :return: float array of shape (count, 6)
+        """
+
+        return self.data[:self.count]
+
+    def is_stale(self: Self, now: int, length: int) -> bool:
+        """
+        Whether the stored candles can't be caught up into a window (too few, or a gap longer than the window)
+
+        :param now: exchange time in ms
+        :param length: window length
+        :return: bool
+        """
+
+        return self.count < length or now - self.last_timestamp > length * self.timeframe_ms
+
+    def is_current(self: Self, now: int) -> bool:
+        return self.last_timestamp is not None and self.last_timestamp >= now - self.timeframe_ms
+
+    def sync(self: Self, exchange: Exchange, length: int) -> np.ndarray:
+        """
+        Download candles that are missing locally and return the latest window
+
+        :param exchange: ccxt exchange instance
+        :param length: window length (e.g. DATA_VECTOR_LENGTH)
+        :return: float array of shape (<= length, 6)
+        """
+
+        # Nothing useful stored yet (or only candles older than the window): the whole window is downloaded anew
+        now: int = exchange.milliseconds()
+        if self.is_stale(now, length):
+            self.backfill(exchange, since=now - length * self.timeframe_ms, replace=True)
+            return self.window(length)
+
+        self.backfill(exchange, since=self.last_timestamp)
+        return self.window(length)
+
+    def backfill(self: Self, exchange: Exchange, since: int, replace: bool = False) -> int:
+        """
+        Page forward from `since` until the store is up-to-date (e.g. after a restart or for backtests):
+        until the current candle is stored, or a page adds nothing
+
+        :param exchange: ccxt exchange instance
+        :param since: timestamp in ms to start from
+        :param replace: drop everything stored before the first page
+        :return: number of new candles
+        """
+
+        now: int = exchange.milliseconds()
+        added: int = 0
+        while True:
+            page: list = exchange.fetch_ohlcv(self.symbol, self.timeframe, since=since, limit=self.page_limit)
+            added += self.append(page, replace=replace)
+            if not page or self.last_timestamp == since or self.is_current(now):
+                return added
+
+            since, replace = self.last_timestamp, False
+
+    async def async_sync(self: Self, exchange: Exchange, length: int) -> np.ndarray:
+        """
+        Same as `sync` for `ccxt.async_support` exchanges
+
+        :param exchange: ccxt async exchange instance
+        :param length: window length (e.g. DATA_VECTOR_LENGTH)
+        :return: float array of shape (<= length, 6)
+        """
+
+        now: int = exchange.milliseconds()
+        if self.is_stale(now, length):
+            await self.async_backfill(exchange, since=now - length * self.timeframe_ms, replace=True)
+            return self.window(length)
+
+        await self.async_backfill(exchange, since=self.last_timestamp)
+        return self.window(length)
+
+    async def async_backfill(self: Self, exchange: Exchange, since: int, replace: bool = False) -> int:
+        """
+        Same as `backfill` for `ccxt.async_support` exchanges
+
+        :param exchange: ccxt async exchange instance
+        :param since: timestamp in ms to start from
+        :param replace: drop everything stored before the first page
+        :return: number of new candles
+        """
+
+        now: int = exchange.milliseconds()
+        added: int = 0
+        while True:
+            page: list = await exchange.fetch_ohlcv(self.symbol, self.timeframe, since=since, limit=self.page_limit)
+            added += self.append(page, replace=replace)
+            if not page or self.last_timestamp == since or self.is_current(now):
+                return added
+
+            since, replace = self.last_timestamp, False
@@ -3,7 +3,12 @@ Configuration file. Must be version-controlled.
 
 """
 
+import os
+from contextlib import contextmanager
 from dataclasses import dataclass
+from typing import Any, Iterator, Mapping, Sequence
+
+from dotenv import load_dotenv
 
 
 @dataclass
@@ -37,6 +42,18 @@ class DashServer:
     HOST: str = "0.0.0.0"
     PORT: int = 8050
 
+    # Entries kept in memory (older ones are overwritten)
+    INFO_MESSAGES_CAPACITY: int = 1000
+    MEMORY_MESSAGES_CAPACITY: int = 120
+    TRANSACTION_COSTS_CAPACITY: int = 50
+
+    # Notifications shown at once
+    INFO_MESSAGES_SHOWN: int = 10
+
+    # Server threads; every live (push) browser tab holds one, the rest serve requests
+    THREADS: int = 8
+    MAX_PUSH_CLIENTS: int = 6
+
 
 class Styles:
     """CCS styles for Dashboard"""
@@ -99,3 +116,27 @@ class TestData:
         ["2020-03-10 12:04:03", 0.03, 0.03, 0.03, 0.03, 10],
         ["2020-03-10 12:04:04", 0.003, 0.003, 0.003, 0.003, 10],
     ]
+
+
+@contextmanager
+def scoped_environment(env_file_paths: Sequence[str], overrides: Mapping[str, Any] | None = None) -> Iterator[None]:
+    """
+    Temporarily replace process environment with the given .env files (and overrides), so that every pair
+    can be configured by the same `getenv` logic as a standalone bot
+
+    :param env_file_paths: .env files, later files win
+    :param overrides: variables to set on top of the files
+    :return: context manager
+    """
+
+    saved: dict[str, str] = dict(os.environ)
+    try:
+        for env_file_path in env_file_paths:
+            load_dotenv(dotenv_path=env_file_path, override=True)
+        for key, value in (overrides or {}).items():
+            os.environ[key] = str(value)
+        yield
+
+    finally:
+        os.environ.clear()
+        os.environ.update(saved)
@@ -1,22 +1,40 @@
 import dash
+import glob
+import json
+import os
 import threading
-from dash import dcc, html
-from dash.dependencies import Input, Output
+import time
+from flask import Response, request
+from dash import Patch, dcc, html, no_update
+from dash.dependencies import ClientsideFunction, Input, Output, State
+from dash.exceptions import PreventUpdate
 from waitress import serve
 import plotly.graph_objs as go
 
 from config import DashServer, Styles
+from telemetry import METRICS, RingBuffer, SharedRing
 
 # Dash app initialization
 app = dash.Dash(__name__, server=True, update_title="", assets_folder="images")
 app.title = "Crypto Autotrader Dashboard"
 app._favicon = "logo-modified.png"
 
-# Thread-safe module-global / program-local data storage
-_data_lock: threading.Lock = threading.Lock()
-_info_messages: list[str] = []
-_memory_messages: list[str] = []
-_transaction_costs: list[float] = []
+# Thread-safe module-global / program-local data storage (bounded, every store has its own lock)
+_info_messages: RingBuffer = RingBuffer(DashServer.INFO_MESSAGES_CAPACITY)
+_memory_messages: RingBuffer = RingBuffer(DashServer.MEMORY_MESSAGES_CAPACITY)
+_transaction_costs: RingBuffer = RingBuffer(DashServer.TRANSACTION_COSTS_CAPACITY)
+_stage_metrics: RingBuffer = RingBuffer(1)
+_stage_rows: dict[str, str] = {}
+_stage_rows_lock: threading.Lock = threading.Lock()
+
+# Wakes up push (SSE) connections when anything is added; every connection holds a server thread, so they're limited
+_updated: threading.Condition = threading.Condition()
+_push_slots: threading.BoundedSemaphore = threading.BoundedSemaphore(DashServer.MAX_PUSH_CLIENTS)
+
+
+def _notify() -> None:
+    with _updated:
+        _updated.notify_all()
 
 
 # Thread-safe functions for modifying data
@@ -27,10 +45,8 @@ def add_transaction_cost(cost: float) -> None:
     :return: None
     """
 
-    with _data_lock:
-        _transaction_costs.append(cost)
-        if len(_transaction_costs) > 50:
-            _transaction_costs.pop(0)
+    _transaction_costs.append(cost)
+    _notify()
 
 
 def add_info_message(message: str) -> None:
@@ -40,55 +56,124 @@ def add_info_message(message: str) -> None:
     :return: None
     """
 
-    with _data_lock:
-        _info_messages.append(message)
+    _info_messages.append(message)
+    _notify()
 
 
 def add_memory_messages(memory_message: str) -> None:
     """
-    Thread-safe function to add an info message.
+    Thread-safe function to add a memory message.
 
-    :param memory_message: string to add to local storage
-                        (instance of Python's set class) of memory messages
+    :param memory_message: string to add to local storage of memory messages
     :return: None
     """
 
-    with _data_lock:
-        _memory_messages.append(memory_message)
+    _memory_messages.append(memory_message)
+    _notify()
+
+
+def add_stage_metrics(summary: dict[str, str]) -> None:
+    """
+    Thread-safe function to update the stage latency summary (every bot sends its own rows, other rows are kept).
+
+    :param summary: `Metrics.summary()` (row name -> p50/p95/p99 or counter value)
+    :return: None
+    """
 
-        # Keep memory storage to only include a single message
-        if len(_memory_messages) > 1:
-            _memory_messages.pop(0)
+    with _stage_rows_lock:
+        _stage_rows.update(summary)
+        _stage_metrics.append("\n".join(f"{key:<40} {value}" for key, value in sorted(_stage_rows.items())))
+    _notify()
 
 
 def get_transaction_costs() -> list[float]:
     """Thread-safe function to retrieve transaction costs.
 
-    :return: list of floating point numbers
+    :return: list of floating point numbers (a snapshot)
     """
 
-    with _data_lock:
-        return _transaction_costs
+    return _transaction_costs.snapshot()
 
 
 def get_info_messages() -> list[str]:
     """Thread-safe function to retrieve info messages.
 
-    :return: list of strings
+    :return: list of strings (a snapshot)
     """
 
-    with _data_lock:
-        return _info_messages
+    return _info_messages.snapshot()
 
 
 def get_memory_messages() -> list[str]:
-    """Thread-safe function to retrieve info messages.
+    """Thread-safe function to retrieve memory messages.
 
-    :return: list of strings
+    :return: list of strings (a snapshot)
     """
 
-    with _data_lock:
-        return _memory_messages
+    return _memory_messages.snapshot()
+
+
+def get_transaction_costs_since(sequence: int, limit: int | None = None) -> list[tuple[int, float]]:
+    """Thread-safe function to retrieve transaction costs newer than a sequence number.
+
+    :param sequence: last sequence number seen by the consumer (0 for all)
+    :param limit: optional maximum number of (newest) entries
+    :return: list of (sequence, cost)
+    """
+
+    return _transaction_costs.since(sequence, limit)
+
+
+def get_info_messages_since(sequence: int, limit: int | None = None) -> list[tuple[int, str]]:
+    """Thread-safe function to retrieve info messages newer than a sequence number.
+
+    :param sequence: last sequence number seen by the consumer (0 for all)
+    :param limit: optional maximum number of (newest) entries
+    :return: list of (sequence, message)
+    """
+
+    return _info_messages.since(sequence, limit)
+
+
+def get_memory_messages_since(sequence: int, limit: int | None = None) -> list[tuple[int, str]]:
+    """Thread-safe function to retrieve memory messages newer than a sequence number.
+
+    :param sequence: last sequence number seen by the consumer (0 for all)
+    :param limit: optional maximum number of (newest) entries
+    :return: list of (sequence, message)
+    """
+
+    return _memory_messages.since(sequence, limit)
+
+
+def get_stage_metrics_since(sequence: int) -> list[tuple[int, str]]:
+    """Thread-safe function to retrieve the stage latency summary, if newer than a sequence number.
+
+    :param sequence: last sequence number seen by the consumer (0 for all)
+    :return: list with at most one (sequence, summary text)
+    """
+
+    return _stage_metrics.since(sequence)
+
+
+def initial_transaction_cost_figure() -> go.Figure:
+    """Empty chart, points are appended to it by `update_dashboard`.
+
+    :return: plotly figure
+    """
+
+    fig = go.Figure()
+    fig.add_trace(go.Scatter(
+        x=[], y=[], mode="lines+markers", name="Transaction Cost",
+        line=dict(color="green")
+    ))
+    fig.update_layout(
+        title="Transaction Costs Over Time",
+        xaxis_title="Transaction Count",
+        yaxis_title="Cost",
+        template="plotly_dark"
+    )
+    return fig
 
 
 # Define Dashboard Layout
@@ -101,16 +186,22 @@ app.layout = html.Div([
         html.P(id="memory-usage", style=Styles.PARAGRAPH)
     ], style=Styles.GENERIC_DIV),
 
+    # Stage latencies (p50/p95/p99) and counters
+    html.Div([
+        html.H3("Cycle Stage Latency", style=Styles.GENERIC_FONT),
+        html.Pre(id="stage-metrics", style=Styles.GENERIC_FONT)
+    ], style=Styles.GENERIC_DIV),
+
     # Transaction Cost Chart
     html.Div([
         html.H3("Transaction Cost Over Time", style=Styles.GENERIC_FONT),
-        dcc.Graph(id="transaction-cost-chart")
+        dcc.Graph(id="transaction-cost-chart", figure=initial_transaction_cost_figure())
     ], style=Styles.GENERIC_DIV),
 
     # Notifications
     html.Div([
         html.H3("Latest Notifications", style=Styles.GENERIC_FONT),
-        html.Ul(id="info-messages", style=Styles.UNORDERED_LIST)
+        html.Ul(id="info-messages", children=[], style=Styles.UNORDERED_LIST)
     ], style=Styles.GENERIC_DIV),
 
     # Miscellaneous
@@ -128,66 +219,229 @@ app.layout = html.Div([
         )
     ], style=Styles.HEADER),
 
+    # Last sequence numbers this browser tab has received (per client, reset on reload)
+    dcc.Store(id="client-cursor", storage_type="memory"),
+
     # Live update intervals
     dcc.Interval(id="interval-component", interval=10000, n_intervals=0)
 ], style=Styles.INTERVAL)
 
 
-# Callback to update memory usage
+# Single callback sending only what the client hasn't seen yet
 @app.callback(
+    Output("transaction-cost-chart", "extendData"),
+    Output("info-messages", "children"),
     Output("memory-usage", "children"),
-    [Input("interval-component", "n_intervals")]
+    Output("stage-metrics", "children"),
+    Output("client-cursor", "data"),
+    Input("interval-component", "n_intervals"),
+    State("client-cursor", "data")
 )
-def update_memory_usage(_):
-    return get_memory_messages()[-1]
+def update_dashboard(_, cursor):
+    cursor = cursor or {"costs": 0, "info": 0, "memory": 0, "metrics": 0, "shown": 0}
+    costs = get_transaction_costs_since(cursor["costs"])
+    messages = get_info_messages_since(cursor["info"], limit=DashServer.INFO_MESSAGES_SHOWN)
+    memory = get_memory_messages_since(cursor["memory"], limit=1)
+    metrics = get_stage_metrics_since(cursor.get("metrics", 0))
+
+    # Nothing new: an empty response, nothing is re-rendered
+    if not (costs or messages or memory or metrics):
+        raise PreventUpdate
+
+    extend_data = no_update
+    if costs:
+        cursor["costs"] = costs[-1][0]
+        extend_data = (
+            {"x": [[sequence for sequence, _ in costs]], "y": [[cost for _, cost in costs]]},
+            [0],
+            DashServer.TRANSACTION_COSTS_CAPACITY
+        )
 
+    info_messages = no_update
+    if messages:
+        cursor["info"] = messages[-1][0]
+        items = [html.Li(html.Pre(message)) for _, message in messages]
+        overflow = cursor["shown"] + len(items) - DashServer.INFO_MESSAGES_SHOWN
+        if overflow >= cursor["shown"]:
+            info_messages = items
+        else:
+            info_messages = Patch()
+            for _ in range(max(0, overflow)):
+                del info_messages[0]
+            for item in items:
+                info_messages.append(item)
+        cursor["shown"] = min(cursor["shown"] + len(items), DashServer.INFO_MESSAGES_SHOWN)
+
+    memory_usage = no_update
+    if memory:
+        cursor["memory"], memory_usage = memory[-1]
+
+    stage_metrics = no_update
+    if metrics:
+        cursor["metrics"], stage_metrics = metrics[-1]
+
+    return extend_data, info_messages, memory_usage, stage_metrics, cursor
+
+
+def push_events(cursor: dict[str, int], heartbeat: float = 15.0):
+    """Server-sent events with entries newer than the cursor, produced only when something was added.
+
+    `costs`, `info`, `memory` and `metrics` are the new entries (at most `INFO_MESSAGES_SHOWN` info messages, the
+    browser appends them and trims the list to `shown`). A comment line is sent after `heartbeat` idle seconds to keep
+    the connection.
+
+    :param cursor: last sequence numbers seen (`costs`, `info`, `memory`, `metrics`), updated in place
+    :param heartbeat: idle seconds between keep-alive comments
+    :return: generator of SSE frames
+    """
 
-# Callback to update transaction cost chart
-@app.callback(
-    Output("transaction-cost-chart", "figure"),
-    [Input("interval-component", "n_intervals")]
-)
-def update_transaction_cost_chart(_):
-    transaction_costs = get_transaction_costs()
-    fig = go.Figure()
+    while True:
+        with _updated:
+            costs = get_transaction_costs_since(cursor["costs"])
+            messages = get_info_messages_since(cursor["info"], limit=DashServer.INFO_MESSAGES_SHOWN)
+            memory = get_memory_messages_since(cursor["memory"], limit=1)
+            metrics = get_stage_metrics_since(cursor.get("metrics", 0))
+            if not (costs or messages or memory or metrics) and not _updated.wait(timeout=heartbeat):
+                yield ": keep-alive\n\n"
+                continue
+
+        if not (costs or messages or memory or metrics):
+            continue
+
+        event: dict = {"capacity": DashServer.TRANSACTION_COSTS_CAPACITY}
+        if costs:
+            cursor["costs"], event["costs"] = costs[-1][0], costs
+        if messages:
+            cursor["info"], event["info"] = messages[-1][0], messages
+            cursor["shown"] = min(cursor.get("shown", 0) + len(messages), DashServer.INFO_MESSAGES_SHOWN)
+        if memory:
+            cursor["memory"], event["memory"] = memory[-1]
+        if metrics:
+            cursor["metrics"], event["metrics"] = metrics[-1]
+        event["cursor"] = dict(cursor)
+        yield f"event: update\ndata: {json.dumps(event)}\n\n"
+
+
+@app.server.route("/events")
+def events():
+    """SSE endpoint the browser switches to from polling (see images/live_updates.js).
+
+    :return: streaming response, or 503 when all push slots are taken (the browser keeps polling)
+    """
 
-    if transaction_costs:
-        fig.add_trace(go.Scatter(
-            y=transaction_costs, mode="lines+markers", name="Transaction Cost",
-            line=dict(color="green")
-        ))
-    else:
-        fig.add_trace(go.Scatter(y=[], mode="lines+markers", name="No Data"))
+    if not _push_slots.acquire(blocking=False):
+        return Response("Too many push clients", status=503)
 
-    fig.update_layout(
-        title="Transaction Costs Over Time",
-        xaxis_title="Transaction Count",
-        yaxis_title="Cost",
-        template="plotly_dark"
-    )
-    return fig
+    cursor = {key: int(request.args.get(key, 0)) for key in ("costs", "info", "memory", "metrics", "shown")}
+    response = Response(push_events(cursor), mimetype="text/event-stream",
+                        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+    response.call_on_close(_push_slots.release)
+    return response
 
 
-# Callback to update info messages
-@app.callback(
-    Output("info-messages", "children"),
-    [Input("interval-component", "n_intervals")]
+@app.server.route("/metrics")
+def metrics_endpoint():
+    """Stage latencies and counters of the bots in this process as Prometheus text.
+
+    :return: text response
+    """
+
+    return Response(METRICS.render(), mimetype="text/plain; version=0.0.4")
+
+
+# Push mode: once the first cursor arrives, the browser opens `/events` and polling is disabled while it's connected
+app.clientside_callback(
+    ClientsideFunction(namespace="live", function_name="connect"),
+    Output("interval-component", "disabled"),
+    Input("client-cursor", "data")
 )
-def update_info_messages(_):
-    messages = get_info_messages()
-    return [html.Li(html.Pre(msg)) for msg in messages[-10:]]
 
 
-def run_dashboard():
-    """Start the Dash server in parallel."""
+def follow_shared_telemetry(telemetry_dir: str, interval: float = 0.25) -> threading.Thread:
+    """Copy entries of all bot ring files in a directory into this process' stores (out-of-process dashboard).
+
+    Messages are prefixed with the bot name, the memory and latency panels show the latest samples of every bot.
+    New ring files are picked up while running, so bots can start later; a restarted bot's ring (new generation) is
+    read from its start. A ring that fails to read is reopened on the next scan instead of stopping the follower.
+
+    :param telemetry_dir: directory written by bots in `shared` output mode
+    :param interval: seconds between scans
+    :return: daemon thread
+    """
+
+    def read(path: str, ring: SharedRing) -> None:
+        name = os.path.splitext(os.path.basename(path))[0]
+
+        # Another generation or a sequence behind the cursor: the bot restarted, read its ring from the start
+        generation, cursor = cursors.get(path, (ring.generation, 0))
+        if generation != ring.generation or ring.last < cursor:
+            cursor = 0
+
+        entries = ring.since(cursor)
+        cursors[path] = (ring.generation, entries[-1][0] if entries else cursor)
+        for _, kind, text in entries:
+            match kind:
+                case SharedRing.INFO:
+                    add_info_message(f"[{name}] {text}")
+                case SharedRing.COST:
+                    add_transaction_cost(float(text))
+                case SharedRing.MEMORY:
+                    memory[name] = text
+                case SharedRing.METRICS:
+                    key, _, value = text.partition("\t")
+                    metrics[f"[{name}] {key}"] = value
+        if any(kind == SharedRing.MEMORY for _, kind, _ in entries):
+            add_memory_messages(" | ".join(f"{bot}: {sample}" for bot, sample in sorted(memory.items())))
+        if any(kind == SharedRing.METRICS for _, kind, _ in entries):
+            add_stage_metrics(dict(sorted(metrics.items())))
+
+    def follow() -> None:
+        while True:
+            for path in glob.glob(os.path.join(telemetry_dir, "*.ring")):
+                if path in rings and rings[path].is_replaced():
+                    rings.pop(path).close()
+                if path not in rings:
+                    try:
+                        rings[path] = SharedRing(path)
+                    except (OSError, ValueError):
+                        continue
+
+            for path, ring in list(rings.items()):
+                try:
+                    read(path, ring)
+                except Exception as error:
+                    print(f"\t[WARNING]\tCould not read telemetry ring {path}:\n\t\t{error}.\n")
+                    rings.pop(path).close()
+
+            time.sleep(interval)
+
+    rings: dict[str, SharedRing] = {}
+    cursors: dict[str, tuple[int, int]] = {}
+    memory: dict[str, str] = {}
+    metrics: dict[str, str] = {}
+
+    thread = threading.Thread(target=follow, name="telemetry-follower", daemon=True)
+    thread.start()
+    return thread
+
+
+def run_dashboard(blocking: bool = False):
+    """Start the Dash server in parallel (or in this thread, for the out-of-process dashboard).
+
+    :param blocking: serve in the calling thread
+    """
 
     parallel_target_kwargs: dict = {
         "app": app.server,
         "host": DashServer.HOST,
         "port": DashServer.PORT,
-        "threads": 8
+        "threads": DashServer.THREADS
     }
 
+    if blocking:
+        serve(**parallel_target_kwargs)
+        return
+
     threading.Thread(
         target=serve,
         kwargs=parallel_target_kwargs,
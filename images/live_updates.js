@@ -0,0 +1,61 @@
+/*
+ * Push mode of the dashboard: server-sent events from `/events` replace polling while connected.
+ * On any error the connection is dropped and polling (with the same cursor) takes over again.
+ */
+window.dash_clientside = Object.assign({}, window.dash_clientside, {
+    live: {
+        connect: function (cursor) {
+            if (!cursor || !window.EventSource) {
+                return false;
+            }
+            if (window.liveSource) {
+                return true;
+            }
+
+            // Messages already rendered by polling, new ones are appended to them
+            window.liveInfo = Array.from(document.querySelectorAll("#info-messages pre"), pre => pre.textContent);
+
+            const query = new URLSearchParams(cursor).toString();
+            const source = new EventSource("/events?" + query);
+            window.liveSource = source;
+
+            source.addEventListener("update", function (message) {
+                const event = JSON.parse(message.data);
+                if (event.costs) {
+                    dash_clientside.set_props("transaction-cost-chart", {
+                        extendData: [
+                            {x: [event.costs.map(entry => entry[0])], y: [event.costs.map(entry => entry[1])]},
+                            [0],
+                            event.capacity
+                        ]
+                    });
+                }
+                if (event.info) {
+                    window.liveInfo = window.liveInfo.concat(event.info.map(entry => entry[1]))
+                        .slice(-event.cursor.shown);
+                    dash_clientside.set_props("info-messages", {
+                        children: window.liveInfo.map(message => ({
+                            type: "Li",
+                            namespace: "dash_html_components",
+                            props: {children: {type: "Pre", namespace: "dash_html_components", props: {children: message}}}
+                        }))
+                    });
+                }
+                if (event.memory) {
+                    dash_clientside.set_props("memory-usage", {children: event.memory});
+                }
+                if (event.metrics) {
+                    dash_clientside.set_props("stage-metrics", {children: event.metrics});
+                }
+                dash_clientside.set_props("client-cursor", {data: event.cursor});
+            });
+
+            source.onerror = function () {
+                source.close();
+                window.liveSource = null;
+                dash_clientside.set_props("interval-component", {disabled: false});
+            };
+            return true;
+        }
+    }
+});
@@ -0,0 +1,554 @@
+"""
+Indicators module
+
+@Developer: Stan
+@ModuleVersion: 1.0.0
+@PythonVersion: 3.13
+
+"""
+import math
+import re
+from collections import deque
+from typing import Any, Literal, Mapping, Self, Sequence
+
+import numpy as np
+
+
+# Position of every column inside a ccxt OHLCV row
+OHLCV_COLUMNS: dict[str, int] = {"date": 0, "open": 1, "high": 2, "low": 3, "close": 4, "volume": 5}
+
+# Same naming scheme as stockstats (`close_3_ema`, `close_5,15_kama`, ...)
+INDICATOR_NAME_PATTERN: re.Pattern = re.compile(r"^(open|high|low|close|volume)(?:_([\d,]+)_(ema|sma|kama))?$")
+
+# Stockstats defaults for KAMA: (window, fast, slow)
+DEFAULT_KAMA_WINDOWS: tuple[int, int, int] = (10, 5, 34)
+
+
+def parse_indicator_name(name: str) -> tuple[str, str | None, tuple[int, ...]]:
+    """
+    Split a stockstats-like indicator name into its parts
+
+    :param name: e.g. `close`, `close_3_ema`, `close_5,15_kama`
+    :return: (column, kind or None for a raw column, windows)
+    """
+
+    match = INDICATOR_NAME_PATTERN.match(name)
+    if match is None:
+        raise ValueError(f"Indicator `{name}` is not supported outside of stockstats.")
+
+    column, windows, kind = match.groups()
+    if kind is None:
+        return column, None, ()
+
+    numbers: tuple[int, ...] = tuple(int(window) for window in windows.split(","))
+    if kind == "kama":
+        numbers = numbers + DEFAULT_KAMA_WINDOWS[len(numbers):]
+
+    if len(numbers) != 1 and kind != "kama":
+        raise ValueError(f"Indicator `{name}` accepts exactly one window.")
+
+    if min(numbers) < 1:
+        raise ValueError(f"Indicator `{name}` windows must be positive.")
+
+    return column, kind, numbers
+
+
+# Vectorized kernels -----------------------------------------------------------
+# Whole-series NumPy equivalents of the stockstats columns used by `predict_pandas`
+
+
+def ohlcv_columns(data: Any) -> dict[str, np.ndarray]:
+    """
+    Split OHLCV rows into float columns
+
+    :param data: ccxt OHLCV rows or a float array of shape (n, 6)
+    :return: dict of column name to 1-D array (views, if `data` already is a float array)
+    """
+
+    if isinstance(data, np.ndarray) and data.dtype == np.float64:
+        matrix: np.ndarray = data[:, 1:]
+    else:
+        # Dates can be strings (e.g. TestData), so they are left out
+        matrix: np.ndarray = np.array([row[1:6] for row in data], dtype=np.float64).reshape(-1, 5)
+
+    return {column: matrix[:, index - 1] for column, index in OHLCV_COLUMNS.items() if index}
+
+
+def ema(values: np.ndarray, window: int) -> np.ndarray:
+    """
+    Same as `pd.Series.ewm(span=window, adjust=True, min_periods=1).mean()`
+
+    :param values: 1-D float array
+    :param window: EMA span
+    :return: 1-D float array
+    """
+
+    decay: float = 1.0 - 2.0 / (window + 1)
+    if decay == 0.0 or len(values) == 0:
+        return values.astype(np.float64, copy=True)
+
+    # Weights grow as decay ** -i, so the series is processed in blocks that can't overflow
+    block: int = max(1, int(600 / -math.log(decay)))
+    out: np.ndarray = np.empty(len(values), dtype=np.float64)
+    carry_sum, carry_weights = 0.0, 0.0
+    for start in range(0, len(values), block):
+        chunk: np.ndarray = values[start:start + block]
+        powers: np.ndarray = decay ** -np.arange(len(chunk), dtype=np.float64)
+        weighted_sum: np.ndarray = (np.cumsum(chunk * powers) + decay * carry_sum) / powers
+        weights: np.ndarray = (np.cumsum(powers) + decay * carry_weights) / powers
+        out[start:start + block] = weighted_sum / weights
+        carry_sum, carry_weights = weighted_sum[-1], weights[-1]
+
+    return out
+
+
+def sma(values: np.ndarray, window: int) -> np.ndarray:
+    """
+    Same as `pd.Series.rolling(window, min_periods=1).mean()`
+
+    :param values: 1-D float array
+    :param window: number of periods
+    :return: 1-D float array
+    """
+
+    totals: np.ndarray = np.cumsum(values, dtype=np.float64)
+    totals[window:] = totals[window:] - totals[:-window]
+    return totals / np.minimum(np.arange(1, len(values) + 1), window)
+
+
+def kama(values: np.ndarray, window: int, fast: int, slow: int) -> np.ndarray:
+    """
+    Same as stockstats `_get_kama` (efficiency ratio and smoothing are vectorized,
+    only the adaptive recurrence itself is a loop over plain floats)
+
+    :param values: 1-D float array
+    :param window: efficiency ratio window
+    :param fast: fast EMA span
+    :param slow: slow EMA span
+    :return: 1-D float array
+    """
+
+    out: np.ndarray = sma(values, window)
+    if len(values) <= window:
+        return out
+
+    net_change: np.ndarray = np.abs(values[window:] - values[:-window])
+    changes: np.ndarray = np.zeros(len(values), dtype=np.float64)
+    changes[1:] = np.abs(np.diff(values))
+    totals: np.ndarray = np.cumsum(changes)
+    volatility: np.ndarray = totals[window:] - totals[:-window]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        efficiency_ratio: np.ndarray = np.where(volatility > 0, net_change / volatility, 0.0)
+
+    fast_smoothing: float = 2.0 / (fast + 1)
+    slow_smoothing: float = 2.0 / (slow + 1)
+    smoothing: list[float] = (2 * (efficiency_ratio * (fast_smoothing - slow_smoothing) + slow_smoothing)).tolist()
+
+    last: float = float(out[window - 1])
+    result: list[float] = []
+    for factor, value in zip(smoothing, values[window:].tolist()):
+        last = factor * (value - last) + last
+        result.append(last)
+
+    out[window:] = result
+    return out
+
+
+def indicator(columns: Mapping[str, np.ndarray], name: str) -> np.ndarray:
+    """
+    Compute an indicator from its stockstats-like name
+
+    :param columns: output of `ohlcv_columns`
+    :param name: e.g. `close_3_ema`
+    :return: 1-D float array
+    """
+
+    column, kind, windows = parse_indicator_name(name)
+    match kind:
+        case "ema":
+            return ema(columns[column], *windows)
+        case "sma":
+            return sma(columns[column], *windows)
+        case "kama":
+            return kama(columns[column], *windows)
+        case _:
+            return columns[column]
+
+
+def changed(flags: np.ndarray) -> np.ndarray:
+    """
+    Boolean `_delta` of a flag column (first element is False)
+
+    :param flags: 1-D bool array
+    :return: 1-D bool array
+    """
+
+    out: np.ndarray = np.zeros(len(flags), dtype=bool)
+    np.not_equal(flags[1:], flags[:-1], out=out[1:])
+    return out
+
+
+def crossovers(price: np.ndarray, trend: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Stockstats `<price>_xu_<trend>` and `<price>_xd_<trend>` columns
+
+    :param price: 1-D float array
+    :param trend: 1-D float array
+    :return: (cross up, cross down) bool arrays
+    """
+
+    is_above: np.ndarray = price > trend
+    is_changed: np.ndarray = changed(is_above)
+    return is_changed & is_above, is_changed & ~is_above
+
+
+def crossover_signals(columns: Mapping[str, np.ndarray],
+                      price_type_column_name: str,
+                      indicators: Sequence[str],
+                      wait_for_n_signal_lags: int) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Buy and sell signals for every candle, same rules as `PredictionApp.predict_pandas`
+
+    :param columns: output of `ohlcv_columns`
+    :param price_type_column_name: e.g. `close_3_ema`
+    :param indicators: e.g. ["close_5,15_kama"]
+    :param wait_for_n_signal_lags: same as PREDICTION_GLOBAL_SIGNAL_LAG
+    :return: (signal buy, signal sell) bool arrays
+    """
+
+    price: np.ndarray = indicator(columns, price_type_column_name)
+    signal_buy: np.ndarray = np.ones(len(price), dtype=bool)
+    signal_sell: np.ndarray = np.ones(len(price), dtype=bool)
+
+    for name in indicators:
+        trend: np.ndarray = indicator(columns, name)
+        cross_up, cross_down = crossovers(price, trend)
+
+        # Stockstats strips every `_delta` suffix at once,
+        # so any positive lag is a single difference of the crossover column
+        if wait_for_n_signal_lags:
+            cross_up_delta, cross_down_delta = changed(cross_up), changed(cross_down)
+            signal_buy &= cross_up_delta & (trend <= price)
+            signal_sell &= cross_down_delta & (price <= trend)
+
+            # Lags over one additionally require the opposite crossover delta (`-sdf[...]` terms)
+            if wait_for_n_signal_lags > 1:
+                signal_buy &= cross_down_delta
+                signal_sell &= cross_up_delta
+
+        else:
+            signal_buy &= cross_up & (trend <= price)
+            signal_sell &= cross_down & (price <= trend)
+
+    # Intersections are hold signals
+    intersections: np.ndarray = signal_buy & signal_sell
+    return signal_buy & ~intersections, signal_sell & ~intersections
+
+
+# Streaming state --------------------------------------------------------------
+# O(1) per candle equivalents of the kernels above
+
+
+class StreamingColumn:
+    """Raw OHLCV column (no smoothing)"""
+
+    def __init__(self: Self) -> None:
+        self.last: float | None = None
+
+    def peek(self: Self, value: float) -> float:
+        """
+        Value of the indicator if `value` was the next data point (state is not changed)
+
+        :param value: next data point
+        :return: float
+        """
+
+        return value
+
+    def push(self: Self, value: float) -> float:
+        """
+        Commit the next data point
+
+        :param value: next data point
+        :return: float (indicator value at the new data point)
+        """
+
+        self.last = self.peek(value)
+        return self.last
+
+
+class StreamingEma(StreamingColumn):
+    """
+    Exponential moving average equal to `pd.Series.ewm(span=window, adjust=True).mean()`
+    """
+
+    def __init__(self: Self, window: int) -> None:
+        super().__init__()
+        self.decay: float = 1.0 - 2.0 / (window + 1)
+        self.weighted_sum: float = 0.0
+        self.weights: float = 0.0
+
+    def peek(self: Self, value: float) -> float:
+        return (value + self.decay * self.weighted_sum) / (1.0 + self.decay * self.weights)
+
+    def push(self: Self, value: float) -> float:
+        self.weighted_sum = value + self.decay * self.weighted_sum
+        self.weights = 1.0 + self.decay * self.weights
+        self.last = self.weighted_sum / self.weights
+        return self.last
+
+
+class StreamingSma(StreamingColumn):
+    """
+    Simple moving average equal to `pd.Series.rolling(window, min_periods=1).mean()`
+    """
+
+    def __init__(self: Self, window: int) -> None:
+        super().__init__()
+        self.window: int = window
+        self.values: deque[float] = deque()
+        self.total: float = 0.0
+
+    def peek(self: Self, value: float) -> float:
+        if len(self.values) < self.window:
+            return (self.total + value) / (len(self.values) + 1)
+
+        return (self.total + value - self.values[0]) / self.window
+
+    def push(self: Self, value: float) -> float:
+        self.last = self.peek(value)
+        self.values.append(value)
+        self.total += value
+        if len(self.values) > self.window:
+            self.total -= self.values.popleft()
+
+        return self.last
+
+
+class StreamingKama(StreamingColumn):
+    """
+    Kaufman's adaptive moving average, same formula as stockstats `_get_kama`
+    (seeded with a simple moving average over the first `window` data points)
+    """
+
+    def __init__(self: Self, window: int, fast: int, slow: int) -> None:
+        super().__init__()
+        self.window: int = window
+        self.fast_smoothing: float = 2.0 / (fast + 1)
+        self.slow_smoothing: float = 2.0 / (slow + 1)
+        self.seed: StreamingSma = StreamingSma(window)
+
+        # Last `window` values and absolute changes between them
+        self.values: deque[float] = deque(maxlen=window)
+        self.changes: deque[float] = deque()
+        self.volatility: float = 0.0
+        self.count: int = 0
+
+    def _volatility_with(self: Self, change: float) -> float:
+        if len(self.changes) < self.window:
+            return self.volatility + change
+
+        return self.volatility + change - self.changes[0]
+
+    def peek(self: Self, value: float) -> float:
+        if self.count < self.window:
+            return self.seed.peek(value)
+
+        change: float = abs(value - self.values[-1])
+        volatility: float = self._volatility_with(change)
+        efficiency_ratio: float = abs(value - self.values[0]) / volatility if volatility > 0 else 0.0
+        smoothing: float = 2 * (efficiency_ratio * (self.fast_smoothing - self.slow_smoothing)
+                                + self.slow_smoothing)
+        return smoothing * (value - self.last) + self.last
+
+    def push(self: Self, value: float) -> float:
+        self.last = self.peek(value)
+        if self.count < self.window:
+            self.seed.push(value)
+
+        if self.values:
+            change: float = abs(value - self.values[-1])
+            self.volatility = self._volatility_with(change)
+            self.changes.append(change)
+            if len(self.changes) > self.window:
+                self.changes.popleft()
+
+        self.values.append(value)
+        self.count += 1
+        return self.last
+
+
+def make_streaming_indicator(name: str) -> tuple[str, StreamingColumn]:
+    """
+    Create a streaming indicator from its stockstats-like name
+
+    :param name: e.g. `close_3_ema`
+    :return: (OHLCV column name to feed, StreamingColumn instance)
+    """
+
+    column, kind, windows = parse_indicator_name(name)
+    match kind:
+        case "ema":
+            return column, StreamingEma(*windows)
+        case "sma":
+            return column, StreamingSma(*windows)
+        case "kama":
+            return column, StreamingKama(*windows)
+        case _:
+            return column, StreamingColumn()
+
+
+class StreamingCrossover:
+    """
+    Running `<price>_xu_<indicator>` / `<price>_xd_<indicator>` flags and their `_delta`
+    """
+
+    def __init__(self: Self) -> None:
+        self.was_above: bool | None = None
+        self.cross_up: bool = False
+        self.cross_down: bool = False
+
+    def peek(self: Self, price: float, indicator: float) -> tuple[bool, bool, bool, bool]:
+        """
+        Crossover flags if (price, indicator) was the next data point (state is not changed)
+
+        :param price: value of price (/shorter trend)
+        :param indicator: value of trend indicator
+        :return: (cross up, cross down, cross up delta, cross down delta)
+        """
+
+        is_above: bool = price > indicator
+        is_changed: bool = self.was_above is not None and is_above != self.was_above
+        cross_up: bool = is_changed and is_above
+        cross_down: bool = is_changed and not is_above
+        return cross_up, cross_down, cross_up != self.cross_up, cross_down != self.cross_down
+
+    def push(self: Self, price: float, indicator: float) -> tuple[bool, bool, bool, bool]:
+        flags: tuple[bool, bool, bool, bool] = self.peek(price, indicator)
+        self.was_above = price > indicator
+        self.cross_up, self.cross_down = flags[0], flags[1]
+        return flags
+
+
+class StreamingSignalEngine:
+    """
+    Incremental replacement for the stockstats computation of `PredictionApp.predict_pandas`.
+
+    Indicator state is kept between calls, so every new candle costs O(1).
+    The last candle of a window is still forming, hence it is only peeked at and never committed.
+    Signals match stockstats over the whole history seen so far, not over each window alone
+    (windowed `ema` and `sma` restart on every window, so their signals occasionally differ).
+    """
+
+    def __init__(self: Self,
+                 price_type_column_name: str,
+                 indicators: Sequence[str],
+                 wait_for_n_signal_lags: int) -> None:
+        """
+        Initialize streaming engine
+
+        :param price_type_column_name: e.g. `close_3_ema`
+        :param indicators: e.g. ["close_5,15_kama"]
+        :param wait_for_n_signal_lags: same as PREDICTION_GLOBAL_SIGNAL_LAG
+        """
+
+        # Fail early on names that can't be streamed
+        parse_indicator_name(price_type_column_name)
+        for indicator in indicators:
+            parse_indicator_name(indicator)
+
+        self.price_type_column_name: str = price_type_column_name
+        self.indicators: tuple[str, ...] = tuple(indicators)
+        self.wait_for_n_signal_lags: int = wait_for_n_signal_lags
+        self.reset()
+
+    def reset(self: Self) -> None:
+        """
+        Drop all accumulated state
+
+        :return: None
+        """
+
+        self.last_committed: Any = None
+        self.price: tuple[str, StreamingColumn] = make_streaming_indicator(self.price_type_column_name)
+        self.trends: list[tuple[str, StreamingColumn]] = [
+            make_streaming_indicator(indicator) for indicator in self.indicators
+        ]
+        self.crossovers: list[StreamingCrossover] = [StreamingCrossover() for _ in self.indicators]
+
+    def _signals(self: Self, row: Sequence[Any], commit: bool) -> tuple[bool, bool]:
+        """
+        Buy and sell signals at the given candle
+
+        :param row: ccxt OHLCV row
+        :param commit: whether to advance the state
+        :return: (signal buy, signal sell)
+        """
+
+        column, line = self.price
+        price: float = line.push(float(row[OHLCV_COLUMNS[column]])) if commit \
+            else line.peek(float(row[OHLCV_COLUMNS[column]]))
+
+        signal_buy: bool = True
+        signal_sell: bool = True
+        for (column, trend), crossover in zip(self.trends, self.crossovers):
+            value: float = float(row[OHLCV_COLUMNS[column]])
+            indicator: float = trend.push(value) if commit else trend.peek(value)
+            cross_up, cross_down, cross_up_delta, cross_down_delta = \
+                crossover.push(price, indicator) if commit else crossover.peek(price, indicator)
+
+            # Stockstats strips every `_delta` suffix at once,
+            # so any positive lag is a single difference of the crossover column
+            if self.wait_for_n_signal_lags:
+                signal_buy &= cross_up_delta and indicator <= price
+                signal_sell &= cross_down_delta and price <= indicator
+            else:
+                signal_buy &= cross_up and indicator <= price
+                signal_sell &= cross_down and price <= indicator
+
+            # Lags over one additionally require the opposite crossover delta (`-sdf[...]` terms)
+            if self.wait_for_n_signal_lags > 1:
+                signal_buy &= cross_down_delta
+                signal_sell &= cross_up_delta
+
+        # Intersections are hold signals
+        if signal_buy and signal_sell:
+            return False, False
+
+        return signal_buy, signal_sell
+
+    def predict(self: Self, data: Sequence[Sequence[Any]]) -> Literal["up", "down", "hold"]:
+        """
+        Consume only the candles newer than the last committed one and predict on the latest candle
+
+        :param data: ccxt OHLCV rows or a float array of shape (n, 6) (oldest first)
+        :return: str instance of "up", "down", "hold"
+        """
+
+        # `len`, not truthiness: the window may be a NumPy view (e.g. from `CandleStore`)
+        if len(data) == 0:
+            return "hold"
+
+        # Window no longer overlaps the state (first run, restart or gap): warm up from the window
+        if self.last_committed is None or data[0][0] > self.last_committed:
+            self.reset()
+            start: int = 0
+
+        else:
+            start: int = len(data) - 1
+            while start > 0 and data[start - 1][0] > self.last_committed:
+                start -= 1
+
+        for row in data[start:-1]:
+            self._signals(row, commit=True)
+            self.last_committed = row[0]
+
+        signal_buy, signal_sell = self._signals(data[-1], commit=False)
+
+        if signal_buy:
+            return "up"
+
+        if signal_sell:
+            return "down"
+
+        return "hold"
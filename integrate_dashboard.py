@@ -1,13 +1,29 @@
+import os
 from typing import Literal, Self
 
-from dashboard import add_info_message, add_memory_messages, add_transaction_cost
+from dashboard import add_info_message, add_memory_messages, add_stage_metrics, add_transaction_cost
+from telemetry import SharedRing
 
 
 class OutputIntegration:
     """Class to connect messages logic to other modules"""
 
-    def __init__(self: Self, mode: Literal["dashboard", "console"]):
+    def __init__(self: Self,
+                 mode: Literal["dashboard", "console", "shared"],
+                 telemetry_dir: str | None = None,
+                 name: str | None = None):
+        """
+        :param mode: `console` prints, `dashboard` feeds the in-process dashboard,
+                     `shared` writes to a ring file read by an out-of-process dashboard
+        :param telemetry_dir: directory of ring files (`shared` mode)
+        :param name: name of this bot on the dashboard (`shared` mode, default from process id)
+        """
+
         self.mode = mode
+        self.ring: SharedRing | None = None
+        if mode == "shared":
+            os.makedirs(telemetry_dir, exist_ok=True)
+            self.ring = SharedRing(os.path.join(telemetry_dir, f"{name or f'bot-{os.getpid()}'}.ring"), writer=True)
 
     @property
     def output(self: Self):
@@ -24,6 +40,10 @@ class OutputIntegration:
         elif self.mode == "dashboard":
             return add_info_message
 
+        # Writing the message for another process
+        elif self.mode == "shared":
+            return lambda *parts: self.ring.append(SharedRing.INFO, " ".join(map(str, parts)))
+
     @property
     def handle_data(self: Self):
         """How to process deal value (cost of transaction)
@@ -39,6 +59,9 @@ class OutputIntegration:
         elif self.mode == "dashboard":
             return add_transaction_cost
 
+        elif self.mode == "shared":
+            return lambda cost: self.ring.append(SharedRing.COST, repr(float(cost)))
+
     @property
     def handle_memory_data(self: Self):
         """How to process a memory message
@@ -53,3 +76,34 @@ class OutputIntegration:
         # Running the message through another function
         elif self.mode == "dashboard":
             return add_memory_messages
+
+        elif self.mode == "shared":
+            return lambda *parts: self.ring.append(SharedRing.MEMORY, " ".join(map(str, parts)))
+
+    @property
+    def handle_metrics_data(self: Self):
+        """How to process a summary of stage latencies and counters (`Metrics.summary`)
+
+        :return: Callable object
+        """
+
+        # Console users read the Prometheus endpoint (METRICS_PORT) instead
+        if self.mode == "console":
+            return lambda *args, **kwargs: None
+
+        elif self.mode == "dashboard":
+            return add_stage_metrics
+
+        elif self.mode == "shared":
+            return self.append_metrics
+
+    def append_metrics(self: Self, summary: dict[str, str]) -> None:
+        """Write a metrics summary to the ring, one entry per row (key and value separated by a tab),
+        since a whole summary may not fit into a slot
+
+        :param summary: `Metrics.summary()`
+        :return: None
+        """
+
+        for key, value in summary.items():
+            self.ring.append(SharedRing.METRICS, f"{key}\t{value}")
@@ -0,0 +1,315 @@
+"""
+Local OpenAI-compatible stub server (offline LLM tests and benchmarks)
+
+@Developer: Stan
+@ModuleVersion: 1.0.0
+@PythonVersion: 3.13
+
+"""
+import argparse
+import json
+import random
+import re
+import statistics
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Self, Sequence
+
+from config import scoped_environment
+from predict import PredictionApp
+
+
+def parse_latency(spec: str | float) -> Callable[[random.Random], float]:
+    """
+    Latency distribution from a spec: `0.2` or `constant:0.2`, `uniform:0.1,0.5`, `exponential:0.2` (mean),
+    `lognormal:-1.6,0.5` (mu, sigma of the underlying normal)
+
+    :param spec: spec string or seconds
+    :return: function of a random generator returning seconds
+    """
+
+    if isinstance(spec, (int, float)):
+        return lambda _: float(spec)
+
+    kind, _, arguments = spec.partition(":") if ":" in spec else ("constant", "", spec)
+    values: list[float] = [float(value) for value in arguments.split(",")]
+    match kind:
+        case "constant":
+            return lambda _: values[0]
+        case "uniform":
+            return lambda generator: generator.uniform(values[0], values[1])
+        case "exponential":
+            return lambda generator: generator.expovariate(1 / values[0])
+        case "lognormal":
+            return lambda generator: generator.lognormvariate(values[0], values[1])
+
+    raise ValueError(f"Unknown latency distribution `{kind}`")
+
+
+class StubLlmServer:
+    """
+    OpenAI-compatible `/chat/completions` endpoint with scripted answers, injected latency (before the first byte),
+    an error rate (HTTP 500) and SSE streaming (`stream=true`, one chunk per word).
+
+    Point `LLM_BASE_URL` at `base_url`. Runs in a background thread; usable as a context manager.
+    """
+
+    def __init__(self: Self,
+                 responses: Sequence[str] | Callable[[list[dict]], str] = ("UP",),
+                 latency: str | float = 0.0,
+                 error_rate: float = 0.0,
+                 chunk_delay: float = 0.0,
+                 seed: int = 0,
+                 host: str = "127.0.0.1",
+                 port: int = 0) -> None:
+        """
+        Initialize stub server
+
+        :param responses: answers served in turn, or a function of the request messages returning the answer
+        :param latency: latency distribution spec (see `parse_latency`)
+        :param error_rate: share of requests answered with HTTP 500
+        :param chunk_delay: seconds to generate a word (between streamed chunks, all up front otherwise)
+        :param seed: random seed (latency and errors are reproducible)
+        :param host: interface to bind
+        :param port: port to bind (0 picks a free one)
+        """
+
+        self.responses: Sequence[str] | Callable[[list[dict]], str] = responses
+        self.latency: Callable[[random.Random], float] = parse_latency(latency)
+        self.error_rate: float = error_rate
+        self.chunk_delay: float = chunk_delay
+        self.generator: random.Random = random.Random(seed)
+        self.lock: threading.Lock = threading.Lock()
+        self.requests: int = 0
+        self.errors: int = 0
+        self.answered: int = 0
+        self.server: ThreadingHTTPServer = ThreadingHTTPServer((host, port), self._handler())
+        self.server.daemon_threads = True
+        self.thread: threading.Thread | None = None
+
+    @property
+    def base_url(self: Self) -> str:
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def _draw(self: Self, messages: list[dict]) -> tuple[float, bool, str]:
+        """
+        Latency, error flag and answer of the next request. Batch prompts (`### <label>` lines) get one
+        `<label>: <answer>` line per window.
+
+        :param messages: request messages
+        :return: (seconds, is_error, answer)
+        """
+
+        with self.lock:
+            self.requests += 1
+            delay: float = max(0.0, self.latency(self.generator))
+            is_error: bool = self.generator.random() < self.error_rate
+            self.errors += is_error
+            if callable(self.responses):
+                return delay, is_error, self.responses(messages)
+
+            labels: list[str] = re.findall(r"^### (\S+)", str(messages[-1].get("content", "")) if messages else "",
+                                           flags=re.MULTILINE)
+            answers: list[str] = []
+            for _ in labels or [None]:
+                answers.append(self.responses[self.answered % len(self.responses)])
+                self.answered += 1
+
+        if labels:
+            return delay, is_error, "\n".join(f"{label}: {answer}" for label, answer in zip(labels, answers))
+        return delay, is_error, answers[0]
+
+    def _handler(self: Self) -> type[BaseHTTPRequestHandler]:
+        stub: StubLlmServer = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *_: Any) -> None:
+                pass
+
+            def _send_json(self, status: int, body: dict) -> None:
+                payload: bytes = json.dumps(body).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def do_POST(self) -> None:
+                request: dict = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+                if not self.path.rstrip("/").endswith("/chat/completions"):
+                    self._send_json(404, {"error": {"message": "Not found", "type": "invalid_request_error"}})
+                    return
+
+                messages: list[dict] = request.get("messages", [])
+                delay, is_error, answer = stub._draw(messages)
+                words: list[str] = answer.split(" ")
+                time.sleep(delay)
+                if is_error:
+                    self._send_json(500, {"error": {"message": "Injected error", "type": "server_error"}})
+                    return
+
+                created: int = int(time.time())
+                prompt_tokens: int = sum(len(str(message.get("content", ""))) for message in messages) // 4
+                if not request.get("stream"):
+                    # The whole answer has to be generated first
+                    time.sleep(stub.chunk_delay * len(words))
+                    self._send_json(200, {
+                        "id": f"stub-{stub.requests}", "object": "chat.completion", "created": created,
+                        "model": request.get("model", "stub"),
+                        "choices": [{"index": 0, "finish_reason": "stop",
+                                     "message": {"role": "assistant", "content": answer}}],
+                        "usage": {"prompt_tokens": prompt_tokens, "completion_tokens": len(answer) // 4,
+                                  "total_tokens": prompt_tokens + len(answer) // 4}
+                    })
+                    return
+
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.send_header("Connection", "close")
+                self.end_headers()
+                try:
+                    for index, word in enumerate(words):
+                        chunk: dict = {
+                            "id": f"stub-{stub.requests}", "object": "chat.completion.chunk", "created": created,
+                            "model": request.get("model", "stub"),
+                            "choices": [{"index": 0, "delta": {"content": word if not index else f" {word}"},
+                                         "finish_reason": "stop" if index == len(words) - 1 else None}]
+                        }
+                        self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode())
+                        self.wfile.flush()
+                        time.sleep(stub.chunk_delay)
+                    self.wfile.write(b"data: [DONE]\n\n")
+
+                except (BrokenPipeError, ConnectionResetError):
+                    # The client has closed the stream early
+                    pass
+
+                self.close_connection = True
+
+        return Handler
+
+    def start(self: Self) -> Self:
+        self.thread = threading.Thread(target=self.server.serve_forever, name="llm-stub", daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self: Self) -> None:
+        self.server.shutdown()
+        self.server.server_close()
+
+    def __enter__(self: Self) -> Self:
+        return self.start()
+
+    def __exit__(self: Self, *_: Any) -> None:
+        self.stop()
+
+
+def random_walk_ohlcv(length: int, seed: int = 3, start: int = 1_700_000_000_000) -> list[list[float]]:
+    """
+    Deterministic ccxt-like OHLCV window of a random walk (1m candles), also used by the tests
+
+    :param length: number of candles
+    :param seed: random seed
+    :param start: timestamp of the first candle in milliseconds
+    :return: list of [timestamp, open, high, low, close, volume]
+    """
+
+    generator: random.Random = random.Random(seed)
+    price, rows = 100.0, []
+    for index in range(length):
+        close: float = price * (1 + generator.gauss(0, 0.01))
+        rows.append([start + 60_000 * index, price, max(price, close), min(price, close), close,
+                     generator.uniform(1, 10)])
+        price = close
+    return rows
+
+
+def benchmark(server: StubLlmServer,
+              prediction_api: str = "LLM",
+              predictions: int = 200,
+              concurrency: int = 16,
+              window_length: int = 30,
+              overrides: dict[str, Any] | None = None) -> dict[str, Any]:
+    """
+    Drive an LLM backend against the stub with concurrent callers
+
+    :param server: running stub server
+    :param prediction_api: `LLM` or `PROBABILITY_LLM`
+    :param predictions: number of predictions
+    :param concurrency: concurrent callers
+    :param window_length: candles per window
+    :param overrides: extra `PredictionApp` variables (e.g. `LLM_STREAM`, `LLM_BATCH_LINGER`, `LLM_PROMPT_ENCODING`)
+    :return: throughput, latency percentiles, provider requests and outcomes
+    """
+
+    with scoped_environment([], {"DEFAULT_PREDICTION_API": prediction_api, "LLM_BASE_URL": server.base_url,
+                                 "LLM_API_KEY": "stub", "LLM_MODEL": "stub", "LLM_CACHE_SIZE": 0,
+                                 **(overrides or {})}):
+        predictor: Callable[[Any], str] = PredictionApp().predict_up_or_down
+
+    windows: list[list[list[float]]] = [random_walk_ohlcv(window_length, seed) for seed in range(predictions)]
+    latencies: list[float] = []
+
+    def timed(window: list[list[float]]) -> str:
+        started: float = time.perf_counter()
+        decision: str = predictor(window)
+        latencies.append(time.perf_counter() - started)
+        return decision
+
+    requests_before: int = server.requests
+    started: float = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        outcomes: Counter = Counter(executor.map(timed, windows))
+    elapsed: float = time.perf_counter() - started
+
+    percentiles: list[float] = statistics.quantiles(latencies, n=100) if len(latencies) > 1 else latencies * 99
+    return {
+        "predictions_per_second": predictions / elapsed,
+        "p50_ms": percentiles[49] * 1000,
+        "p95_ms": percentiles[94] * 1000,
+        "provider_requests": server.requests - requests_before,
+        "outcomes": dict(outcomes)
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(prog="llm_stub.py",
+                                     description="Serve the stub (`serve`) or benchmark LLM backends against it "
+                                                 "(`benchmark`).")
+    parser.add_argument("mode", choices=("serve", "benchmark"))
+    parser.add_argument("--port", type=int, default=8099)
+    parser.add_argument("--responses", nargs="+", default=["UP", "DOWN", "HOLD"])
+    parser.add_argument("--latency", default="uniform:0.05,0.25")
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--chunk-delay", type=float, default=0.0)
+    parser.add_argument("--api", default="LLM", choices=("LLM", "PROBABILITY_LLM"))
+    parser.add_argument("--predictions", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=16)
+    arguments = parser.parse_args()
+
+    stub_server: StubLlmServer = StubLlmServer(responses=arguments.responses, latency=arguments.latency,
+                                               error_rate=arguments.error_rate, chunk_delay=arguments.chunk_delay,
+                                               port=arguments.port if arguments.mode == "serve" else 0)
+    if arguments.mode == "serve":
+        print(f"[START]\tStub LLM at {stub_server.base_url}")
+        try:
+            stub_server.server.serve_forever()
+        except KeyboardInterrupt:
+            print("[END]\tStub LLM stopped.")
+
+    else:
+        with stub_server:
+            for name, variables in (("plain", {}), ("streaming", {"LLM_STREAM": "true"}),
+                                    ("batched", {"LLM_BATCH_LINGER": 0.02}),
+                                    ("compact", {"LLM_PROMPT_ENCODING": "compact"})):
+                result: dict[str, Any] = benchmark(stub_server, arguments.api, arguments.predictions,
+                                                   arguments.concurrency, overrides=variables)
+                print(f"\t[INFO]\t{name:<10} {result['predictions_per_second']:8.1f} predictions/s  "
+                      f"p50 {result['p50_ms']:7.1f} ms  p95 {result['p95_ms']:7.1f} ms  "
+                      f"requests {result['provider_requests']:<5} {result['outcomes']}")
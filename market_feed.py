@@ -0,0 +1,200 @@
+"""
+Market data feed module (push-based events for the event-driven bot mode)
+
+@Developer: Stan
+@ModuleVersion: 1.0.0
+@PythonVersion: 3.13
+
+"""
+# Python default library ---------
+import asyncio
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from typing import Any, AsyncIterator, Literal, Self, Sequence
+# --------------------------------
+
+# External modules ---------------
+import ccxt.pro as ccxt_pro
+from ccxt import Exchange
+# --------------------------------
+
+
+@dataclass
+class MarketEvent:
+    """
+    Single pushed event.
+
+    `candle_closed` data is the closed OHLCV row, `top_of_book` data is (bid, ask),
+    `order_filled` data is the ccxt order, `error` data is the exception
+    """
+
+    kind: Literal["candle_closed", "top_of_book", "order_filled", "error"]
+    symbol: str
+    data: Any
+
+
+class MarketFeed(ABC):
+    """Interface of push-based market data sources"""
+
+    # Whether fills of the bot's own orders are pushed (`order_filled`), so open orders needn't be polled
+    has_fills: bool = False
+
+    @abstractmethod
+    def events(self: Self) -> AsyncIterator[MarketEvent]:
+        """
+        Infinite stream of market events (implemented as an async generator)
+
+        :return: async iterator of MarketEvent
+        """
+
+    async def close(self: Self) -> None:
+        pass
+
+
+class WebSocketFeed(MarketFeed):
+    """
+    Exchange WebSocket streams through `ccxt.pro` (candles, order book top and own order fills)
+    """
+
+    # Pause before re-subscribing after a stream error (seconds)
+    RECONNECT_DELAY: float = 1.0
+
+    def __init__(self: Self,
+                 exchange_name: str,
+                 symbol: str,
+                 timeframe: str,
+                 api_key: str | None = None,
+                 secret: str | None = None,
+                 password: str | None = None) -> None:
+        """
+        Initialize WebSocket feed
+
+        :param exchange_name: ccxt exchange id
+        :param symbol: e.g. `XMR/USDT`
+        :param timeframe: e.g. `1m`
+        :param api_key: optional, needed for order fills
+        :param secret: optional, needed for order fills
+        :param password: optional, needed for order fills on some exchanges
+        """
+
+        self.symbol: str = symbol
+        self.timeframe: str = timeframe
+        self.exchange: Exchange = getattr(ccxt_pro, exchange_name)()
+        self.exchange.apiKey = api_key
+        self.exchange.secret = secret
+        self.exchange.password = password
+        self.has_fills: bool = bool(api_key)
+
+    async def _watch(self: Self, queue: asyncio.Queue, watcher: Any) -> None:
+        """
+        Keep a single stream alive, reporting errors as events
+
+        :param queue: where events go
+        :param watcher: coroutine function producing events into the queue
+        :return: None
+        """
+
+        while True:
+            try:
+                await watcher(queue)
+
+            except Exception as error:
+                queue.put_nowait(MarketEvent("error", self.symbol, error))
+                await asyncio.sleep(self.RECONNECT_DELAY)
+
+    async def _watch_candles(self: Self, queue: asyncio.Queue) -> None:
+        forming: list | None = None
+        while True:
+            candles: list[list] = await self.exchange.watch_ohlcv(self.symbol, self.timeframe)
+
+            # A newer candle means that the previous one has closed
+            if forming is not None and candles[-1][0] > forming[0]:
+                closed: list = next((candle for candle in reversed(candles) if candle[0] == forming[0]), forming)
+                queue.put_nowait(MarketEvent("candle_closed", self.symbol, closed))
+
+            forming = candles[-1]
+
+    async def _watch_order_book(self: Self, queue: asyncio.Queue) -> None:
+        top: tuple[float, float] | None = None
+        while True:
+            orderbook: dict = await self.exchange.watch_order_book(self.symbol)
+            if orderbook["bids"] and orderbook["asks"]:
+                new_top: tuple[float, float] = (orderbook["bids"][0][0], orderbook["asks"][0][0])
+                if new_top != top:
+                    top = new_top
+                    queue.put_nowait(MarketEvent("top_of_book", self.symbol, top))
+
+    async def _watch_orders(self: Self, queue: asyncio.Queue) -> None:
+        while True:
+            for order in await self.exchange.watch_orders(self.symbol):
+                if order.get("status") == "closed":
+                    queue.put_nowait(MarketEvent("order_filled", self.symbol, order))
+
+    async def events(self: Self) -> AsyncIterator[MarketEvent]:
+        queue: asyncio.Queue = asyncio.Queue()
+        watchers: list = [self._watch_candles, self._watch_order_book]
+        if self.exchange.apiKey:
+            watchers.append(self._watch_orders)
+
+        tasks: list[asyncio.Task] = [asyncio.create_task(self._watch(queue, watcher)) for watcher in watchers]
+        try:
+            while True:
+                yield await queue.get()
+
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    async def close(self: Self) -> None:
+        await self.exchange.close()
+
+
+class SimulatedFeed(MarketFeed):
+    """
+    Local in-process stand-in for `WebSocketFeed`: replays OHLCV rows as candle and order book events.
+    Other events (e.g. fills) can be injected with `push`.
+    """
+
+    def __init__(self: Self,
+                 rows: Sequence[Sequence[Any]],
+                 symbol: str,
+                 interval: float = 0.0,
+                 spread: float = 0.001,
+                 has_fills: bool = False) -> None:
+        """
+        Initialize simulator
+
+        :param rows: ccxt OHLCV rows to replay (oldest first)
+        :param symbol: symbol to report
+        :param interval: real seconds between candles
+        :param spread: relative bid/ask spread around the close
+        :param has_fills: fills of the bot's orders will be pushed (see `push`)
+        """
+
+        self.rows: Sequence[Sequence[Any]] = rows
+        self.symbol: str = symbol
+        self.interval: float = interval
+        self.spread: float = spread
+        self.has_fills: bool = has_fills
+        self.injected: asyncio.Queue = asyncio.Queue()
+
+    def push(self: Self, event: MarketEvent) -> None:
+        """
+        Inject an event, delivered before the next candle
+
+        :param event: MarketEvent
+        :return: None
+        """
+
+        self.injected.put_nowait(event)
+
+    async def events(self: Self) -> AsyncIterator[MarketEvent]:
+        for row in self.rows:
+            close: float = float(row[4])
+            yield MarketEvent("top_of_book", self.symbol,
+                              (close * (1 - self.spread / 2), close * (1 + self.spread / 2)))
+            while not self.injected.empty():
+                yield self.injected.get_nowait()
+
+            yield MarketEvent("candle_closed", self.symbol, list(row))
+            await asyncio.sleep(self.interval)
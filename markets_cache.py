@@ -0,0 +1,182 @@
+"""
+Markets cache module (exchange markets metadata on disk, for startup without `load_markets` downloads)
+
+@Developer: Stan
+@ModuleVersion: 1.0.0
+@PythonVersion: 3.13
+
+"""
+import asyncio
+import json
+import os
+import tempfile
+import threading
+import time
+from os import PathLike
+from typing import Any, Self
+from weakref import WeakKeyDictionary
+
+import ccxt
+from ccxt import Exchange
+
+from resilience import Backoff
+
+
+class MarketsCache:
+    """
+    Markets (symbols, precision, limits) and currencies of one exchange, kept in a json file.
+
+    `load` gives the exchange the cached markets without any request, so ccxt doesn't download them on the first call.
+    Cached markets are used even when older than `ttl` (precision and limits rarely change); the bot refreshes
+    expired ones in the background with `refresh` / `async_refresh`. Files of another cache `VERSION` or ccxt version
+    are ignored (market structure may differ).
+
+    Bots sharing an exchange instance (orchestrator pool) share its markets too, so they refresh them once: the
+    refresh of an exchange is claimed across caches, and a refresh done by another bot counts for them all.
+    Failed refreshes are retried with `RETRY_BACKOFF` (e.g. during an exchange outage), not every cycle.
+    """
+
+    VERSION: int = 1
+
+    # Exchange instance -> time of its last refresh (None while one is running)
+    EXCHANGE_REFRESHES: WeakKeyDictionary[Exchange, float | None] = WeakKeyDictionary()
+    EXCHANGE_REFRESHES_LOCK: threading.Lock = threading.Lock()
+
+    # Exchange instance -> (failed refreshes in a row, `time.monotonic()` before which no refresh is tried)
+    EXCHANGE_FAILURES: WeakKeyDictionary[Exchange, tuple[int, float]] = WeakKeyDictionary()
+    RETRY_BACKOFF: Backoff = Backoff(base=60.0, cap=3600.0)
+
+    def __init__(self: Self, directory: str | PathLike, exchange_name: str, ttl: float = 86400.0) -> None:
+        """
+        Initialize cache (nothing is read yet)
+
+        :param directory: where to keep the file
+        :param exchange_name: ccxt exchange id
+        :param ttl: seconds after which cached markets are refreshed
+        """
+
+        os.makedirs(directory, exist_ok=True)
+        self.path: str = os.path.join(directory, f"{exchange_name}_markets.json")
+        self.ttl: float = ttl
+        self.fetched_at: float | None = None
+        self.is_refreshing: bool = False
+
+    def is_expired(self: Self) -> bool:
+        return self.fetched_at is None or time.time() - self.fetched_at >= self.ttl
+
+    def load(self: Self, exchange: Exchange) -> bool:
+        """
+        Set the exchange's markets from the file (no network)
+
+        :param exchange: ccxt exchange (sync or async)
+        :return: bool, if cached markets were found
+        """
+
+        try:
+            with open(self.path, "r") as file:
+                payload: dict[str, Any] = json.load(file)
+        except (OSError, ValueError):
+            return False
+
+        if payload.get("version") != self.VERSION or payload.get("ccxt_version") != ccxt.__version__:
+            return False
+
+        exchange.set_markets(payload["markets"], payload.get("currencies"))
+        self.fetched_at = float(payload["fetched_at"])
+        return True
+
+    def save(self: Self, exchange: Exchange) -> None:
+        """
+        Write the exchange's loaded markets (the file is replaced atomically, readers never see a partial file)
+
+        :param exchange: ccxt exchange with loaded markets
+        :return: None
+        """
+
+        fetched_at: float = time.time()
+        # Unique temporary file: bots of other processes may save the same exchange's markets at the same time
+        with tempfile.NamedTemporaryFile("w", dir=os.path.dirname(self.path), suffix=".tmp", delete=False) as file:
+            json.dump({
+                "version": self.VERSION,
+                "ccxt_version": ccxt.__version__,
+                "fetched_at": fetched_at,
+                "markets": exchange.markets,
+                "currencies": exchange.currencies
+            }, file, default=str)
+        os.replace(file.name, self.path)
+        self.fetched_at = fetched_at
+
+    def start_refresh(self: Self, exchange: Exchange) -> bool:
+        """
+        Claim the refresh of expired markets (only one refresh runs at a time per exchange instance)
+
+        :param exchange: ccxt exchange the markets belong to
+        :return: bool, if the caller should refresh now
+        """
+
+        with self.EXCHANGE_REFRESHES_LOCK:
+            if time.monotonic() < self.EXCHANGE_FAILURES.get(exchange, (0, 0.0))[1]:
+                return False
+
+            if exchange in self.EXCHANGE_REFRESHES:
+                refreshed_at: float | None = self.EXCHANGE_REFRESHES[exchange]
+                if refreshed_at is None:
+                    return False
+
+                # Possibly refreshed by another bot sharing the exchange
+                self.fetched_at = max(self.fetched_at or 0.0, refreshed_at)
+
+            if self.is_refreshing or not self.is_expired():
+                return False
+
+            self.is_refreshing = True
+            self.EXCHANGE_REFRESHES[exchange] = None
+            return True
+
+    def _finish_refresh(self: Self, exchange: Exchange, is_failed: bool) -> None:
+        with self.EXCHANGE_REFRESHES_LOCK:
+            self.is_refreshing = False
+            if is_failed:
+                failures: int = self.EXCHANGE_FAILURES.get(exchange, (0, 0.0))[0] + 1
+                self.EXCHANGE_FAILURES[exchange] = (failures,
+                                                    time.monotonic() + self.RETRY_BACKOFF.delay(failures - 1))
+            else:
+                self.EXCHANGE_FAILURES.pop(exchange, None)
+
+            if self.fetched_at is None:
+                del self.EXCHANGE_REFRESHES[exchange]
+            else:
+                self.EXCHANGE_REFRESHES[exchange] = self.fetched_at
+
+    def refresh(self: Self, exchange: Exchange) -> None:
+        """
+        Download markets and save them (e.g. in a background thread)
+
+        :param exchange: ccxt exchange
+        :return: None
+        """
+
+        is_failed: bool = True
+        try:
+            exchange.load_markets(reload=True)
+            self.save(exchange)
+            is_failed = False
+        finally:
+            self._finish_refresh(exchange, is_failed)
+
+    async def async_refresh(self: Self, exchange: Exchange) -> None:
+        """
+        Same as `refresh` for `ccxt.async_support` exchanges (the file is written in a worker thread)
+
+        :param exchange: ccxt async exchange
+        :return: None
+        """
+
+        is_failed: bool = True
+        try:
+            await exchange.load_markets(reload=True)
+            # Megabytes of json: written off the event loop, other bots of the loop go on
+            await asyncio.to_thread(self.save, exchange)
+            is_failed = False
+        finally:
+            self._finish_refresh(exchange, is_failed)
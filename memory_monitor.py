@@ -0,0 +1,151 @@
+"""
+Memory monitor module (cheap RSS sampling, tracemalloc only as a diagnostic)
+
+@Developer: Stan
+@ModuleVersion: 1.0.0
+@PythonVersion: 3.13
+
+"""
+import os
+import sys
+import time
+import tracemalloc
+from os import getenv
+from typing import Literal, Self
+
+
+def read_rss() -> tuple[int, int]:
+    """
+    Resident set size of this process from `/proc/self/status` (`getrusage` peak where there is no procfs)
+
+    :return: (current, peak) in bytes, zeros when unknown
+    """
+
+    try:
+        with open("/proc/self/status", "rb") as file:
+            fields: dict[bytes, int] = {
+                line.split(b":")[0]: int(line.split()[1]) * 1024
+                for line in file if line.startswith((b"VmRSS:", b"VmHWM:"))
+            }
+        return fields.get(b"VmRSS", 0), fields.get(b"VmHWM", 0)
+
+    except OSError:
+        pass
+
+    try:
+        import resource
+    except ImportError:
+        return 0, 0
+
+    # Only the peak is known (kilobytes on Linux, bytes on macOS)
+    peak: int = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    peak = peak if sys.platform == "darwin" else peak * 1024
+    return peak, peak
+
+
+class MemoryMonitor:
+    """
+    Memory usage reports for the bot cycle.
+
+    `rss` (default) reads the resident set size of the process (one small procfs read, no cost between samples).
+    `tracemalloc` traces every Python allocation (slow, diagnostics only) and also reports the call sites that
+    allocated the most since the previous sample. `off` reports nothing. Samples are taken at most every `interval`
+    seconds, calls in between return None.
+    """
+
+    SQ_1024: int = 1024 * 1024
+
+    def __init__(self: Self,
+                 mode: Literal["rss", "tracemalloc", "off"] = "rss",
+                 interval: float = 60.0,
+                 top: int = 5,
+                 max_memory: int | float = 256) -> None:
+        """
+        Initialize memory monitor (starts tracing in `tracemalloc` mode)
+
+        :param mode: `rss`, `tracemalloc` or `off`
+        :param interval: minimum seconds between samples
+        :param top: call sites reported per diff (`tracemalloc` mode)
+        :param max_memory: MB, a peak over it is flagged
+        """
+
+        self.mode: Literal["rss", "tracemalloc", "off"] = mode
+        self.interval: float = interval
+        self.top: int = top
+        self.max_memory: int | float = max_memory
+        self.last_sample: float | None = None
+        self.snapshot: tracemalloc.Snapshot | None = None
+        if mode == "tracemalloc" and not tracemalloc.is_tracing():
+            tracemalloc.start()
+
+    @classmethod
+    def from_env(cls, max_memory: int | float = 256) -> Self:
+        """
+        Monitor from `MEMORY_MONITOR`, `MEMORY_SAMPLE_INTERVAL` and `MEMORY_TOP_ALLOCATIONS` variables
+
+        :param max_memory: MB, a peak over it is flagged
+        :return: MemoryMonitor instance
+        """
+
+        mode: str = (getenv("MEMORY_MONITOR") or "rss").lower()
+        return cls(
+            mode=mode if mode in ("rss", "tracemalloc", "off") else "rss",
+            interval=float(getenv("MEMORY_SAMPLE_INTERVAL") or 60),
+            top=int(getenv("MEMORY_TOP_ALLOCATIONS") or 5),
+            max_memory=max_memory
+        )
+
+    def get_memory(self: Self) -> tuple[int, int]:
+        """
+        Current and peak usage (RSS, or traced Python memory in `tracemalloc` mode)
+
+        :return: (current, peak) in MB
+        """
+
+        current, peak = tracemalloc.get_traced_memory() if self.mode == "tracemalloc" else read_rss()
+        return current // self.SQ_1024, peak // self.SQ_1024
+
+    def top_allocations(self: Self) -> list[str]:
+        """
+        Call sites with the largest allocation growth since the previous call (`tracemalloc` mode)
+
+        :return: list of `file:line +size (+blocks)`, empty on the first call
+        """
+
+        snapshot: tracemalloc.Snapshot = tracemalloc.take_snapshot().filter_traces((
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap*>"),
+            tracemalloc.Filter(False, "<unknown>")
+        ))
+        previous, self.snapshot = self.snapshot, snapshot
+        if previous is None:
+            return []
+
+        return [
+            f"{os.path.basename(statistic.traceback[0].filename)}:{statistic.traceback[0].lineno} "
+            f"{statistic.size_diff / 1024:+.1f} KiB ({statistic.count_diff:+d} blocks)"
+            for statistic in snapshot.compare_to(previous, "lineno")[:self.top] if statistic.size_diff > 0
+        ]
+
+    def sample(self: Self) -> str | None:
+        """
+        Memory report, if a sample is due
+
+        :return: message or None
+        """
+
+        now: float = time.monotonic()
+        if self.mode == "off" or (self.last_sample is not None and now - self.last_sample < self.interval):
+            return None
+
+        self.last_sample = now
+        current, peak = self.get_memory()
+        is_maxed: str = " (peaked over MAX, restart recommended)" if peak > self.max_memory else ""
+        if self.mode == "rss":
+            return f"\t[RSS]\t🚦 Current memory usage: {current} MB, peak usage: {peak} MB{is_maxed}"
+
+        message: str = f"\t[TRCM]\t🚦 Current memory usage: {current} MB, peak usage: {peak} MB{is_maxed}"
+        allocations: list[str] = self.top_allocations()
+        if allocations:
+            message += "\n\t\tTop allocations since last sample:\n\t\t" + "\n\t\t".join(allocations)
+        return message
@@ -0,0 +1,187 @@
+"""
+Orchestrator module (many trading pairs in one process)
+
+@Developer: Stan
+@ModuleVersion: 1.0.0
+@PythonVersion: 3.13
+
+"""
+# Python default library ---------
+import asyncio
+import heapq
+import json
+import os
+from os import getenv
+from typing import Any, Self, Sequence
+# --------------------------------
+
+# External modules ---------------
+import ccxt.async_support as ccxt_async
+from ccxt import Exchange
+# --------------------------------
+
+# Own modules --------------------
+from account_book import AccountBook
+from async_trading_bot import AsyncTradingBot
+from config import scoped_environment
+from integrate_dashboard import OutputIntegration
+from predict import PredictionApp
+# --------------------------------
+
+
+class ExchangePool:
+    """
+    One `ccxt.async_support` instance per (exchange, API key).
+
+    ccxt throttles requests per instance, so sharing the instance also shares the rate-limit budget
+    (and the loaded markets, and the HTTP session) between all pairs of the same account.
+    """
+
+    def __init__(self: Self) -> None:
+        self.exchanges: dict[tuple[str, str], Exchange] = {}
+
+    def get(self: Self) -> Exchange:
+        """
+        Exchange for the current environment variables (see `scoped_environment`)
+
+        :return: Exchange instance (async)
+        """
+
+        key: tuple[str, str] = (getenv("DEFAULT_EXCHANGE_NAME"), getenv("EXCHANGE_API_KEY"))
+        if key not in self.exchanges:
+            exchange: Exchange = getattr(ccxt_async, key[0])({"enableRateLimit": True})
+            exchange.set_sandbox_mode(enabled=False)
+            exchange.apiKey = getenv("EXCHANGE_API_KEY")
+            exchange.secret = getenv("EXCHANGE_SECRET")
+            exchange.password = getenv("EXCHANGE_PASSPHRASE")
+            self.exchanges[key] = exchange
+
+        return self.exchanges[key]
+
+    async def close(self: Self) -> None:
+        await asyncio.gather(*(exchange.close() for exchange in self.exchanges.values()))
+
+
+class Orchestrator:
+    """
+    Run many `AsyncTradingBot` instances in one event loop.
+
+    Bots are kept in a priority queue keyed on their next due time; a due bot runs one cycle as a task
+    and is put back with its `next_cycle_delay` (or immediately, if the cycle asked to retry without sleeping).
+    """
+
+    def __init__(self: Self, bots: Sequence[AsyncTradingBot], exchange_pool: ExchangePool | None = None) -> None:
+        """
+        Initialize orchestrator
+
+        :param bots: bots to schedule
+        :param exchange_pool: pool the bots' exchanges come from (closed on exit)
+        """
+
+        self.bots: list[AsyncTradingBot] = list(bots)
+        self.exchange_pool: ExchangePool | None = exchange_pool
+        self.queue: list[tuple[float, int]] = []
+        self.running: set[asyncio.Task] = set()
+        self.cycles: int = 0
+
+    @classmethod
+    def from_config(cls, config_file_path: str, output_integration: OutputIntegration) -> Self:
+        """
+        Create bots from a json list of pairs, e.g.
+        `[{"env": "main.env", "predictions": "pandas.env", "overrides": {"TRADING_PAIR": "BTC/USDT"}}]`
+
+        :param config_file_path: json file
+        :param output_integration: where messages of all bots go
+        :return: Orchestrator instance
+        """
+
+        with open(config_file_path, "r") as file:
+            pairs: list[dict[str, Any]] = json.load(file)
+
+        directory: str = os.path.dirname(os.path.abspath(config_file_path))
+        exchange_pool: ExchangePool = ExchangePool()
+        bots: list[AsyncTradingBot] = []
+        for pair in pairs:
+            env_file_path: str = os.path.join(directory, pair["env"])
+            predictions_env_path: str = os.path.join(directory, pair["predictions"])
+            with scoped_environment([env_file_path, predictions_env_path], pair.get("overrides")):
+                bots.append(AsyncTradingBot(
+                    prediction_api=PredictionApp(env_file_path=predictions_env_path).predict_up_or_down,
+                    output_integration=output_integration,
+                    env_file_path=env_file_path,
+                    exchange=exchange_pool.get()
+                ))
+
+        # Pairs of one account spend the same balances and the same request budget
+        for exchange in exchange_pool.exchanges.values():
+            sharing: list[AsyncTradingBot] = [bot for bot in bots if bot.exchange is exchange]
+            AccountBook.share_balances([bot.account for bot in sharing])
+            for bot in sharing:
+                if bot.scheduler:
+                    bot.scheduler.share_budget(len(sharing))
+
+        return cls(bots, exchange_pool)
+
+    async def _cycle(self: Self, index: int, wakeup: asyncio.Event) -> None:
+        """
+        Run one cycle of a bot and reschedule it
+
+        :param index: bot index
+        :param wakeup: event to notify the scheduler with
+        :return: None
+        """
+
+        bot: AsyncTradingBot = self.bots[index]
+        needs_sleep: bool = await bot.cycle()
+        self.cycles += 1
+        delay: float = bot.next_cycle_delay() if needs_sleep else 0.0
+        heapq.heappush(self.queue, (asyncio.get_running_loop().time() + delay, index))
+        wakeup.set()
+
+    async def run(self: Self, max_cycles: int | None = None) -> None:
+        """
+        Schedule bots until interrupted (or until `max_cycles` cycles have finished)
+
+        :param max_cycles: optional limit of cycles (all bots together)
+        :return: None
+        """
+
+        loop: asyncio.AbstractEventLoop = asyncio.get_running_loop()
+        wakeup: asyncio.Event = asyncio.Event()
+        self.queue = [(loop.time(), index) for index in range(len(self.bots))]
+        heapq.heapify(self.queue)
+        for bot in self.bots:
+            bot.output_start_message()
+
+        try:
+            while max_cycles is None or self.cycles < max_cycles:
+                wakeup.clear()
+                if self.queue and self.queue[0][0] <= loop.time():
+                    _, index = heapq.heappop(self.queue)
+                    task: asyncio.Task = asyncio.create_task(self._cycle(index, wakeup))
+                    self.running.add(task)
+                    task.add_done_callback(self.running.discard)
+                    continue
+
+                timeout: float | None = self.queue[0][0] - loop.time() if self.queue else None
+                try:
+                    await asyncio.wait_for(wakeup.wait(), timeout)
+                except TimeoutError:
+                    pass
+
+        except KeyboardInterrupt:
+            print("[END]\tEND `orchestrator` on KeyboardInterrupt.")
+
+        # Cancellation must reach the canceller (bots are cancelled and the pool is closed first)
+        except asyncio.CancelledError:
+            print("[END]\tEND `orchestrator` on cancellation.")
+            raise
+
+        finally:
+            for task in self.running:
+                task.cancel()
+            await asyncio.gather(*self.running, return_exceptions=True)
+            if self.exchange_pool:
+                await self.exchange_pool.close()
+
+        print("[END]\t👋🏻 END `orchestrator`.")
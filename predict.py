@@ -6,18 +6,29 @@ Prediction module
 @PythonVersion: 3.13
 
 """
+import hashlib
 import json
+import re
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from os.path import dirname, join
 from os import getenv
-from typing import Any, Self, Callable, Literal
+from typing import Any, Self, Callable, Literal, Mapping
 
+import httpx
 import numpy as np
 import pandas as pd
 from dotenv import load_dotenv
 from openai import OpenAI as LlmClient
-from openai.types.chat import ChatCompletion
+from openai.types.chat import ChatCompletion, ChatCompletionMessage
 from openai.types.chat.chat_completion import Choice
 from stockstats import StockDataFrame
 
+from config import scoped_environment
+from indicators import StreamingSignalEngine, crossover_signals, ohlcv_columns, parse_indicator_name
+from prediction_cache import PredictionCache
+from prompt_encoding import PromptEncoding
+
 
 # Future ideas
 # from strategies import Strategy
@@ -29,6 +40,25 @@ class PredictionApp:
 
     """
 
+    # Long-lived LLM clients (one keep-alive connection pool per endpoint, key and timeouts), shared by instances
+    LLM_CLIENTS: dict[tuple[str, str, float, float, int], LlmClient] = {}
+    LLM_CLIENTS_LOCK: threading.Lock = threading.Lock()
+
+    # Requests run here, so that a slow provider can be abandoned at the deadline
+    LLM_EXECUTOR: ThreadPoolExecutor = ThreadPoolExecutor(max_workers=8, thread_name_prefix="llm")
+
+    # Members of an ensemble run here, so that the slowest one can be left behind at the deadline
+    ENSEMBLE_EXECUTOR: ThreadPoolExecutor = ThreadPoolExecutor(max_workers=8, thread_name_prefix="ensemble")
+
+    # Batchers shared by instances with the same LLM settings (see `PredictionBatcher`)
+    LLM_BATCHERS: dict[str, "PredictionBatcher"] = {}
+
+    # Answer whose first word is complete: followed by whitespace or punctuation (a dot only if no digit follows)
+    FIRST_WORD_PATTERN: re.Pattern = re.compile(r"^\s*\S+?(?:\s|[,;:!?]|\.(?=\D))")
+
+    # `<label>: <answer>` line of a batch answer (markdown decoration tolerated)
+    BATCH_ANSWER_PATTERN: re.Pattern = re.compile(r"^[\s*#`>-]*([^\s:*`]+)[\s*`]*[:=]\s*(.+?)\s*$")
+
     def __init__(self: Self, env_file_path: str = None) -> None:
         """
         Initialize prediction app class instance
@@ -48,6 +78,29 @@ class PredictionApp:
             self.llm_api_key: str = getenv("LLM_API_KEY")
             self.llm_model: str = getenv("LLM_MODEL")
 
+            # Timeouts in seconds: connection, read (between bytes) and the whole prediction ("hold" after it)
+            self.llm_connect_timeout: float = float(getenv("LLM_CONNECT_TIMEOUT", 5))
+            self.llm_read_timeout: float = float(getenv("LLM_READ_TIMEOUT", 30))
+            self.llm_deadline: float = float(getenv("LLM_DEADLINE", 30))
+            self.llm_max_retries: int = int(getenv("LLM_MAX_RETRIES", 1))
+
+            # Stream answers and close the stream after the first word (all that predictions need)
+            self.llm_stream: bool = getenv("LLM_STREAM", "false").lower() == "true"
+
+            # Concurrent single-window predictions are coalesced into one request (linger 0 disables)
+            self.llm_batch_linger: float = float(getenv("LLM_BATCH_LINGER", 0))
+            self.llm_batch_max: int = int(getenv("LLM_BATCH_MAX", 16))
+
+            # How candle windows are written into prompts (`raw` or `compact`)
+            self.prompt_encoding: PromptEncoding = PromptEncoding.from_env()
+
+            # Answers for an unchanged candle window are reused (size 0 disables, directory enables disk tier)
+            self.llm_cache: PredictionCache | None = None
+            if (llm_cache_size := int(getenv("LLM_CACHE_SIZE", 256))) > 0:
+                self.llm_cache = PredictionCache(max_entries=llm_cache_size,
+                                                 ttl=float(getenv("LLM_CACHE_TTL", 300)),
+                                                 directory=getenv("LLM_CACHE_DIR") or None)
+
         match self.prediction_api:
             case "LLM":
                 self.pre_prompt: str = "Predict UP or DOWN, or HOLD (no other information)"
@@ -72,6 +125,43 @@ class PredictionApp:
                 self.wait_for_n_signal_lags: int = int(getenv("PREDICTION_GLOBAL_SIGNAL_LAG"))
                 self.df: pd.DataFrame | None = None
 
+                # `stockstats` (default) recomputes the whole window with stockstats,
+                # `numpy` recomputes it with NumPy kernels, `streaming` updates state per candle
+                # (seeded once from the first window instead of every window, so `ema` and `sma` signals may differ)
+                self.pandas_engine: str = getenv("PREDICTION_PANDAS_ENGINE", "stockstats")
+                self.streaming_engine: StreamingSignalEngine | None = None
+                try:
+                    match self.pandas_engine:
+                        case "streaming":
+                            self.streaming_engine = StreamingSignalEngine(
+                                price_type_column_name=self.price_type_column_name,
+                                indicators=sorted(self.indicators),
+                                wait_for_n_signal_lags=self.wait_for_n_signal_lags
+                            )
+                        case "numpy":
+                            for name in (self.price_type_column_name, *self.indicators):
+                                parse_indicator_name(name)
+
+                except ValueError as error:
+                    print(f"\t[WARN]\t`{self.pandas_engine}` engine not available, using stockstats: {error}")
+                    self.pandas_engine = "stockstats"
+
+            case "ENSEMBLE":
+                # Members are configured by their own .env files (relative to this one), e.g.
+                # `[{"predictions": "llm.env", "weight": 1}, {"predictions": "pandas.env", "weight": 2}]`
+                directory: str = dirname(env_file_path) if env_file_path else ""
+                self.ensemble_deadline: float = float(getenv("ENSEMBLE_DEADLINE", 10))
+                self.ensemble_threshold: float = float(getenv("ENSEMBLE_THRESHOLD", 0.5))
+                self.ensemble_members: list[tuple[str, Callable[[Any], str], float]] = []
+                self.ensemble_futures: dict[str, Future] = {}
+                for member in json.loads(getenv("ENSEMBLE_MEMBERS_JSON")):
+                    member_path: str = join(directory, member["predictions"])
+                    with scoped_environment([member_path], member.get("overrides")):
+                        member_app: PredictionApp = PredictionApp(env_file_path=member_path)
+                    self.ensemble_members.append(
+                        (member["predictions"], member_app.predict_up_or_down, float(member.get("weight", 1.0)))
+                    )
+
             case _:
                 print(f"\t[INFO]\tAI backend NOT SUPPORTED.")
 
@@ -95,19 +185,35 @@ class PredictionApp:
 
             case "LLM":
                 print(f"\t[AI]\tUsing basic LLM ({self.llm_model})")
+                if self.llm_batch_linger > 0:
+                    return self.llm_batcher.predict
                 return self.predict_up_or_down_with_llm
 
             case "PROBABILITY_LLM":
                 print(f"\t[AI]\tUsing LLM with PROBABILITY setting ({self.llm_model}) "
                       f"with <{self.lower_prob}% and >{self.upper_prob}%")
+                if self.llm_batch_linger > 0:
+                    return self.llm_batcher.predict
                 return self.predict_probability_with_llm
 
             case "PANDAS":
                 print(f"\t[AI]\tUsing Pandas: price/short-trend "
-                      f"`{self.price_type_column_name}` OVER {self.indicators}.")
+                      f"`{self.price_type_column_name}` OVER {self.indicators} "
+                      f"({self.pandas_engine} engine).")
+                match self.pandas_engine:
+                    case "streaming":
+                        return self.predict_pandas_streaming
+                    case "numpy":
+                        return self.predict_pandas_numpy
+
                 pd.options.mode.copy_on_write = True
                 return self.predict_pandas
 
+            case "ENSEMBLE":
+                print(f"\t[AI]\tUsing ensemble of {[name for name, _, _ in self.ensemble_members]} "
+                      f"(deadline {self.ensemble_deadline} seconds, threshold {self.ensemble_threshold}).")
+                return self.predict_ensemble
+
             case _:
                 print("\t[AI]\tUsing default predictor.")
                 return self.predict_default
@@ -206,46 +312,302 @@ class PredictionApp:
 
         return "hold"
 
-    def predict_with_any_llm(self: Self, data: Any) -> Choice | None:
+    def predict_pandas_numpy(self: Self, data: Any) -> Literal["up", "down", "hold"]:
         """
+        Same signals as `predict_pandas`, computed with NumPy kernels instead of stockstats
 
-        :param data: data of any type to convert into str, and then feed into LLM
-        :return:
+        :param data: ccxt OHLCV rows or a float array of shape (n, 6)
+        :return: str instance of "up", "down", "hold"
         """
 
-        cleaned = str(data)
-        data_cleaned: str = cleaned.replace(
-            "[", "").replace("]", "")
+        signal_buy, signal_sell = crossover_signals(
+            columns=ohlcv_columns(data),
+            price_type_column_name=self.price_type_column_name,
+            indicators=sorted(self.indicators),
+            wait_for_n_signal_lags=self.wait_for_n_signal_lags
+        )
+
+        if len(signal_buy) and signal_buy[-1]:
+            return "up"
+
+        if len(signal_sell) and signal_sell[-1]:
+            return "down"
+
+        return "hold"
+
+    def predict_pandas_streaming(self: Self, data: Any) -> Literal["up", "down", "hold"]:
+        """
+        Signals of `predict_pandas`, but only new candles are processed (see `StreamingSignalEngine`).
+        Indicators carry on over the whole history instead of restarting on every `DATA_VECTOR_LENGTH` window:
+        `kama` signals are the same, `ema` and `sma` ones occasionally differ from the windowed engines.
+
+        :param data: ccxt OHLCV rows (oldest first)
+        :return: str instance of "up", "down", "hold"
+        """
+
+        return self.streaming_engine.predict(data)
+
+    def predict_ensemble(self: Self, data: Any) -> Literal["up", "down", "hold"]:
+        """
+        Run all ensemble members concurrently and vote with whatever has arrived by the deadline.
+
+        Score is (weight of "up" - weight of "down") / weight of all members, so late or failed members count as
+        "hold"; the result is "up" at or above the threshold, "down" at or below its negative, "hold" otherwise.
+        A member still running since an earlier call is skipped (and counted late): members aren't thread-safe
+        (e.g. `StreamingSignalEngine`), and late ones must not pile up in the executor.
+
+        :param data: OHLCV window
+        :return: "up", "down", "hold"
+        """
+
+        futures: dict[Future, tuple[str, float]] = {}
+        skipped: int = 0
+        for name, predictor, weight in self.ensemble_members:
+            previous: Future | None = self.ensemble_futures.get(name)
+            if previous is not None and not previous.done():
+                skipped += 1
+                continue
+
+            self.ensemble_futures[name] = self.ENSEMBLE_EXECUTOR.submit(predictor, data)
+            futures[self.ensemble_futures[name]] = (name, weight)
+
+        done, not_done = wait(futures, timeout=self.ensemble_deadline)
+        for future in not_done:
+            future.cancel()
+
+        votes: dict[str, str] = {}
+        score: float = 0.0
+        for future in done:
+            name, weight = futures[future]
+            try:
+                votes[name] = future.result()
+            except Exception as error:
+                print(f"\t[WARN]\tEnsemble member `{name}` failed: {error}")
+                continue
+
+            score += {"up": weight, "down": -weight}.get(votes[name], 0.0)
+
+        score /= sum(weight for _, _, weight in self.ensemble_members) or 1.0
+        decision: Literal["up", "down", "hold"] = "hold"
+        if score > 0 and score >= self.ensemble_threshold:
+            decision = "up"
+        elif score < 0 and score <= -self.ensemble_threshold:
+            decision = "down"
+
+        print(f"\t[AI]\tEnsemble votes {votes} ({len(not_done) + skipped} late), score {score:.2f}: {decision}")
+        return decision
+
+    @property
+    def llm_client(self: Self) -> LlmClient:
+        """
+        Pooled client for this instance's endpoint (created once per process)
+
+        :return: openai client
+        """
+
+        key: tuple[str, str, float, float, int] = (self.base_url, self.llm_api_key, self.llm_connect_timeout,
+                                                   self.llm_read_timeout, self.llm_max_retries)
+        with self.LLM_CLIENTS_LOCK:
+            if key not in self.LLM_CLIENTS:
+                self.LLM_CLIENTS[key] = LlmClient(
+                    api_key=self.llm_api_key,
+                    base_url=self.base_url,
+                    timeout=httpx.Timeout(self.llm_read_timeout, connect=self.llm_connect_timeout),
+                    max_retries=self.llm_max_retries,
+                    http_client=httpx.Client(
+                        limits=httpx.Limits(max_keepalive_connections=8, keepalive_expiry=300)
+                    )
+                )
+
+            return self.LLM_CLIENTS[key]
+
+    @property
+    def llm_batcher(self: Self) -> "PredictionBatcher":
+        """
+        Batcher shared by all instances with the same LLM settings (e.g. orchestrated pairs)
+
+        :return: PredictionBatcher instance
+        """
+
+        key: str = PredictionCache.make_key(self.prediction_api, self.base_url, self.llm_api_key, self.llm_model,
+                                            self.pre_prompt, self.prompt_encoding, getattr(self, "lower_prob", None),
+                                            getattr(self, "upper_prob", None))
+        with self.LLM_CLIENTS_LOCK:
+            if key not in self.LLM_BATCHERS:
+                print(f"\t[AI]\tBatching predictions (up to {self.llm_batch_max} windows, "
+                      f"{self.llm_batch_linger} seconds linger).")
+                self.LLM_BATCHERS[key] = PredictionBatcher(self, self.llm_batch_linger, self.llm_batch_max)
+
+            return self.LLM_BATCHERS[key]
+
+    @staticmethod
+    def window_fingerprint(data: Any, prompt: str) -> str:
+        """
+        Digest of the candle window, independent of its container (ccxt lists or candle store arrays)
+
+        :param data: OHLCV window
+        :param prompt: prompt text, used for data that is not numeric
+        :return: hex digest
+        """
 
         try:
-            chatbot: LlmClient = LlmClient(
-                api_key=self.llm_api_key,
-                base_url=self.base_url
-            )
+            window: np.ndarray = np.ascontiguousarray(data, dtype=np.float64)
+            return hashlib.sha256(str(window.shape).encode() + window.tobytes()).hexdigest()
+        except (TypeError, ValueError):
+            return hashlib.sha256(prompt.encode()).hexdigest()
+
+    def _cache_key(self: Self, system_prompt: str, data: Any, encoded: str) -> str | None:
+        """
+        Answer cache key of a window (None if the cache is disabled)
+
+        :param system_prompt: system prompt the answer was given for
+        :param data: OHLCV window
+        :param encoded: window as prompt text
+        :return: key or None
+        """
+
+        if self.llm_cache is None:
+            return None
+
+        return PredictionCache.make_key(self.prediction_api, self.base_url, self.llm_model,
+                                        system_prompt, self.prompt_encoding, self.window_fingerprint(data, encoded))
+
+    def _stream_first_word(self: Self, messages: list[dict[str, str]], stop: threading.Event) -> Choice:
+        """
+        Streamed completion that is closed as soon as the first word of the answer is complete
+
+        :param messages: chat messages
+        :param stop: set by the caller to abandon the stream (e.g. after the deadline)
+        :return: choice with the text received so far
+        """
+
+        content: str = ""
+        with self.llm_client.chat.completions.create(model=self.llm_model, n=1, messages=messages,
+                                                     stream=True) as stream:
+            for chunk in stream:
+                if chunk.choices and chunk.choices[0].delta.content:
+                    content += chunk.choices[0].delta.content
+                    if self.FIRST_WORD_PATTERN.match(content):
+                        break
+
+                if stop.is_set():
+                    break
+
+        return Choice(index=0, finish_reason="stop", message=ChatCompletionMessage(role="assistant", content=content))
+
+    def _complete(self: Self, system_prompt: str, user_prompt: str, first_word: bool = False) -> Choice | None:
+        """
+        Single chat completion within the deadline
+
+        :param system_prompt: instructions
+        :param user_prompt: encoded data
+        :param first_word: stream the answer and stop after its first word (see `LLM_STREAM`)
+        :return: first choice, or None on deadline or error
+        """
+
+        messages: list[dict[str, str]] = [
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": user_prompt}
+        ]
+        stop: threading.Event = threading.Event()
+        future: Future | None = None
+        try:
+            if first_word:
+                future = self.LLM_EXECUTOR.submit(self._stream_first_word, messages, stop)
+                return future.result(timeout=self.llm_deadline)
 
-            completions: ChatCompletion = chatbot.chat.completions.create(
+            future = self.LLM_EXECUTOR.submit(
+                self.llm_client.chat.completions.create,
                 model=self.llm_model,
                 n=1,
-                messages=[
-                    {"role": "system", "content": self.pre_prompt},
-                    {"role": "user", "content": data_cleaned}
-                ]
+                messages=messages
             )
-            choice: Choice = completions.choices[0]
+            completions: ChatCompletion = future.result(timeout=self.llm_deadline)
+            return completions.choices[0]
+
+        except TimeoutError:
+            # The request is left to its read timeout in the background (a stream is closed at its next chunk)
+            stop.set()
+            future.cancel()
+            print(f"\t[INFO]\tLLM missed the deadline ({self.llm_deadline} seconds), holding.")
 
         except BaseException as error:
             print(f"\t[INFO]\tLLM not responding for some reason:\n\t\t{error}")
-            return None
 
-        else:
-            del chatbot, completions
+        return None
 
-        finally:
+    def predict_with_any_llm(self: Self, data: Any) -> Choice | None:
+        """
 
-            del cleaned, data_cleaned
+        :param data: data of any type to convert into str, and then feed into LLM
+        :return:
+        """
+
+        # Candle store windows are float arrays, the prompt stays the same as for ccxt lists
+        if isinstance(data, np.ndarray):
+            data = data.tolist()
+
+        data_cleaned: str = self.prompt_encoding.encode(data)
+        system_prompt: str = f"{self.pre_prompt} {self.prompt_encoding.describe()}".strip()
+
+        cache_key: str | None = self._cache_key(system_prompt, data, data_cleaned)
+        if cache_key is not None and (answer := self.llm_cache.get(cache_key)) is not None:
+            return Choice(index=0, finish_reason="stop",
+                          message=ChatCompletionMessage(role="assistant", content=answer))
+
+        choice: Choice | None = self._complete(system_prompt, data_cleaned, first_word=self.llm_stream)
+        if cache_key is not None and choice is not None and choice.message.content is not None:
+            self.llm_cache.put(cache_key, choice.message.content)
 
         return choice
 
+    def parse_probability_answer(self: Self, content: str) -> Literal["up", "down", "hold"] | None:
+        """
+        Decision from a probability answer
+
+        :param content: answer text
+        :return: "up", "down", "hold", or None if the answer isn't a number
+        """
+
+        content = content.strip()
+        if len(x := content.split()):
+            content = x[0]
+        try:
+            f = float(content)
+        except ValueError as error:
+            print(f"\t[WARN]\t Prediction AI can't supply needed data format: {error}")
+            return None
+
+        print(f"\t[AI]\tProbability of uptrend: {f}%")
+        if 0.0 <= f <= self.lower_prob:
+            return "down"
+
+        if self.upper_prob <= f <= 100.0:
+            return "up"
+
+        return "hold"
+
+    @staticmethod
+    def parse_up_or_down_answer(content: str) -> Literal["up", "down", "hold"] | None:
+        """
+        Decision from an UP/DOWN/HOLD answer
+
+        :param content: answer text
+        :return: "up", "down", "hold", or None if the answer is none of them
+        """
+
+        content = content.strip().replace("\n", "").replace(".", "").lower()
+        if len(x := content.split()):
+            match x[0]:
+                case "up":
+                    return "up"
+                case "down":
+                    return "down"
+                case "hold":
+                    return "hold"
+
+        return None
+
     def predict_probability_with_llm(self: Self,
                                      data: Any) -> Literal["up", "down", "hold"]:
         """
@@ -257,19 +619,7 @@ class PredictionApp:
 
         res: Choice | None = self.predict_with_any_llm(data=data)
         if res:
-            content: str = res.message.content.strip()
-            if len(x := content.split()):
-                content = x[0]
-            try:
-                f = float(content)
-                print(f"\t[AI]\tProbability of uptrend: {f}%")
-                if 0.0 <= f <= self.lower_prob:
-                    return "down"
-
-                if self.upper_prob <= f <= 100.0:
-                    return "up"
-            except ValueError as error:
-                print(f"\t[WARN]\t Prediction AI can't supply needed data format: {error}")
+            return self.parse_probability_answer(res.message.content or "") or "hold"
 
         return "hold"
 
@@ -283,15 +633,151 @@ class PredictionApp:
 
         choice: Choice | None = self.predict_with_any_llm(data=data)
         if choice:
-            content: str = choice.message.content.strip().replace(
-                "\n", "").replace(".", "").lower()
-            if len(x := content.split()):
-                content = x[0]
-
-                match content.lower():
-                    case "up":
-                        return "up"
-                    case "down":
-                        return "down"
+            return self.parse_up_or_down_answer(choice.message.content or "") or "hold"
 
         return "hold"
+
+    def predict_batch(self: Self, windows: Mapping[str, Any]) -> dict[str, Literal["up", "down", "hold"]]:
+        """
+        Predict several windows (e.g. one per symbol) with a single LLM request.
+
+        Every window follows a `### <label>` line and the model answers `<label>: <answer>` per line.
+        Windows without a usable answer are asked about one by one (concurrently); if the batch request
+        itself fails, they all hold. Other backends simply predict window by window.
+
+        :param windows: label (e.g. symbol) -> OHLCV window
+        :return: label -> "up", "down", "hold"
+        """
+
+        match self.prediction_api:
+            case "LLM":
+                parse: Callable[[str], str | None] = self.parse_up_or_down_answer
+                predict_single: Callable[[Any], str] = self.predict_up_or_down_with_llm
+            case "PROBABILITY_LLM":
+                parse: Callable[[str], str | None] = self.parse_probability_answer
+                predict_single: Callable[[Any], str] = self.predict_probability_with_llm
+            case _:
+                predictor: Callable[[Any], str] = self.predict_up_or_down
+                return {label: predictor(window) for label, window in windows.items()}
+
+        system_prompt: str = " ".join(part for part in (
+            self.pre_prompt, self.prompt_encoding.describe(),
+            "Several candle windows follow, each after a `### <label>` line. "
+            "Answer every window on its own line as `<label>: <answer>`."
+        ) if part)
+
+        predictions: dict[str, str] = {}
+        answers: dict[str, str] = {}
+        pending: dict[str, tuple[str, str | None]] = {}
+        for label, window in windows.items():
+            if isinstance(window, np.ndarray):
+                window = window.tolist()
+            encoded: str = self.prompt_encoding.encode(window)
+            cache_key: str | None = self._cache_key(system_prompt, window, encoded)
+            if cache_key is not None and (answer := self.llm_cache.get(cache_key)) is not None:
+                answers[label] = answer
+            else:
+                pending[label] = (encoded, cache_key)
+
+        if pending:
+            choice: Choice | None = self._complete(system_prompt, "\n".join(
+                f"### {label}\n{encoded}" for label, (encoded, _) in pending.items()
+            ))
+            if choice is None:
+                predictions.update((label, "hold") for label in pending)
+
+            else:
+                labels: dict[str, str] = {label.upper(): label for label in pending}
+                for line in (choice.message.content or "").splitlines():
+                    if (match := self.BATCH_ANSWER_PATTERN.match(line)) and match[1].upper() in labels:
+                        answers[labels[match[1].upper()]] = match[2]
+
+        for label, answer in answers.items():
+            if (decision := parse(answer)) is not None:
+                predictions[label] = decision
+                if label in pending and pending[label][1] is not None:
+                    self.llm_cache.put(pending[label][1], answer)
+
+        if missing := [label for label in windows if label not in predictions]:
+            print(f"\t[WARN]\tNo usable batch answer for {missing}, asking one by one.")
+            with ThreadPoolExecutor(max_workers=len(missing)) as executor:
+                predictions.update(zip(missing, executor.map(predict_single, (windows[label] for label in missing))))
+
+        return {label: predictions[label] for label in windows}
+
+
+class PredictionBatcher:
+    """
+    Coalesces single-window predictions of concurrent callers into `PredictionApp.predict_batch` requests:
+    a batch is sent `linger` seconds after its first window arrives, or as soon as it is full.
+    """
+
+    def __init__(self: Self, prediction_app: PredictionApp, linger: float, max_size: int = 16) -> None:
+        """
+        Initialize batcher
+
+        :param prediction_app: app sending the batches
+        :param linger: seconds to wait for more windows
+        :param max_size: windows per request
+        """
+
+        self.prediction_app: PredictionApp = prediction_app
+        self.linger: float = linger
+        self.max_size: int = max(1, max_size)
+        self.pending: list[tuple[Any, Future]] = []
+        self.lock: threading.Lock = threading.Lock()
+        self.timer: threading.Timer | None = None
+
+    def predict(self: Self, data: Any) -> Literal["up", "down", "hold"]:
+        """
+        Predictor function (blocks until the batch with this window is answered)
+
+        :param data: OHLCV window
+        :return: "up", "down", "hold"
+        """
+
+        future: Future = Future()
+        batch: list[tuple[Any, Future]] = []
+        with self.lock:
+            self.pending.append((data, future))
+            if len(self.pending) >= self.max_size:
+                batch = self._take()
+            elif self.timer is None:
+                self.timer = threading.Timer(self.linger, self.flush)
+                self.timer.daemon = True
+                self.timer.start()
+
+        if batch:
+            self._send(batch)
+        return future.result()
+
+    def _take(self: Self) -> list[tuple[Any, Future]]:
+        if self.timer is not None:
+            self.timer.cancel()
+            self.timer = None
+        batch, self.pending = self.pending, []
+        return batch
+
+    def flush(self: Self) -> None:
+        """
+        Send whatever is pending
+
+        :return: None
+        """
+
+        with self.lock:
+            batch: list[tuple[Any, Future]] = self._take()
+        if batch:
+            self._send(batch)
+
+    def _send(self: Self, batch: list[tuple[Any, Future]]) -> None:
+        predictions: dict[str, str] = {}
+        try:
+            predictions = self.prediction_app.predict_batch(
+                {f"W{index + 1}": data for index, (data, _) in enumerate(batch)}
+            )
+        except Exception as error:
+            print(f"\t[WARN]\tBatch prediction failed, holding:\n\t\t{error}")
+
+        for index, (_, future) in enumerate(batch):
+            future.set_result(predictions.get(f"W{index + 1}", "hold"))
@@ -0,0 +1,144 @@
+"""
+Prediction cache module
+
+@Developer: Stan
+@ModuleVersion: 1.0.0
+@PythonVersion: 3.13
+
+"""
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from os import PathLike
+from typing import Any, Self
+
+from telemetry import METRICS, Metrics
+
+
+class PredictionCache:
+    """
+    Bounded LRU cache of LLM answers with a time-to-live and an optional on-disk (sqlite) tier.
+
+    Keys are hashes of everything that defines an answer (backend, model, prompt and the encoded candle window),
+    so a repeated window is answered without calling the provider.
+    Hits, misses, evictions and the size are published as metrics.
+    """
+
+    def __init__(self: Self,
+                 max_entries: int = 256,
+                 ttl: float = 300.0,
+                 directory: str | PathLike | None = None,
+                 metrics: Metrics = METRICS) -> None:
+        """
+        Initialize cache
+
+        :param max_entries: in-memory capacity (least recently used entries are dropped)
+        :param ttl: seconds an answer stays valid
+        :param directory: optional directory for the on-disk tier (survives restarts)
+        :param metrics: where hits, misses, evictions and the size are published
+        """
+
+        self.max_entries: int = max_entries
+        self.ttl: float = ttl
+        self.entries: OrderedDict[str, tuple[str, float]] = OrderedDict()
+        self.lock: threading.Lock = threading.Lock()
+        self.hits: int = 0
+        self.disk_hits: int = 0
+        self.misses: int = 0
+        self.evictions: int = 0
+        self.metrics: Metrics = metrics
+
+        self.database: sqlite3.Connection | None = None
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+            self.database = sqlite3.connect(os.path.join(directory, "llm_cache.sqlite3"), check_same_thread=False)
+            self.database.execute("CREATE TABLE IF NOT EXISTS answers "
+                                  "(key TEXT PRIMARY KEY, answer TEXT NOT NULL, created REAL NOT NULL)")
+            self.database.execute("DELETE FROM answers WHERE created < ?", (time.time() - ttl,))
+            self.database.commit()
+
+    @staticmethod
+    def make_key(*parts: Any) -> str:
+        """
+        Fingerprint of the request
+
+        :param parts: json-serializable parts (backend, model, prompt, encoded window, ...)
+        :return: hex digest
+        """
+
+        return hashlib.sha256(json.dumps(parts, default=str).encode()).hexdigest()
+
+    def get(self: Self, key: str) -> str | None:
+        """
+        Cached answer, if still valid
+
+        :param key: output of `make_key`
+        :return: answer or None
+        """
+
+        now: float = time.time()
+        with self.lock:
+            if key in self.entries:
+                answer, created = self.entries[key]
+                if now - created <= self.ttl:
+                    self.entries.move_to_end(key)
+                    self.hits += 1
+                    self.metrics.increment("llm_cache_hits", tier="memory")
+                    return answer
+
+                del self.entries[key]
+
+            if self.database is not None:
+                row: tuple | None = self.database.execute(
+                    "SELECT answer, created FROM answers WHERE key = ? AND created >= ?", (key, now - self.ttl)
+                ).fetchone()
+                if row:
+                    self._remember(key, row[0], row[1])
+                    self.disk_hits += 1
+                    self.metrics.increment("llm_cache_hits", tier="disk")
+                    return row[0]
+
+            self.misses += 1
+            self.metrics.increment("llm_cache_misses")
+            return None
+
+    def put(self: Self, key: str, answer: str) -> None:
+        """
+        Store an answer
+
+        :param key: output of `make_key`
+        :param answer: text answer of the model
+        :return: None
+        """
+
+        now: float = time.time()
+        with self.lock:
+            self._remember(key, answer, now)
+            if self.database is not None:
+                self.database.execute("INSERT OR REPLACE INTO answers VALUES (?, ?, ?)", (key, answer, now))
+                self.database.commit()
+
+    def _remember(self: Self, key: str, answer: str, created: float) -> None:
+        self.entries[key] = (answer, created)
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+            self.evictions += 1
+            self.metrics.increment("llm_cache_evictions")
+        self.metrics.set_gauge("llm_cache_entries", len(self.entries))
+
+    @property
+    def stats(self: Self) -> dict[str, int]:
+        """
+        Counters since start
+
+        :return: dict with hits (memory), disk_hits, misses, evictions and size
+        """
+
+        with self.lock:
+            return {"hits": self.hits, "disk_hits": self.disk_hits, "misses": self.misses,
+                    "evictions": self.evictions, "size": len(self.entries)}
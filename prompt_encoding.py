@@ -0,0 +1,167 @@
+"""
+Prompt encoding module (how candle windows are written into LLM prompts)
+
+@Developer: Stan
+@ModuleVersion: 1.0.0
+@PythonVersion: 3.13
+
+"""
+import time
+from dataclasses import dataclass, replace
+from os import getenv
+from typing import Any, Literal, Self, Sequence
+
+import numpy as np
+import pandas as pd
+
+
+PRICE_COLUMNS: tuple[str, ...] = ("open", "high", "low", "close")
+PROMPT_COLUMNS: tuple[str, ...] = ("time", *PRICE_COLUMNS, "volume")
+
+
+@dataclass(frozen=True)
+class PromptEncoding:
+    """
+    Text encoding of an OHLCV window.
+
+    `raw` is the original `str(data)` without brackets. `compact` writes CSV rows with a header, time as minutes
+    since the first candle (or epoch ms), a fixed number of significant digits, optionally prices as percent change
+    from the first close, and only the selected columns.
+    """
+
+    kind: Literal["raw", "compact"] = "raw"
+    significant_digits: int = 5
+    relative_time: bool = True
+    percent_deltas: bool = False
+    columns: tuple[str, ...] = PROMPT_COLUMNS
+
+    @classmethod
+    def from_env(cls) -> Self:
+        """
+        Encoding from `LLM_PROMPT_*` variables (unknown columns are ignored)
+
+        :return: PromptEncoding instance
+        """
+
+        columns: tuple[str, ...] = tuple(
+            column for column in (getenv("LLM_PROMPT_COLUMNS") or ",".join(PROMPT_COLUMNS)).lower().split(",")
+            if column in PROMPT_COLUMNS
+        )
+        return cls(
+            kind="compact" if getenv("LLM_PROMPT_ENCODING", "raw").lower() == "compact" else "raw",
+            significant_digits=int(getenv("LLM_PROMPT_DIGITS", 5)),
+            relative_time=getenv("LLM_PROMPT_RELATIVE_TIME", "true").lower() == "true",
+            percent_deltas=getenv("LLM_PROMPT_PERCENT_DELTAS", "false").lower() == "true",
+            columns=columns or PROMPT_COLUMNS
+        )
+
+    def describe(self: Self) -> str:
+        """
+        Explanation of the format for the system prompt
+
+        :return: str (empty for `raw`)
+        """
+
+        if self.kind == "raw":
+            return ""
+
+        parts: list[str] = ["Candles are CSV rows with a header, oldest first."]
+        if "time" in self.columns:
+            parts.append("Time is minutes since the first candle." if self.relative_time
+                         else "Time is a Unix timestamp in milliseconds.")
+        if self.percent_deltas:
+            parts.append("Prices are percent change from the first close.")
+        return " ".join(parts)
+
+    def _number(self: Self, value: float) -> str:
+        return f"{value:.{self.significant_digits}g}"
+
+    def encode(self: Self, data: Any) -> str:
+        """
+        Write a window into prompt text
+
+        :param data: ccxt OHLCV rows (or candle store array); time may also be date strings
+        :return: str
+        """
+
+        if isinstance(data, np.ndarray):
+            data = data.tolist()
+
+        if self.kind == "raw":
+            return str(data).replace("[", "").replace("]", "")
+
+        frame: pd.DataFrame = pd.DataFrame(data, columns=list(PROMPT_COLUMNS))
+        times: pd.Series = frame["time"]
+        times = pd.to_datetime(times, unit="ms") if pd.api.types.is_numeric_dtype(times) else pd.to_datetime(times)
+        milliseconds: np.ndarray = times.to_numpy(dtype="datetime64[ms]").astype(np.int64)
+
+        prices: np.ndarray = frame[list(PRICE_COLUMNS)].to_numpy(dtype=np.float64)
+        if self.percent_deltas:
+            prices = (prices / prices[0, 3] - 1.0) * 100.0
+
+        values: dict[str, Sequence[str]] = {
+            "time": [f"{offset:g}" for offset in (milliseconds - milliseconds[0]) / 60_000]
+            if self.relative_time else [str(stamp) for stamp in milliseconds],
+            "volume": [self._number(value) for value in frame["volume"].to_numpy(dtype=np.float64)]
+        }
+        for position, column in enumerate(PRICE_COLUMNS):
+            values[column] = [self._number(value) for value in prices[:, position]]
+
+        lines: list[str] = [",".join(self.columns)]
+        lines.extend(",".join(row) for row in zip(*(values[column] for column in self.columns)))
+        return "\n".join(lines)
+
+
+def benchmark_encodings(prediction_app: Any,
+                        data: Any,
+                        encodings: dict[str, PromptEncoding] | None = None,
+                        repeats: int = 3) -> list[dict[str, Any]]:
+    """
+    Send the same window with every encoding to the configured LLM (bypassing the answer cache) and measure
+    prompt tokens as reported by the provider, round-trip latency and the answers (to compare prediction quality)
+
+    :param prediction_app: PredictionApp with an LLM backend
+    :param data: OHLCV window
+    :param encodings: name -> encoding (default: raw, compact and compact with percent deltas)
+    :param repeats: requests per encoding
+    :return: one dict per encoding
+    """
+
+    compact: PromptEncoding = PromptEncoding(kind="compact")
+    encodings = encodings or {"raw": PromptEncoding(), "compact": compact,
+                              "compact_deltas": replace(compact, percent_deltas=True)}
+    results: list[dict[str, Any]] = []
+    for name, encoding in encodings.items():
+        prompt: str = encoding.encode(data)
+        system_prompt: str = f"{prediction_app.pre_prompt} {encoding.describe()}".strip()
+        latencies: list[float] = []
+        tokens: int | None = None
+        answers: list[str] = []
+        for _ in range(repeats):
+            started: float = time.perf_counter()
+            try:
+                completion = prediction_app.llm_client.chat.completions.create(
+                    model=prediction_app.llm_model,
+                    n=1,
+                    messages=[
+                        {"role": "system", "content": system_prompt},
+                        {"role": "user", "content": prompt}
+                    ]
+                )
+            except Exception as error:
+                answers.append(f"error: {error}")
+                continue
+
+            latencies.append(time.perf_counter() - started)
+            tokens = completion.usage.prompt_tokens if completion.usage else tokens
+            answers.append((completion.choices[0].message.content or "").strip())
+
+        results.append({
+            "encoding": name,
+            "characters": len(system_prompt) + len(prompt),
+            "prompt_tokens": tokens,
+            "median_latency_ms": float(np.median(latencies)) * 1000 if latencies else None,
+            "answers": answers
+        })
+
+    return results
@@ -0,0 +1,309 @@
+"""
+Resilience module (retries with exponential backoff and jitter, per-endpoint circuit breakers)
+
+@Developer: Stan
+@ModuleVersion: 1.0.0
+@PythonVersion: 3.13
+
+"""
+import asyncio
+import random
+import threading
+import time
+from os import getenv
+from typing import Any, Awaitable, Callable, Self
+
+import ccxt
+
+from telemetry import METRICS, Metrics
+
+
+class CircuitOpenError(ccxt.NetworkError):
+    """Request not sent, the endpoint's circuit is open (handled like any other network error)"""
+
+
+class Backoff:
+    """
+    Exponential backoff with full jitter: attempt `n` waits a uniform random time in [0, min(cap, base * 2 ** n)],
+    so the first retries take milliseconds and concurrent bots don't retry in lockstep.
+    """
+
+    def __init__(self: Self, base: float = 0.05, cap: float = 60.0, generator: random.Random | None = None) -> None:
+        """
+        Initialize backoff
+
+        :param base: seconds, upper bound of the first delay
+        :param cap: seconds, upper bound of any delay
+        :param generator: random generator (reproducible delays in tests)
+        """
+
+        self.base: float = base
+        self.cap: float = cap
+        self.generator: random.Random = generator or random.Random()
+
+    def delay(self: Self, attempt: int) -> float:
+        """
+        Seconds to wait before retry number `attempt` (0-based)
+
+        :param attempt: number of failures so far minus one
+        :return: seconds
+        """
+
+        return self.generator.uniform(0.0, min(self.cap, self.base * 2 ** min(attempt, 32)))
+
+
+class CircuitBreaker:
+    """
+    Circuit breaker of one endpoint.
+
+    `closed`: requests pass, `failure_threshold` consecutive failures open the circuit. `open`: requests fail fast
+    (no request is sent) for `reset_timeout` seconds, then the circuit is `half_open`: a single probe request passes,
+    its success closes the circuit, its failure opens it again.
+    """
+
+    CLOSED: str = "closed"
+    HALF_OPEN: str = "half_open"
+    OPEN: str = "open"
+
+    # Gauge values of the states
+    STATE_VALUES: dict[str, int] = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+    def __init__(self: Self, failure_threshold: int = 5, reset_timeout: float = 30.0) -> None:
+        """
+        Initialize circuit breaker (closed)
+
+        :param failure_threshold: consecutive failures that open the circuit
+        :param reset_timeout: seconds the circuit stays open before a probe
+        """
+
+        self.failure_threshold: int = max(1, failure_threshold)
+        self.reset_timeout: float = reset_timeout
+        self.state: str = self.CLOSED
+        self.failures: int = 0
+        self.opened_at: float = 0.0
+        self.probing: bool = False
+        self.lock: threading.Lock = threading.Lock()
+
+    @property
+    def retry_after(self: Self) -> float:
+        """Seconds until the next probe is allowed (0 unless open)"""
+
+        if self.state != self.OPEN:
+            return 0.0
+        return max(0.0, self.opened_at + self.reset_timeout - time.monotonic())
+
+    def allow(self: Self) -> bool:
+        """
+        Whether a request may be sent now (turns an expired open circuit half-open, admitting one probe)
+
+        :return: bool
+        """
+
+        with self.lock:
+            if self.state == self.OPEN and time.monotonic() - self.opened_at >= self.reset_timeout:
+                self.state, self.probing = self.HALF_OPEN, False
+
+            if self.state == self.HALF_OPEN:
+                if self.probing:
+                    return False
+                self.probing = True
+                return True
+
+            return self.state == self.CLOSED
+
+    def record_success(self: Self) -> None:
+        with self.lock:
+            self.state, self.failures, self.probing = self.CLOSED, 0, False
+
+    def record_failure(self: Self) -> None:
+        with self.lock:
+            self.failures += 1
+            if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+                self.state, self.opened_at, self.probing = self.OPEN, time.monotonic(), False
+
+
+class Resilience:
+    """
+    Retries and circuit breakers of one bot, one breaker per endpoint (e.g. `fetch_order_book`, `predict`).
+
+    Network errors (ccxt `NetworkError`: timeouts, rate limits, maintenance) are retried with backoff, up to
+    `max_attempts` attempts, and count as breaker failures. Other exceptions count as failures, but aren't retried.
+    Exchange errors (ccxt `ExchangeError`: invalid order, insufficient funds...) are the exchange's answer, so they
+    neither retry nor trip the breaker. Breaker states and retries are published as metrics.
+    """
+
+    def __init__(self: Self,
+                 max_attempts: int = 4,
+                 backoff: Backoff | None = None,
+                 failure_threshold: int = 5,
+                 reset_timeout: float = 30.0,
+                 metrics: Metrics = METRICS,
+                 **labels: str) -> None:
+        """
+        Initialize resilience layer
+
+        :param max_attempts: attempts per call (1 disables retries)
+        :param backoff: delays between attempts
+        :param failure_threshold: consecutive failures that open an endpoint's circuit
+        :param reset_timeout: seconds an open circuit waits before a probe
+        :param metrics: where breaker states (`circuit_state` gauge: 0 closed, 1 half-open, 2 open), `retries` and
+                        `circuit_opens` counters go
+        :param labels: extra metric labels (e.g. `pair`)
+        """
+
+        self.max_attempts: int = max(1, max_attempts)
+        self.backoff: Backoff = backoff or Backoff()
+        self.failure_threshold: int = failure_threshold
+        self.reset_timeout: float = reset_timeout
+        self.metrics: Metrics = metrics
+        self.labels: dict[str, str] = labels
+        # Breakers are also created from cancel executor threads
+        self.lock: threading.Lock = threading.Lock()
+        self.breakers: dict[str, CircuitBreaker] = {}
+
+    @classmethod
+    def from_env(cls, cap: float, metrics: Metrics = METRICS, **labels: str) -> Self:
+        """
+        Resilience layer from `RETRIES_BEFORE_SLEEP_LIMIT`, `BACKOFF_BASE`, `CIRCUIT_FAILURE_THRESHOLD` and
+        `CIRCUIT_RESET_TIMEOUT` variables
+
+        :param cap: seconds, longest backoff (e.g. `BASE_SLEEP_TIME`)
+        :param metrics: metrics registry
+        :param labels: extra metric labels
+        :return: Resilience instance
+        """
+
+        return cls(
+            max_attempts=int(getenv("RETRIES_BEFORE_SLEEP_LIMIT") or 4),
+            backoff=Backoff(base=float(getenv("BACKOFF_BASE") or 0.05), cap=cap),
+            failure_threshold=int(getenv("CIRCUIT_FAILURE_THRESHOLD") or 5),
+            reset_timeout=float(getenv("CIRCUIT_RESET_TIMEOUT") or 30),
+            metrics=metrics,
+            **labels
+        )
+
+    def breaker(self: Self, endpoint: str) -> CircuitBreaker:
+        with self.lock:
+            if endpoint not in self.breakers:
+                self.breakers[endpoint] = CircuitBreaker(self.failure_threshold, self.reset_timeout)
+            return self.breakers[endpoint]
+
+    def states(self: Self) -> dict[str, str]:
+        """
+        Breaker state of every endpoint called so far
+
+        :return: dict of endpoint -> `closed`, `half_open` or `open`
+        """
+
+        with self.lock:
+            breakers: list[tuple[str, CircuitBreaker]] = list(self.breakers.items())
+        return {endpoint: breaker.state for endpoint, breaker in breakers}
+
+    def _admit(self: Self, endpoint: str, breaker: CircuitBreaker) -> None:
+        if not breaker.allow():
+            raise CircuitOpenError(f"Circuit of `{endpoint}` is open, next probe in {breaker.retry_after:.1f} seconds")
+        self._publish(endpoint, breaker)
+
+    def _publish(self: Self, endpoint: str, breaker: CircuitBreaker) -> None:
+        self.metrics.set_gauge("circuit_state", CircuitBreaker.STATE_VALUES[breaker.state], endpoint=endpoint,
+                               **self.labels)
+
+    def _succeeded(self: Self, endpoint: str, breaker: CircuitBreaker, result: Any,
+                   is_failure: Callable[[Any], bool] | None) -> Any:
+        if is_failure and is_failure(result):
+            self._failed(endpoint, breaker)
+        else:
+            breaker.record_success()
+            self._publish(endpoint, breaker)
+        return result
+
+    def _failed(self: Self, endpoint: str, breaker: CircuitBreaker) -> None:
+        was_open: bool = breaker.state == breaker.OPEN
+        breaker.record_failure()
+        if breaker.state == breaker.OPEN and not was_open:
+            self.metrics.increment("circuit_opens", endpoint=endpoint, **self.labels)
+        self._publish(endpoint, breaker)
+
+    def _retry_delay(self: Self, endpoint: str, breaker: CircuitBreaker, error: Exception, attempt: int,
+                     attempts: int) -> float:
+        """
+        Record a failed attempt
+
+        :return: seconds to wait before the next attempt (the error is re-raised if there is none)
+        """
+
+        if isinstance(error, ccxt.ExchangeError):
+            breaker.record_success()
+            self._publish(endpoint, breaker)
+            raise error
+
+        self._failed(endpoint, breaker)
+        if not isinstance(error, ccxt.NetworkError) or attempt + 1 >= attempts:
+            raise error
+
+        self.metrics.increment("retries", endpoint=endpoint, **self.labels)
+        return self.backoff.delay(attempt)
+
+    def call(self: Self,
+             endpoint: str,
+             function: Callable[..., Any],
+             *args: Any,
+             retry: bool = True,
+             is_failure: Callable[[Any], bool] | None = None,
+             **kwargs: Any) -> Any:
+        """
+        Call `function(*args, **kwargs)` through the endpoint's breaker, retrying network errors
+
+        :param endpoint: breaker name
+        :param function: request
+        :param retry: retry network errors (disable for requests that must not be repeated, e.g. `create_order`)
+        :param is_failure: marks a returned result as failure (e.g. no prediction), it's returned anyway
+        :return: result of the request
+        """
+
+        breaker: CircuitBreaker = self.breaker(endpoint)
+        attempts: int = self.max_attempts if retry else 1
+        for attempt in range(attempts):
+            self._admit(endpoint, breaker)
+            try:
+                result: Any = function(*args, **kwargs)
+            except Exception as error:
+                time.sleep(self._retry_delay(endpoint, breaker, error, attempt, attempts))
+                continue
+            # Cancelled or interrupted (e.g. `asyncio.CancelledError`): a half-open probe must be released
+            except BaseException:
+                self._failed(endpoint, breaker)
+                raise
+            return self._succeeded(endpoint, breaker, result, is_failure)
+
+    async def call_async(self: Self,
+                         endpoint: str,
+                         function: Callable[..., Awaitable[Any]],
+                         *args: Any,
+                         retry: bool = True,
+                         is_failure: Callable[[Any], bool] | None = None,
+                         **kwargs: Any) -> Any:
+        """
+        Same as `call` for coroutine functions (backoff doesn't block the event loop)
+
+        :param endpoint: breaker name
+        :param function: coroutine function of the request
+        :param retry: retry network errors
+        :param is_failure: marks a returned result as failure
+        :return: result of the request
+        """
+
+        breaker: CircuitBreaker = self.breaker(endpoint)
+        attempts: int = self.max_attempts if retry else 1
+        for attempt in range(attempts):
+            self._admit(endpoint, breaker)
+            try:
+                result: Any = await function(*args, **kwargs)
+            except Exception as error:
+                await asyncio.sleep(self._retry_delay(endpoint, breaker, error, attempt, attempts))
+                continue
+            # Cancelled or interrupted (e.g. `asyncio.CancelledError`): a half-open probe must be released
+            except BaseException:
+                self._failed(endpoint, breaker)
+                raise
+            return self._succeeded(endpoint, breaker, result, is_failure)
@@ -9,17 +9,28 @@ Main bot module
 
 # Python default library ---------
 import argparse
+import asyncio
 import sys
-from os import PathLike
-from os.path import abspath, dirname, join
+from os import PathLike, getenv
+from os.path import abspath, basename, dirname, join, splitext
 from typing import Any, Callable
 # --------------------------------
 
+# External modules ---------------
+import ccxt
+from dotenv import load_dotenv
+# --------------------------------
+
 # Own modules --------------------
 import dashboard
+from async_trading_bot import AsyncTradingBot
+from backtest import run_backtest
+from market_feed import WebSocketFeed
+from orchestrator import Orchestrator
 from config import TestData
 from integrate_dashboard import OutputIntegration
 from predict import PredictionApp
+from prompt_encoding import benchmark_encodings
 from trading_bot import TradingBot
 # --------------------------------
 
@@ -35,7 +46,11 @@ def global_main() -> None:
         prog="run.py",
         description="run.py will place trades in accordance with specified parameters. "
                     "Use with `test` command to only run default data through prediction API; "
-                    "use with `run` command to run main functionality.",
+                    "use with `run` command to run main functionality; "
+                    "use with `backtest` command to replay history from the local candle store; "
+                    "use with `orchestrate` command to trade many pairs in one process; "
+                    "use with `prompts` command to benchmark LLM prompt encodings; "
+                    "use with `dashboard` command to serve the dashboard of bots run with `--telemetry`.",
         epilog="Extremely caution is advised, don't run the program unless knowing EXACTLY what will happen."
     )
     default_main_environment_filename = "main.env"
@@ -70,12 +85,120 @@ def global_main() -> None:
         action="store_true",
         help="Launch the app in dashboard mode (powered by Streamlit)"
     )
+    parser_run.add_argument(
+        "-a", "--asynchronous",
+        action="store_true",
+        help="Use the asyncio bot (concurrent exchange requests)"
+    )
+    parser_run.add_argument(
+        "-w", "--websocket",
+        action="store_true",
+        help="Event-driven asyncio bot: react to WebSocket candle closes and fills instead of sleeping"
+    )
+    parser_run.add_argument(
+        "-t", "--telemetry",
+        default=None,
+        type=str,
+        required=False,
+        help="Write output to a shared ring file in this directory for an out-of-process dashboard"
+    )
+
+    parser_backtest = subparsers.add_parser("backtest")
+    parser_backtest.add_argument(
+        "-e", "--env",
+        default=default_main_environment_filename,
+        type=str,
+        required=False,
+    )
+    parser_backtest.add_argument(
+        "-p", "--predictions",
+        default=default_prediction_environment_filename,
+        type=str,
+        required=False,
+    )
+    parser_backtest.add_argument(
+        "-s", "--since",
+        default=None,
+        type=str,
+        required=False,
+        help="Download history from this ISO 8601 date into the local candle store first"
+    )
+
+    parser_orchestrate = subparsers.add_parser("orchestrate")
+    parser_orchestrate.add_argument(
+        "-c", "--config",
+        default="pairs.json",
+        type=str,
+        required=False,
+        help="json list of pairs (see pairs.json.example)"
+    )
+    parser_orchestrate.add_argument(
+        "-d", "--dashboard",
+        action="store_true",
+        help="Launch the app in dashboard mode"
+    )
+    parser_orchestrate.add_argument(
+        "-t", "--telemetry",
+        default=None,
+        type=str,
+        required=False,
+        help="Write output to a shared ring file in this directory for an out-of-process dashboard"
+    )
+
+    parser_dashboard = subparsers.add_parser("dashboard")
+    parser_dashboard.add_argument(
+        "-t", "--telemetry",
+        default="telemetry",
+        type=str,
+        required=False,
+        help="Directory of ring files written by bots run with `--telemetry`"
+    )
+
+    parser_prompts = subparsers.add_parser("prompts")
+    parser_prompts.add_argument(
+        "-p", "--predictions",
+        default=default_prediction_environment_filename,
+        type=str,
+        required=False,
+    )
+    parser_prompts.add_argument(
+        "-e", "--env",
+        default=None,
+        type=str,
+        required=False,
+        help="Also benchmark a live window of the pair configured in this file (public market data)"
+    )
+    parser_prompts.add_argument(
+        "-r", "--repeats",
+        default=3,
+        type=int,
+        required=False,
+    )
 
     console = console_arguments_parser.parse_args()
     mode = console.running_mode
 
     # Paths
     current_path: str | PathLike = dirname(abspath(__file__))
+
+    # Out-of-process dashboard: the bots only write ring files, this process renders them
+    if mode == "dashboard":
+        print(f"[START]\tServing dashboard of bots writing to `{console.telemetry}`.")
+        dashboard.follow_shared_telemetry(join(current_path, console.telemetry))
+        sys.exit(dashboard.run_dashboard(blocking=True))
+
+    # Every pair has its own prediction settings
+    if mode == "orchestrate":
+        print("[START]\tSTARTED module in `orchestrate` mode.")
+        orchestrator: Orchestrator = Orchestrator.from_config(
+            config_file_path=join(current_path, console.config),
+            output_integration=OutputIntegration("shared", join(current_path, console.telemetry), "orchestrator")
+            if console.telemetry else OutputIntegration("dashboard" if console.dashboard else "console")
+        )
+        if console.dashboard:
+            dashboard.run_dashboard()
+        sys.exit(asyncio.run(orchestrator.run()))
+
     predictions_env_path: str | PathLike = join(current_path, console.predictions)
 
     # Predictions
@@ -85,27 +208,53 @@ def global_main() -> None:
     match mode:
         case "run":
             main_trading_env_path = join(current_path, console.env)
+            is_asynchronous: bool = console.asynchronous or console.websocket
+            bot_class: type[TradingBot] = AsyncTradingBot if is_asynchronous else TradingBot
 
             # If -d or --dashboard flags have been used to run the script
             if console.dashboard:
                 print("[START]\tRunning in `run` mode with dashboard & trading logic concurrently.")
-                trading_bot: TradingBot = TradingBot(
+                trading_bot: TradingBot = bot_class(
                     prediction_api=prediction_function,
                     output_integration=OutputIntegration("dashboard"),
                     env_file_path = main_trading_env_path
                 )
                 dashboard.run_dashboard()
 
+            # Output goes to a ring file read by `run.py dashboard`
+            elif console.telemetry:
+                print(f"[START]\tStarted module in `run` mode writing telemetry to `{console.telemetry}`.")
+                trading_bot: TradingBot = bot_class(
+                    prediction_api=prediction_function,
+                    output_integration=OutputIntegration(
+                        "shared", join(current_path, console.telemetry), splitext(basename(console.env))[0]
+                    ),
+                    env_file_path=main_trading_env_path
+                )
+
             # No -d or --dashboard flag has been given
             else:
                 print("[START]\tStarted module in `run` mode without dashboard.")
-                trading_bot: TradingBot = TradingBot(
+                trading_bot: TradingBot = bot_class(
                     prediction_api=prediction_function,
                     output_integration=OutputIntegration("console"),
                     env_file_path=main_trading_env_path
                 )
 
             # Regardless of usage of -d or --dashboard flags
+            if console.websocket:
+                sys.exit(asyncio.run(trading_bot.main_event_driven(WebSocketFeed(
+                    exchange_name=trading_bot.exchange_name,
+                    symbol=trading_bot.symbol,
+                    timeframe=trading_bot.timeframe,
+                    api_key=trading_bot.exchange_api_key,
+                    secret=trading_bot.exchange_secret,
+                    password=trading_bot.exchange_password
+                ))))
+
+            if is_asynchronous:
+                sys.exit(asyncio.run(trading_bot.main(infinite_loop_condition=True)))
+
             sys.exit(trading_bot.main(infinite_loop_condition=True))
 
         case "test":
@@ -116,6 +265,32 @@ def global_main() -> None:
                   prediction_function(TestData.DEFAULT_DATA_TO_TEST_API_DOWN))
             sys.exit(print("END] Test mode exited."))
 
+        case "backtest":
+            print("[START]\tSTARTED module in `backtest` mode.")
+            run_backtest(
+                prediction_app=prediction_app,
+                env_file_path=join(current_path, console.env),
+                since=console.since
+            )
+            sys.exit(print("[END]\tBacktest mode exited."))
+
+        case "prompts":
+            print("[START]\tSTARTED module in `prompts` mode.")
+            windows: dict[str, Any] = {"uptrend": TestData.DEFAULT_DATA_TO_TEST_API_UP,
+                                       "downtrend": TestData.DEFAULT_DATA_TO_TEST_API_DOWN}
+            if console.env:
+                load_dotenv(join(current_path, console.env))
+                windows["live"] = getattr(ccxt, getenv("DEFAULT_EXCHANGE_NAME"))().fetch_ohlcv(
+                    getenv("TRADING_PAIR"), getenv("TIMEFRAME"), limit=int(getenv("DATA_VECTOR_LENGTH"))
+                )
+
+            for window_name, window in windows.items():
+                for result in benchmark_encodings(prediction_app, window, repeats=console.repeats):
+                    print(f"\t[INFO]\t{window_name:<9} {result['encoding']:<15} "
+                          f"chars={result['characters']:<6} prompt_tokens={result['prompt_tokens']} "
+                          f"median_latency_ms={result['median_latency_ms']} answers={result['answers']}")
+            sys.exit(print("[END]\tPrompts mode exited."))
+
 
 
 if __name__ == "__main__":
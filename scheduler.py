@@ -0,0 +1,123 @@
+"""
+Scheduler module (bot cycles aligned to candle closes)
+
+@Developer: Stan
+@ModuleVersion: 1.0.0
+@PythonVersion: 3.13
+
+"""
+import math
+import time
+from os import getenv
+from typing import Any, Self
+
+from ccxt import Exchange
+
+
+class CandleScheduler:
+    """
+    Wakes the bot right after every candle close of its timeframe (plus a small offset, so the exchange has
+    published the closed candle), instead of sleeping a fixed time that drifts against candle closes.
+
+    While the bot has open orders it is also woken every `poll_interval` seconds to notice fills early; the poll
+    interval never uses more than `headroom` of the exchange's request budget (`rateLimit`). Bots sharing one
+    exchange instance (see `orchestrator.ExchangePool`) share its budget, so each gets `headroom / bots` of it.
+    Without open orders there are no wakeups between candle closes.
+    """
+
+    def __init__(self: Self,
+                 timeframe: str,
+                 offset: float = 2.0,
+                 poll_interval: float = 10.0,
+                 rate_limit: float = 0.0,
+                 headroom: float = 0.5,
+                 requests_per_poll: int = 1) -> None:
+        """
+        Initialize scheduler (the first cycle is due immediately)
+
+        :param timeframe: ccxt timeframe, e.g. `1m`
+        :param offset: seconds after a candle close to wake up
+        :param poll_interval: seconds between open orders polls
+        :param rate_limit: seconds between requests allowed by the exchange (ccxt `rateLimit` / 1000)
+        :param headroom: share of the request budget polls may use, in (0, 1]
+        :param requests_per_poll: requests made by a poll
+        """
+
+        self.period: int = Exchange.parse_timeframe(timeframe)
+        self.offset: float = offset
+        self.requested_poll_interval: float = poll_interval
+        self.rate_limit: float = rate_limit
+        self.headroom: float = headroom
+        self.requests_per_poll: int = requests_per_poll
+        self.poll_interval: float = poll_interval
+        self.share_budget(bots=1)
+        self.next_close: float = 0.0
+
+    def share_budget(self: Self, bots: int) -> None:
+        """
+        Raise the poll interval so that all bots on the exchange instance together stay within the headroom
+
+        :param bots: bots sharing the exchange's `rateLimit` (this one included)
+        :return: None
+        """
+
+        self.poll_interval = self.requested_poll_interval
+        if self.headroom > 0:
+            self.poll_interval = max(self.poll_interval,
+                                     self.rate_limit * self.requests_per_poll * max(1, bots) / self.headroom)
+
+    @classmethod
+    def from_env(cls, timeframe: str, exchange: Any) -> Self:
+        """
+        Scheduler from `CANDLE_CLOSE_OFFSET`, `OPEN_ORDERS_POLL_INTERVAL` and `RATE_LIMIT_HEADROOM` variables
+
+        :param timeframe: ccxt timeframe
+        :param exchange: ccxt exchange (its `rateLimit` in ms, if any)
+        :return: CandleScheduler instance
+        """
+
+        return cls(
+            timeframe=timeframe,
+            offset=float(getenv("CANDLE_CLOSE_OFFSET") or 2),
+            poll_interval=float(getenv("OPEN_ORDERS_POLL_INTERVAL") or 10),
+            rate_limit=float(getattr(exchange, "rateLimit", 0) or 0) / 1000,
+            headroom=float(getenv("RATE_LIMIT_HEADROOM") or 0.5)
+        )
+
+    def following_close(self: Self, now: float) -> float:
+        """
+        Wakeup time for the first candle close after `now`
+
+        :param now: Unix time
+        :return: Unix time (close + offset)
+        """
+
+        return (math.floor((now - self.offset) / self.period) + 1) * self.period + self.offset
+
+    def start_cycle(self: Self, now: float | None = None) -> bool:
+        """
+        Whether a cycle starting now is the one after a candle close (the next close is scheduled then)
+
+        :param now: Unix time (default: current)
+        :return: bool (False for open orders polls in between)
+        """
+
+        now = time.time() if now is None else now
+        if now < self.next_close:
+            return False
+
+        self.next_close = self.following_close(now)
+        return True
+
+    def delay(self: Self, has_open_orders: bool, now: float | None = None) -> float:
+        """
+        Seconds to sleep after a cycle
+
+        :param has_open_orders: whether the bot waits for fills (then it's woken for polls too)
+        :param now: Unix time (default: current)
+        :return: seconds
+        """
+
+        now = time.time() if now is None else now
+        until_close: float = max(0.0, self.next_close - now)
+        return min(until_close, self.poll_interval) if has_open_orders else until_close
@@ -0,0 +1,453 @@
+"""
+Telemetry module (bounded stores for dashboard data, in memory or shared between processes)
+
+@Developer: Stan
+@ModuleVersion: 1.0.0
+@PythonVersion: 3.13
+
+"""
+import bisect
+import mmap
+import os
+import struct
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from os import PathLike
+from typing import Any, Iterator, Self
+
+
+class RingBuffer:
+    """
+    Fixed-capacity, preallocated ring buffer with monotonically increasing sequence numbers.
+
+    Writes overwrite the oldest entry in O(1); reads copy entries under the lock, so they are consistent snapshots
+    that later writes can't change. Sequence numbers start at 1, so `since(0)` returns everything retained
+    (a gap between a consumer's cursor and the first returned sequence means entries were overwritten).
+    """
+
+    def __init__(self: Self, capacity: int) -> None:
+        """
+        Initialize ring buffer
+
+        :param capacity: number of retained entries
+        """
+
+        self.capacity: int = max(1, capacity)
+        self.items: list[Any] = [None] * self.capacity
+        self.sequence: int = 0
+        self.lock: threading.Lock = threading.Lock()
+
+    def append(self: Self, item: Any) -> int:
+        """
+        Add an entry, overwriting the oldest one when full
+
+        :param item: entry
+        :return: sequence number of the entry
+        """
+
+        with self.lock:
+            self.sequence += 1
+            self.items[self.sequence % self.capacity] = item
+            return self.sequence
+
+    def since(self: Self, sequence: int = 0, limit: int | None = None) -> list[tuple[int, Any]]:
+        """
+        Retained entries newer than `sequence`
+
+        :param sequence: last sequence number the consumer has seen
+        :param limit: optional maximum number of (newest) entries
+        :return: list of (sequence, entry), oldest first
+        """
+
+        with self.lock:
+            first: int = max(sequence + 1, self.sequence - min(self.capacity, limit or self.capacity) + 1, 1)
+            return [(number, self.items[number % self.capacity]) for number in range(first, self.sequence + 1)]
+
+    def snapshot(self: Self) -> list[Any]:
+        """
+        Copy of all retained entries
+
+        :return: list of entries, oldest first
+        """
+
+        return [item for _, item in self.since(0)]
+
+    def latest(self: Self) -> Any | None:
+        """
+        Newest entry
+
+        :return: entry or None when empty
+        """
+
+        with self.lock:
+            return self.items[self.sequence % self.capacity] if self.sequence else None
+
+    def __len__(self: Self) -> int:
+        with self.lock:
+            return min(self.sequence, self.capacity)
+
+
+class SharedRing:
+    """
+    Single-writer ring of text entries in a memory-mapped file, readable by other processes (e.g. a dashboard).
+
+    Layout: a 32-byte header (magic, version, capacity, slot size, generation, last sequence) followed by `capacity`
+    slots of `slot_size` bytes (sequence, kind, length, UTF-8 payload truncated to fit). Writing is a few memory copies
+    and never waits for readers (the lock only orders threads of the writing process); readers check the slot sequence
+    before and after copying, so entries overwritten meanwhile are skipped instead of being read torn.
+
+    A restarted writer never truncates a file readers may have mapped: it prepares a new file (new random generation,
+    sequence from 1) and atomically replaces the old one, readers notice it with `is_replaced` and reopen.
+    """
+
+    MAGIC: bytes = b"CATRING1"
+    VERSION: int = 2
+    HEADER: struct.Struct = struct.Struct("<8sIIIIQ")
+    SLOT: struct.Struct = struct.Struct("<QBxxxI")
+
+    # Entry kinds
+    INFO: int = 0
+    COST: int = 1
+    MEMORY: int = 2
+    METRICS: int = 3
+
+    def __init__(self: Self, path: str | PathLike, capacity: int = 1024, slot_size: int = 512,
+                 writer: bool = False) -> None:
+        """
+        Create (writer) or open (reader) a ring file
+
+        :param path: file path
+        :param capacity: number of slots (writer only, readers use the header)
+        :param slot_size: bytes per slot including its 16-byte header (writer only)
+        :param writer: create the file and write to it, otherwise open it read-only
+        """
+
+        self.path: str | PathLike = path
+        self.writer: bool = writer
+        self.lock: threading.Lock = threading.Lock()
+        if writer:
+            temporary_path: str = f"{path}.{os.getpid()}.tmp"
+            self.file = open(temporary_path, "w+b")
+            self.file.truncate(self.HEADER.size + capacity * slot_size)
+            self.map: mmap.mmap = mmap.mmap(self.file.fileno(), 0)
+            self.capacity, self.slot_size, self.sequence = capacity, slot_size, 0
+            self.generation: int = int.from_bytes(os.urandom(4), "little")
+            self.map[:self.HEADER.size] = self.HEADER.pack(self.MAGIC, self.VERSION, capacity, slot_size,
+                                                           self.generation, 0)
+            os.replace(temporary_path, path)
+
+        else:
+            self.file = open(path, "rb")
+            self.map: mmap.mmap = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+            magic, version, self.capacity, self.slot_size, self.generation, _ = self.HEADER.unpack_from(self.map, 0)
+            if magic != self.MAGIC or version != self.VERSION:
+                raise ValueError(f"{path} is not a telemetry ring")
+
+    @property
+    def last(self: Self) -> int:
+        """Sequence number of the latest entry (0 when empty)"""
+
+        return struct.unpack_from("<Q", self.map, self.HEADER.size - 8)[0]
+
+    def is_replaced(self: Self) -> bool:
+        """
+        Whether the path now holds another file (e.g. the writer restarted), reader side
+
+        :return: bool
+        """
+
+        try:
+            return os.stat(self.path).st_ino != os.fstat(self.file.fileno()).st_ino
+        except OSError:
+            return False
+
+    def _offset(self: Self, sequence: int) -> int:
+        return self.HEADER.size + (sequence % self.capacity) * self.slot_size
+
+    def append(self: Self, kind: int, text: str) -> int:
+        """
+        Write an entry (writer only)
+
+        :param kind: INFO, COST, MEMORY or METRICS
+        :param text: payload (costs as text)
+        :return: sequence number of the entry
+        """
+
+        payload: bytes = text.encode()[:self.slot_size - self.SLOT.size]
+        with self.lock:
+            self.sequence += 1
+            offset: int = self._offset(self.sequence)
+
+            # Slot sequence 0 marks a slot being written
+            self.SLOT.pack_into(self.map, offset, 0, kind, len(payload))
+            self.map[offset + self.SLOT.size:offset + self.SLOT.size + len(payload)] = payload
+            self.SLOT.pack_into(self.map, offset, self.sequence, kind, len(payload))
+            struct.pack_into("<Q", self.map, self.HEADER.size - 8, self.sequence)
+            return self.sequence
+
+    def since(self: Self, sequence: int = 0) -> list[tuple[int, int, str]]:
+        """
+        Entries newer than `sequence` (reader side)
+
+        :param sequence: last sequence number the reader has seen
+        :return: list of (sequence, kind, text), oldest first
+        """
+
+        last: int = self.last
+        entries: list[tuple[int, int, str]] = []
+        for number in range(max(sequence + 1, last - self.capacity + 1, 1), last + 1):
+            offset: int = self._offset(number)
+            slot_sequence, kind, length = self.SLOT.unpack_from(self.map, offset)
+            payload: bytes = self.map[offset + self.SLOT.size:offset + self.SLOT.size + length]
+            if slot_sequence == number and self.SLOT.unpack_from(self.map, offset)[0] == number:
+                entries.append((number, kind, payload.decode(errors="ignore")))
+
+        return entries
+
+    def close(self: Self) -> None:
+        self.map.close()
+        self.file.close()
+
+
+class LatencyHistogram:
+    """
+    Fixed-bucket latency histogram (Prometheus-style cumulative buckets when rendered).
+
+    Buckets grow geometrically (by 25%) from 0.1 ms to about 1.5 minutes, so recording is a binary search and an
+    increment, and quantiles are interpolated inside a bucket (at most one bucket width off).
+    """
+
+    BOUNDS: tuple[float, ...] = tuple(round(0.0001 * 1.25 ** power, 7) for power in range(62))
+
+    def __init__(self: Self) -> None:
+        self.counts: list[int] = [0] * (len(self.BOUNDS) + 1)
+        self.count: int = 0
+        self.total: float = 0.0
+
+    def observe(self: Self, seconds: float) -> None:
+        self.counts[bisect.bisect_left(self.BOUNDS, seconds)] += 1
+        self.count += 1
+        self.total += seconds
+
+    def quantile(self: Self, q: float) -> float | None:
+        """
+        Estimated quantile
+
+        :param q: quantile in [0, 1]
+        :return: seconds or None when empty
+        """
+
+        if not self.count:
+            return None
+
+        rank: float = q * self.count
+        cumulative: int = 0
+        for index, count in enumerate(self.counts):
+            if count and cumulative + count >= rank:
+                if index == len(self.BOUNDS):
+                    return self.BOUNDS[-1]
+                lower: float = self.BOUNDS[index - 1] if index else 0.0
+                return lower + (self.BOUNDS[index] - lower) * max(0.0, rank - cumulative) / count
+            cumulative += count
+
+        return self.BOUNDS[-1]
+
+
+class Metrics:
+    """
+    Per-stage latency histograms, counters and gauges of the trading cycle, labelled (e.g. by pair).
+
+    Timing a stage costs two `perf_counter` calls and one short lock, so timers stay on in production.
+    Rendered as Prometheus text (`/metrics`) and as a short summary for the dashboard.
+    """
+
+    PREFIX: str = "autotrader"
+
+    def __init__(self: Self) -> None:
+        self.histograms: dict[tuple[str, tuple[tuple[str, str], ...]], LatencyHistogram] = {}
+        self.counters: dict[tuple[str, tuple[tuple[str, str], ...]], float] = {}
+        self.gauges: dict[tuple[str, tuple[tuple[str, str], ...]], float] = {}
+        self.lock: threading.Lock = threading.Lock()
+
+    def observe(self: Self, stage: str, seconds: float, **labels: str) -> None:
+        """
+        Record the duration of a stage
+
+        :param stage: stage name (e.g. `fetch_ohlcv`)
+        :param seconds: duration
+        :param labels: extra labels (e.g. `pair`)
+        :return: None
+        """
+
+        key: tuple[str, tuple[tuple[str, str], ...]] = (stage, tuple(sorted(labels.items())))
+        with self.lock:
+            histogram: LatencyHistogram | None = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = LatencyHistogram()
+            histogram.observe(seconds)
+
+    @contextmanager
+    def timer(self: Self, stage: str, **labels: str) -> Iterator[None]:
+        """
+        Time the enclosed block as `stage` (also when it raises)
+
+        :param stage: stage name
+        :param labels: extra labels
+        :return: context manager
+        """
+
+        started: float = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(stage, time.perf_counter() - started, **labels)
+
+    def increment(self: Self, name: str, amount: float = 1.0, **labels: str) -> None:
+        """
+        Increase a counter
+
+        :param name: counter name without `_total` (e.g. `retries`)
+        :param amount: increment
+        :param labels: extra labels
+        :return: None
+        """
+
+        key: tuple[str, tuple[tuple[str, str], ...]] = (name, tuple(sorted(labels.items())))
+        with self.lock:
+            self.counters[key] = self.counters.get(key, 0.0) + amount
+
+    def set_gauge(self: Self, name: str, value: float, **labels: str) -> None:
+        """
+        Set a gauge (a current value, e.g. a circuit breaker state)
+
+        :param name: gauge name
+        :param value: value
+        :param labels: extra labels
+        :return: None
+        """
+
+        key: tuple[str, tuple[tuple[str, str], ...]] = (name, tuple(sorted(labels.items())))
+        with self.lock:
+            self.gauges[key] = value
+
+    @staticmethod
+    def _labels(labels: tuple[tuple[str, str], ...] | list[tuple[str, str]]) -> str:
+        escaped: list[str] = []
+        for name, value in labels:
+            value = str(value).replace("\\", "\\\\").replace("\"", "\\\"")
+            escaped.append(f"{name}=\"{value}\"")
+        return "{" + ",".join(escaped) + "}" if escaped else ""
+
+    def render(self: Self) -> str:
+        """
+        Prometheus text exposition format (version 0.0.4)
+
+        :return: str
+        """
+
+        with self.lock:
+            histograms: list = [(key, list(histogram.counts), histogram.count, histogram.total)
+                                for key, histogram in sorted(self.histograms.items())]
+            counters: list = sorted(self.counters.items())
+            gauges: list = sorted(self.gauges.items())
+
+        name: str = f"{self.PREFIX}_stage_duration_seconds"
+        lines: list[str] = [f"# HELP {name} Duration of trading cycle stages.", f"# TYPE {name} histogram"]
+        for (stage, labels), counts, count, total in histograms:
+            base: list[tuple[str, str]] = [("stage", stage), *labels]
+            cumulative: int = 0
+            for bound, bucket in zip((*LatencyHistogram.BOUNDS, "+Inf"), counts):
+                cumulative += bucket
+                lines.append(f"{name}_bucket{self._labels([*base, ('le', str(bound))])} {cumulative}")
+            lines.append(f"{name}_sum{self._labels(base)} {total}")
+            lines.append(f"{name}_count{self._labels(base)} {count}")
+
+        described: set[str] = set()
+        for (counter, labels), value in counters:
+            name = f"{self.PREFIX}_{counter}_total"
+            if name not in described:
+                described.add(name)
+                lines.extend([f"# HELP {name} Number of {counter.replace('_', ' ')}.", f"# TYPE {name} counter"])
+            lines.append(f"{name}{self._labels(labels)} {value:g}")
+
+        for (gauge, labels), value in gauges:
+            name = f"{self.PREFIX}_{gauge}"
+            if name not in described:
+                described.add(name)
+                lines.extend([f"# HELP {name} Current {gauge.replace('_', ' ')}.", f"# TYPE {name} gauge"])
+            lines.append(f"{name}{self._labels(labels)} {value:g}")
+
+        return "\n".join(lines) + "\n"
+
+    def summary(self: Self, **labels: str) -> dict[str, str]:
+        """
+        Short form for the dashboard: p50/p95/p99 per stage, counters and gauges
+
+        :param labels: only series with these labels (e.g. `pair` of one bot), all series by default
+        :return: dict of `<stage or counter> <label values>` -> text
+        """
+
+        def selected(series_labels: tuple[tuple[str, str], ...]) -> bool:
+            return labels.items() <= dict(series_labels).items()
+
+        with self.lock:
+            rows: dict[str, str] = {
+                " ".join((stage, *(value for _, value in series_labels))):
+                    "  ".join(f"{name} {histogram.quantile(q) * 1000:.1f} ms"
+                              for name, q in (("p50", 0.5), ("p95", 0.95), ("p99", 0.99)))
+                    + f"  n={histogram.count}"
+                for (stage, series_labels), histogram in sorted(self.histograms.items()) if selected(series_labels)
+            }
+            rows.update({" ".join((counter, *(value for _, value in series_labels))): f"{value:g}"
+                         for (counter, series_labels), value in sorted(self.counters.items())
+                         if selected(series_labels)})
+            rows.update({" ".join((gauge, *(value for _, value in series_labels))): f"{value:g}"
+                         for (gauge, series_labels), value in sorted(self.gauges.items())
+                         if selected(series_labels)})
+
+        return rows
+
+
+# Process-wide metrics of all bots (labelled by pair)
+METRICS: Metrics = Metrics()
+
+_metrics_servers: dict[int, ThreadingHTTPServer] = {}
+
+
+def serve_metrics(port: int, host: str = "127.0.0.1", metrics: Metrics = METRICS) -> ThreadingHTTPServer:
+    """
+    Serve `metrics` as Prometheus text on `http://<host>:<port>/metrics` in a daemon thread
+    (once per port, so every bot of a process can call it)
+
+    :param port: port to bind (0 picks a free one)
+    :param host: interface to bind (local only by default)
+    :param metrics: metrics to render
+    :return: running server
+    """
+
+    if port and port in _metrics_servers:
+        return _metrics_servers[port]
+
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, *_: Any) -> None:
+            pass
+
+        def do_GET(self) -> None:
+            if self.path.split("?")[0].rstrip("/") not in ("", "/metrics"):
+                self.send_error(404)
+                return
+
+            payload: bytes = metrics.render().encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+    server: ThreadingHTTPServer = ThreadingHTTPServer((host, port), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="metrics", daemon=True).start()
+    _metrics_servers[server.server_address[1]] = server
+    return server
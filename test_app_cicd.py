@@ -2,10 +2,66 @@
 Test classes. Version controlled and CI/CD specific (GitHub secret required!).
 """
 
+import asyncio
+import json
+import os
+import random
+import subprocess
+import sys
+import threading
+import time
+import tracemalloc
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+import ccxt
+import numpy as np
+import pandas as pd
 import pytest
+from dash import Patch, no_update
+from dash.exceptions import PreventUpdate
+from openai.types.chat import ChatCompletion, ChatCompletionChunk, ChatCompletionMessage
+from openai.types.chat.chat_completion_chunk import Choice as ChunkChoice, ChoiceDelta
+from openai.types.chat.chat_completion import Choice
+from stockstats import StockDataFrame
+
+import dashboard
+from account_book import AccountBook
+from async_trading_bot import AsyncTradingBot
+from backtest import Backtester
+from candle_store import CandleStore
+from config import TestData, scoped_environment
+from indicators import StreamingSignalEngine, indicator, ohlcv_columns
+from integrate_dashboard import OutputIntegration
+from llm_stub import StubLlmServer, benchmark, random_walk_ohlcv
+from market_feed import MarketEvent, MarketFeed, SimulatedFeed
+from markets_cache import MarketsCache
+from memory_monitor import MemoryMonitor, read_rss
+from orchestrator import ExchangePool, Orchestrator
+from predict import PredictionApp, PredictionBatcher
+from prediction_cache import PredictionCache
+from prompt_encoding import PromptEncoding
+from resilience import Backoff, CircuitBreaker, CircuitOpenError, Resilience
+from scheduler import CandleScheduler
+from telemetry import LatencyHistogram, Metrics, RingBuffer, SharedRing, serve_metrics
+from trading_bot import TradingBot
+
+
+@pytest.fixture
+def main_env(monkeypatch):
+    """
+    Variables of `main.env.example` (no real credentials, nothing is sent to the exchange in tests)
+    """
 
-from config import TestData
-from predict import PredictionApp
+    for key, value in {
+        "EXCHANGE_API_KEY": "key", "EXCHANGE_SECRET": "secret", "EXCHANGE_PASSPHRASE": "passphrase",
+        "ALGORITHM_TRUST_PERCENTAGE": "0.5", "BASE_SLEEP_TIME": "1", "CANCEL_ORDER_LIMIT": "3",
+        "RETRIES_BEFORE_SLEEP_LIMIT": "4", "DATA_VECTOR_LENGTH": "30", "DEFAULT_EXCHANGE_NAME": "kucoin",
+        "DEFAULT_EXCHANGE_FEE": "0.001", "PREMIUM_OVER_EXCHANGE_FEES": "0.0",
+        "MIN_TRANSACTION_VALUE_IN_BASE": "0.01", "TIMEFRAME": "1m", "TRADING_PAIR": "XMR/USDT",
+        "CANDLE_STORE_DIR": ""
+    }.items():
+        monkeypatch.setenv(key, value)
 
 
 class TestLLM:
@@ -62,3 +118,1350 @@ class TestLLM:
 
         assert prediction_function(TestData.DEFAULT_DATA_TO_TEST_API_DOWN) in {"up", "down", "hold"}, \
             "Incorrect prediction"
+
+
+class TestStreamingIndicators:
+    """
+    Streaming PANDAS engine must give the same signals as stockstats over the whole history,
+    and over `DATA_VECTOR_LENGTH` windows the same `kama` signals and mostly the same `ema`/`sma` ones
+    """
+
+    @pytest.mark.parametrize("lag", [0, 1, 2])
+    @pytest.mark.parametrize("indicators", [["close_5,15_kama"], ["close_10_sma", "close_8_ema"]])
+    def test_parity_with_stockstats(self, monkeypatch, lag, indicators):
+        monkeypatch.setenv("DEFAULT_PREDICTION_API", "PANDAS")
+        monkeypatch.setenv("PREDICTION_OPERATIONAL_PRICE_TYPE", "close_3_ema")
+        monkeypatch.setenv("PREDICTION_INDICATORS_JSON", json.dumps(indicators))
+        monkeypatch.setenv("PREDICTION_GLOBAL_SIGNAL_LAG", str(lag))
+        monkeypatch.setenv("PREDICTION_PANDAS_ENGINE", "stockstats")
+        reference = PredictionApp()
+        engine = StreamingSignalEngine("close_3_ema", indicators, lag)
+        rows = random_walk_ohlcv(100)
+
+        for k in range(2, len(rows) + 1):
+            # Still-forming candle first, then its final value
+            forming = rows[:k - 1] + [rows[k - 1][:4] + [rows[k - 2][4], 0.0]]
+            assert engine.predict(forming) == reference.predict_pandas(forming)
+            assert engine.predict(rows[:k]) == reference.predict_pandas(rows[:k])
+
+    @pytest.mark.parametrize("lag", [0, 1])
+    @pytest.mark.parametrize("indicators, tolerance", [(["close_5,15_kama"], 0),
+                                                        (["close_10_sma", "close_20_ema"], 0.05)])
+    def test_windowed_prediction_path(self, main_env, monkeypatch, lag, indicators, tolerance):
+        monkeypatch.setenv("DEFAULT_PREDICTION_API", "PANDAS")
+        monkeypatch.setenv("PREDICTION_OPERATIONAL_PRICE_TYPE", "close_3_ema")
+        monkeypatch.setenv("PREDICTION_INDICATORS_JSON", json.dumps(indicators))
+        monkeypatch.setenv("PREDICTION_GLOBAL_SIGNAL_LAG", str(lag))
+        monkeypatch.setenv("PREDICTION_PANDAS_ENGINE", "stockstats")
+        reference = PredictionApp()
+        monkeypatch.setenv("PREDICTION_PANDAS_ENGINE", "streaming")
+        streaming = PredictionApp()
+        length = int(os.getenv("DATA_VECTOR_LENGTH"))
+        rows = random_walk_ohlcv(370)
+
+        # Same windows as the bot passes to the predictor every cycle
+        windows = [rows[k - length:k] for k in range(length, len(rows) + 1)]
+        differing = sum(streaming.predict_up_or_down(window) != reference.predict_up_or_down(window)
+                        for window in windows)
+        assert differing <= tolerance * len(windows)
+
+    def test_unsupported_indicator(self):
+        with pytest.raises(ValueError):
+            StreamingSignalEngine("close_3_ema", ["close_14_rsi"], 1)
+
+
+class TestNumpyIndicators:
+    """
+    NumPy kernels must reproduce stockstats columns and `predict_pandas` signals
+    """
+
+    @pytest.mark.parametrize("name", ["close", "close_3_ema", "close_50_ema", "high_10_sma",
+                                      "close_5,15_kama", "close_4,2,30_kama"])
+    def test_indicator_parity(self, name):
+        rows = random_walk_ohlcv(500)
+        sdf = StockDataFrame.retype(pd.DataFrame(rows, columns=["date", "open", "high", "low", "close", "volume"]))
+
+        assert np.allclose(indicator(ohlcv_columns(rows), name), sdf[name].values, rtol=0, atol=1e-9)
+
+    @pytest.mark.parametrize("lag", [0, 1, 2])
+    def test_signal_parity(self, monkeypatch, lag):
+        monkeypatch.setenv("DEFAULT_PREDICTION_API", "PANDAS")
+        monkeypatch.setenv("PREDICTION_OPERATIONAL_PRICE_TYPE", "close_3_ema")
+        monkeypatch.setenv("PREDICTION_INDICATORS_JSON", json.dumps(["close_5,15_kama", "close_8_ema"]))
+        monkeypatch.setenv("PREDICTION_GLOBAL_SIGNAL_LAG", str(lag))
+        app = PredictionApp()
+        rows = random_walk_ohlcv(130)
+
+        for k in range(2, len(rows) + 1):
+            window = rows[max(0, k - 30):k]
+            assert app.predict_pandas_numpy(window) == app.predict_pandas(window)
+
+        assert app.predict_pandas_numpy(TestData.DEFAULT_DATA_TO_TEST_API_UP) == \
+               app.predict_pandas(TestData.DEFAULT_DATA_TO_TEST_API_UP)
+
+
+class FakeOhlcvExchange:
+    """
+    Offline stand-in for `ccxt.Exchange.fetch_ohlcv` over a fixed candle history (the last candle is forming),
+    at most `page_cap` candles per request
+    """
+
+    def __init__(self, rows, page_cap=None):
+        self.rows = rows
+        self.page_cap = page_cap
+        self.requested = 0
+
+    def milliseconds(self):
+        return self.rows[-1][0] + 30_000
+
+    def fetch_ohlcv(self, symbol, timeframe, since=None, limit=None):
+        limit = min(limit, self.page_cap or limit)
+        rows = self.rows if since is None else [row for row in self.rows if row[0] >= since]
+        rows = rows[-limit:] if since is None else rows[:limit]
+        self.requested += len(rows)
+        return rows
+
+
+class TestCandleStore:
+    """
+    Local candle store must only download new candles and serve the same window as the exchange
+    """
+
+    def test_delta_sync_and_restart(self, tmp_path):
+        rows = random_walk_ohlcv(200)
+        exchange = FakeOhlcvExchange(rows[:100])
+        store = CandleStore(tmp_path, "fake", "XMR/USDT", "1m", page_limit=50)
+
+        assert store.sync(exchange, 30).tolist() == rows[70:100]
+        exchange.rows = rows[:102]
+        exchange.requested = 0
+        assert store.sync(exchange, 30).tolist() == rows[72:102]
+        assert exchange.requested == 3
+
+        # Reopened store catches up page by page
+        exchange.rows = rows[:127]
+        exchange.requested = 0
+        reopened = CandleStore(tmp_path, "fake", "XMR/USDT", "1m", page_limit=10)
+        assert reopened.sync(exchange, 30).tolist() == rows[97:127]
+        assert reopened.history().tolist() == rows[70:127]
+        assert exchange.requested == 28
+
+        # A gap longer than the window: only the window is downloaded
+        exchange.rows = rows
+        assert reopened.sync(exchange, 30).tolist() == rows[170:]
+        assert reopened.history().tolist() == rows[170:]
+
+    def test_short_pages(self, tmp_path):
+        rows = random_walk_ohlcv(700)
+        exchange = FakeOhlcvExchange(rows[:400], page_cap=100)
+        store = CandleStore(tmp_path, "fake", "XMR/USDT", "1m")
+
+        assert store.sync(exchange, 300).tolist() == rows[100:400]
+        exchange.rows = rows[:550]
+        assert store.sync(exchange, 300).tolist() == rows[250:550]
+
+    def test_forming_candle_is_overwritten(self, tmp_path):
+        rows = random_walk_ohlcv(10)
+        store = CandleStore(tmp_path, "fake", "XMR/USDT", "1m")
+        store.append(rows[:5])
+        store.append([rows[4][:4] + [1.0, 2.0], rows[5]])
+
+        assert store.count == 6
+        assert store.window(2).tolist() == [rows[4][:4] + [1.0, 2.0], rows[5]]
+
+    def test_streaming_engine_on_store_window(self, tmp_path):
+        rows = random_walk_ohlcv(120)
+        exchange = FakeOhlcvExchange(rows[:60])
+        store = CandleStore(tmp_path, "fake", "XMR/USDT", "1m")
+        engine = StreamingSignalEngine("close_3_ema", ["close_5,15_kama"], 1)
+        reference = StreamingSignalEngine("close_3_ema", ["close_5,15_kama"], 1)
+
+        assert engine.predict(store.window(0)) == "hold"
+        for k in range(60, len(rows) + 1):
+            exchange.rows = rows[:k]
+            assert engine.predict(store.sync(exchange, 30)) == reference.predict(rows[k - 30:k])
+
+
+class TestBacktest:
+    """
+    Vectorized backtest signals must match the live streaming predictor, and fills must respect prices
+    """
+
+    @pytest.fixture
+    def backtester(self, monkeypatch):
+        monkeypatch.setenv("DEFAULT_PREDICTION_API", "PANDAS")
+        monkeypatch.setenv("PREDICTION_OPERATIONAL_PRICE_TYPE", "close_3_ema")
+        monkeypatch.setenv("PREDICTION_INDICATORS_JSON", json.dumps(["close_5,15_kama"]))
+        monkeypatch.setenv("PREDICTION_GLOBAL_SIGNAL_LAG", "1")
+        return Backtester(PredictionApp(), fee=0.001, premium_over_fees=0.0, algorithm_trust_percentage=0.5,
+                          data_vector_length=30, cancel_order_limit=3)
+
+    def test_signals_match_streaming(self, backtester):
+        rows = random_walk_ohlcv(400)
+        signals = backtester.signals(np.asarray(rows))
+        engine = StreamingSignalEngine("close_3_ema", ["close_5,15_kama"], 1)
+        codes = {"up": 1, "down": -1, "hold": 0}
+
+        for k in range(30, len(rows) + 1):
+            assert codes[engine.predict(rows[:k])] == signals[k - 1]
+
+    def test_fills(self, backtester):
+        rows = random_walk_ohlcv(2000)
+        result = backtester.run(rows, initial_base=5.0, initial_quote=500.0)
+
+        assert result.trades
+        for trade in result.filled:
+            assert 0 < trade.filled_at - trade.placed_at <= 3
+            if trade.side == "buy":
+                assert rows[trade.filled_at][3] <= trade.price < rows[trade.placed_at][4]
+            else:
+                assert rows[trade.filled_at][2] >= trade.price > rows[trade.placed_at][4]
+        assert result.final_base >= 0 and result.final_quote >= 0
+
+
+class FakeAsyncExchange:
+    """
+    Offline stand-in for a `ccxt.async_support` exchange, every request takes `delay` seconds
+    """
+
+    def __init__(self, delay):
+        self.delay = delay
+        self.orders = []
+
+    async def fetch_balance(self):
+        await asyncio.sleep(self.delay)
+        return {"XMR": {"free": 2.0}, "USDT": {"free": 300.0}}
+
+    async def fetch_order_book(self, symbol):
+        await asyncio.sleep(self.delay)
+        return {"bids": [[99.0, 1.0]], "asks": [[101.0, 1.0]]}
+
+    async def fetch_open_orders(self, symbol):
+        return []
+
+    async def fetch_ohlcv(self, symbol, timeframe, limit=None):
+        return random_walk_ohlcv(limit)
+
+    async def create_order(self, symbol, type, side, amount, price):
+        self.orders.append((side, amount, price))
+        return {"id": str(len(self.orders))}
+
+    async def cancel_order(self, id, symbol):
+        await asyncio.sleep(self.delay)
+        return {"id": id}
+
+    async def close(self):
+        pass
+
+
+class TestAsyncTradingBot:
+    """
+    Independent exchange requests of the async bot must overlap
+    """
+
+    @pytest.fixture
+    def bot(self, main_env):
+        bot = AsyncTradingBot(prediction_api=lambda _: "hold", output_integration=OutputIntegration("console"))
+        asyncio.run(bot.exchange.close())
+        bot.exchange = FakeAsyncExchange(delay=0.2)
+        return bot
+
+    def test_prepare_order_is_concurrent(self, bot):
+        started = time.perf_counter()
+        price_buy, price_sell, amount_buy, amount_sell = asyncio.run(bot.prepare_order())
+
+        assert time.perf_counter() - started < 0.35
+        assert price_buy == pytest.approx(100 * (1 - bot.premium))
+        assert price_sell == pytest.approx(100 * (1 + bot.premium))
+        assert amount_buy == pytest.approx(0.5 * 300 / price_buy)
+        assert amount_sell == pytest.approx(1.0)
+
+    def test_cancels_are_concurrent(self, bot):
+        bot.cancel_order_counter = bot.cancel_order_limit - 1
+        started = time.perf_counter()
+
+        assert asyncio.run(bot.run_if_open_orders([{"id": str(i)} for i in range(5)]))
+        assert time.perf_counter() - started < 0.35
+
+    def test_shared_decisions(self, bot):
+        assert [bot.order_side(prediction) for prediction in ("up", "down", "hold", "", None, "maybe")] == [
+            "buy", "sell", "hold", None, None, None
+        ]
+        quote = bot.quote_order({"XMR": {"free": 2.0}, "USDT": {"free": 300.0}}, *TradingBot.best_bid_ask(
+            {"bids": [[99.0, 1.0]], "asks": [[101.0, 1.0]]}
+        ))
+        assert quote == pytest.approx(asyncio.run(bot.prepare_order()))
+        with pytest.raises(Exception, match="Bid price is None"):
+            TradingBot.best_bid_ask({"bids": [], "asks": [[101.0, 1.0]]})
+
+    def test_cancellation_propagates(self, bot):
+        async def scenario():
+            task = asyncio.create_task(bot.main(infinite_loop_condition=True))
+            await asyncio.sleep(0.3)
+            task.cancel()
+            await task
+
+        with pytest.raises(asyncio.CancelledError):
+            asyncio.run(scenario())
+
+
+class FakeScheduledBot:
+    """
+    Minimal `AsyncTradingBot` interface for the orchestrator
+    """
+
+    def __init__(self, name, base_sleep_time, log):
+        self.name = name
+        self.base_sleep_time = base_sleep_time
+        self.log = log
+
+    def output_start_message(self):
+        pass
+
+    def next_cycle_delay(self):
+        return self.base_sleep_time
+
+    async def cycle(self):
+        self.log.append((self.name, asyncio.get_running_loop().time()))
+        await asyncio.sleep(0.01)
+        return True
+
+
+class TestOrchestrator:
+    """
+    Bots run by due time in one loop, pairs of one account share one exchange instance
+    """
+
+    def test_priority_schedule(self):
+        log = []
+        bots = [FakeScheduledBot("fast", 0.05, log), FakeScheduledBot("slow", 0.2, log)]
+        asyncio.run(Orchestrator(bots).run(max_cycles=8))
+
+        names = [name for name, _ in log]
+        assert names.count("fast") > names.count("slow") >= 1
+        fast = [moment for name, moment in log if name == "fast"]
+        assert all(later - earlier >= 0.05 for earlier, later in zip(fast, fast[1:]))
+
+    def test_cancellation_propagates(self):
+        orchestrator = Orchestrator([FakeScheduledBot("fast", 0.05, [])])
+
+        async def scenario():
+            task = asyncio.create_task(orchestrator.run())
+            await asyncio.sleep(0.2)
+            task.cancel()
+            await task
+
+        with pytest.raises(asyncio.CancelledError):
+            asyncio.run(scenario())
+        assert not orchestrator.running
+
+    def test_shared_exchange(self, tmp_path, main_env):
+        env_file = tmp_path / "main.env"
+        env_file.write_text("TRADING_PAIR=BTC/USDT\n")
+        pool = ExchangePool()
+
+        with scoped_environment([str(env_file)], {"TIMEFRAME": "5m"}):
+            assert os.environ["TRADING_PAIR"] == "BTC/USDT" and os.environ["TIMEFRAME"] == "5m"
+            first = pool.get()
+        with scoped_environment([str(env_file)], {"TRADING_PAIR": "ETH/USDT"}):
+            assert os.environ["TRADING_PAIR"] == "ETH/USDT"
+            assert pool.get() is first
+
+        assert os.environ["TRADING_PAIR"] == "XMR/USDT"
+        asyncio.run(pool.close())
+
+    def test_shared_rate_limit(self, tmp_path, main_env):
+        (tmp_path / "main.env").write_text("RATE_LIMIT_HEADROOM=0.0005\n")
+        (tmp_path / "pandas.env").write_text("DEFAULT_PREDICTION_API=PANDAS\n"
+                                             "PREDICTION_OPERATIONAL_PRICE_TYPE=close_3_ema\n"
+                                             "PREDICTION_INDICATORS_JSON=[\"close_5,15_kama\"]\n"
+                                             "PREDICTION_GLOBAL_SIGNAL_LAG=1\n")
+        pairs = [{"env": "main.env", "predictions": "pandas.env", "overrides": {"TRADING_PAIR": pair}}
+                 for pair in ("BTC/USDT", "ETH/USDT", "XMR/USDT")]
+        pairs.append({"env": "main.env", "predictions": "pandas.env", "overrides": {"EXCHANGE_API_KEY": "other"}})
+        (tmp_path / "pairs.json").write_text(json.dumps(pairs))
+        orchestrator = Orchestrator.from_config(str(tmp_path / "pairs.json"), OutputIntegration("console"))
+
+        rate_limit = orchestrator.bots[0].exchange.rateLimit / 1000
+        assert orchestrator.bots[0].scheduler.poll_interval > orchestrator.bots[-1].scheduler.poll_interval > 10
+        assert [bot.scheduler.poll_interval for bot in orchestrator.bots] == \
+               pytest.approx([max(10, rate_limit * 3 / 0.0005)] * 3 + [max(10, rate_limit / 0.0005)])
+        asyncio.run(orchestrator.exchange_pool.close())
+
+
+class TestEventDriven:
+    """
+    Event-driven bot must run one cycle per closed candle / fill and use the pushed top of book
+    """
+
+    def test_simulated_feed(self, main_env):
+        predictions = []
+
+        def predict(data):
+            predictions.append(data)
+            return "up"
+
+        bot = AsyncTradingBot(prediction_api=predict, output_integration=OutputIntegration("console"))
+        asyncio.run(bot.exchange.close())
+        bot.exchange = FakeAsyncExchange(delay=0.0)
+        book_requests = []
+        bot.exchange.fetch_order_book = lambda symbol: book_requests.append(symbol)
+
+        feed = SimulatedFeed(random_walk_ohlcv(3), "XMR/USDT")
+        feed.push(MarketEvent("order_filled", "XMR/USDT", {"id": "1"}))
+        asyncio.run(bot.main_event_driven(feed))
+
+        assert len(predictions) == 4
+        assert len(bot.exchange.orders) == 4 and not book_requests
+
+    def test_failed_cycle_backs_off(self, main_env):
+        bot = AsyncTradingBot(prediction_api=lambda _: "hold", output_integration=OutputIntegration("console"))
+        asyncio.run(bot.exchange.close())
+        bot.exchange = FakeAsyncExchange(delay=0.0)
+        pauses = []
+
+        async def fetch_open_orders(symbol):
+            raise RuntimeError("exchange is down")
+
+        async def self_sleep():
+            pauses.append(bot.has_open_orders)
+
+        bot.exchange.fetch_open_orders, bot.self_sleep = fetch_open_orders, self_sleep
+        asyncio.run(bot.main_event_driven(SimulatedFeed(random_walk_ohlcv(3), "XMR/USDT")))
+
+        assert pauses == [None, None, None]
+
+    def test_feed_must_stream_events(self):
+        with pytest.raises(TypeError):
+            MarketFeed()
+
+
+class TestLlmClient:
+    """
+    LLM clients are pooled per endpoint, and a slow provider can't stall the bot past the deadline
+    """
+
+    @pytest.fixture
+    def app(self, monkeypatch):
+        monkeypatch.setenv("DEFAULT_PREDICTION_API", "LLM")
+        monkeypatch.setenv("LLM_BASE_URL", "http://127.0.0.1:9/v1")
+        monkeypatch.setenv("LLM_API_KEY", "key")
+        monkeypatch.setenv("LLM_MODEL", "model")
+        monkeypatch.setenv("LLM_DEADLINE", "0.3")
+        return PredictionApp()
+
+    def test_pooled_client(self, app):
+        assert app.llm_client is PredictionApp().llm_client
+
+    def test_deadline_holds(self, app, monkeypatch):
+        monkeypatch.setattr(app.llm_client.chat.completions, "create", lambda **_: time.sleep(2))
+        started = time.perf_counter()
+
+        assert app.predict_up_or_down_with_llm(TestData.DEFAULT_DATA_TO_TEST_API_UP) == "hold"
+        assert time.perf_counter() - started < 1
+
+
+class TestPredictionCache:
+    """
+    Answers for an unchanged candle window are reused, also across restarts with the disk tier
+    """
+
+    @pytest.fixture
+    def make_app(self, monkeypatch, tmp_path):
+        monkeypatch.setenv("DEFAULT_PREDICTION_API", "LLM")
+        monkeypatch.setenv("LLM_BASE_URL", "http://127.0.0.1:9/v1")
+        monkeypatch.setenv("LLM_API_KEY", "key")
+        monkeypatch.setenv("LLM_MODEL", "model")
+        monkeypatch.setenv("LLM_CACHE_DIR", str(tmp_path))
+        calls = []
+
+        def create(**kwargs):
+            calls.append(kwargs)
+            return ChatCompletion(id="0", created=0, model="model", object="chat.completion", choices=[
+                Choice(index=0, finish_reason="stop", message=ChatCompletionMessage(role="assistant", content="UP"))
+            ])
+
+        def make_app():
+            app = PredictionApp()
+            monkeypatch.setattr(app.llm_client.chat.completions, "create", create)
+            return app
+
+        return make_app, calls
+
+    def test_repeated_window_hits_cache(self, make_app):
+        make_app, calls = make_app
+        app = make_app()
+        rows = random_walk_ohlcv(30)
+
+        assert app.predict_up_or_down_with_llm(rows) == "up"
+        assert app.predict_up_or_down_with_llm(np.asarray(rows)) == "up"
+        assert len(calls) == 1
+        assert app.llm_cache.stats == {"hits": 1, "disk_hits": 0, "misses": 1, "evictions": 0, "size": 1}
+
+        app.predict_up_or_down_with_llm(rows[1:] + random_walk_ohlcv(1, seed=4))
+        assert len(calls) == 2
+
+    def test_disk_tier_survives_restart(self, make_app):
+        make_app, calls = make_app
+        rows = random_walk_ohlcv(30)
+        make_app().predict_up_or_down_with_llm(rows)
+        restarted = make_app()
+
+        assert restarted.predict_up_or_down_with_llm(rows) == "up"
+        assert len(calls) == 1
+        assert restarted.llm_cache.stats["disk_hits"] == 1
+
+    def test_counters_are_published(self):
+        metrics = Metrics()
+        cache = PredictionCache(max_entries=1, metrics=metrics)
+        cache.put("a", "UP")
+        cache.get("a")
+        cache.put("b", "DOWN")
+        cache.get("a")
+
+        assert cache.stats == {"hits": 1, "disk_hits": 0, "misses": 1, "evictions": 1, "size": 1}
+        assert metrics.summary() == {"llm_cache_hits memory": "1", "llm_cache_misses": "1",
+                                     "llm_cache_evictions": "1", "llm_cache_entries": "1"}
+        assert "autotrader_llm_cache_hits_total{tier=\"memory\"} 1" in metrics.render()
+
+
+class TestPromptEncoding:
+    """
+    Compact prompts are much shorter and keep the window readable
+    """
+
+    def test_raw_is_unchanged(self):
+        rows = random_walk_ohlcv(30)
+        assert PromptEncoding().encode(np.asarray(rows)) == str(np.asarray(rows).tolist()).replace(
+            "[", "").replace("]", "")
+
+    def test_compact(self):
+        rows = [[1_700_000_000_000 + 60_000 * i, *row[1:]] for i, row in enumerate(random_walk_ohlcv(30))]
+        compact = PromptEncoding(kind="compact", significant_digits=4, percent_deltas=True,
+                                 columns=("time", "close"))
+        lines = compact.encode(rows).split("\n")
+
+        assert len(compact.encode(rows)) * 3 < len(PromptEncoding().encode(rows))
+        assert lines[:3] == ["time,close", "0,0", f"1,{(rows[1][4] / rows[0][4] - 1) * 100:.4g}"]
+        assert PromptEncoding(kind="compact").encode(TestData.DEFAULT_DATA_TO_TEST_API_UP).split("\n")[-1] == \
+               "0.0666667,5,5,5,5,10"
+
+
+class TestBatchPrediction:
+    """
+    Several windows share one LLM request, unusable answers fall back to single requests
+    """
+
+    @pytest.fixture
+    def app(self, monkeypatch):
+        monkeypatch.setenv("DEFAULT_PREDICTION_API", "LLM")
+        monkeypatch.setenv("LLM_BASE_URL", "http://127.0.0.1:9/v1")
+        monkeypatch.setenv("LLM_API_KEY", "key")
+        monkeypatch.setenv("LLM_MODEL", "model")
+        monkeypatch.setenv("LLM_CACHE_SIZE", "0")
+        app = PredictionApp()
+        app.calls = []
+
+        def create(messages, **_):
+            app.calls.append(messages[1]["content"])
+            content = "**W1**: UP\nW2: down." if "###" in messages[1]["content"] else "HOLD"
+            return ChatCompletion(id="0", created=0, model="model", object="chat.completion", choices=[
+                Choice(index=0, finish_reason="stop", message=ChatCompletionMessage(role="assistant", content=content))
+            ])
+
+        monkeypatch.setattr(app.llm_client.chat.completions, "create", create)
+        return app
+
+    def test_batch_with_fallback(self, app):
+        windows = {f"W{i}": random_walk_ohlcv(10, seed=i) for i in (1, 2, 3)}
+
+        assert app.predict_batch(windows) == {"W1": "up", "W2": "down", "W3": "hold"}
+        assert len(app.calls) == 2
+        assert app.calls[0].count("###") == 3
+
+    def test_batcher_coalesces_concurrent_callers(self, app):
+        batcher = PredictionBatcher(app, linger=5, max_size=2)
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            results = list(executor.map(batcher.predict, [random_walk_ohlcv(10, seed=i) for i in (1, 2)]))
+
+        assert sorted(results) == ["down", "up"]
+        assert len(app.calls) == 1
+
+
+class TestEnsemble:
+    """
+    Ensemble members run concurrently, late members are left behind at the deadline
+    """
+
+    @pytest.fixture
+    def app(self, monkeypatch, tmp_path):
+        for name, engine in (("numpy.env", "numpy"), ("streaming.env", "streaming")):
+            (tmp_path / name).write_text(
+                f"DEFAULT_PREDICTION_API=PANDAS\nPREDICTION_PANDAS_ENGINE={engine}\n"
+                "PREDICTION_OPERATIONAL_PRICE_TYPE=close_3_ema\nPREDICTION_INDICATORS_JSON=[\"close_5,15_kama\"]\n"
+                "PREDICTION_GLOBAL_SIGNAL_LAG=1\n"
+            )
+        ensemble_path = tmp_path / "ensemble.env"
+        ensemble_path.write_text(
+            "DEFAULT_PREDICTION_API=ENSEMBLE\nENSEMBLE_DEADLINE=0.3\nENSEMBLE_THRESHOLD=0.5\n"
+            'ENSEMBLE_MEMBERS_JSON=[{"predictions": "numpy.env"}, {"predictions": "streaming.env", "weight": 2}]\n'
+        )
+        monkeypatch.delenv("DEFAULT_PREDICTION_API")
+        for name in ("PREDICTION_PANDAS_ENGINE", "PREDICTION_OPERATIONAL_PRICE_TYPE", "PREDICTION_INDICATORS_JSON",
+                     "PREDICTION_GLOBAL_SIGNAL_LAG"):
+            monkeypatch.delenv(name, raising=False)
+        return PredictionApp(env_file_path=str(ensemble_path))
+
+    def test_members_from_env_files(self, app):
+        assert [(name, weight) for name, _, weight in app.ensemble_members] == [("numpy.env", 1.0),
+                                                                              ("streaming.env", 2.0)]
+        assert app.predict_up_or_down(random_walk_ohlcv(60)) in ("up", "down", "hold")
+
+    def test_deadline_voting(self, app):
+        def late(_):
+            time.sleep(1)
+            return "down"
+
+        app.ensemble_members = [("fast", lambda _: "up", 1.0), ("late", late, 1.0)]
+        started = time.perf_counter()
+
+        assert app.predict_ensemble(random_walk_ohlcv(10)) == "up"
+        assert time.perf_counter() - started < 0.6
+
+        app.ensemble_members = [("up", lambda _: "up", 1.0), ("down", lambda _: "down", 2.0)]
+        assert app.predict_ensemble(random_walk_ohlcv(10)) == "hold"
+
+    def test_running_member_skipped(self, app):
+        calls = []
+
+        def late(_):
+            calls.append(threading.get_ident())
+            time.sleep(0.5)
+            return "down"
+
+        app.ensemble_members = [("fast", lambda _: "up", 1.0), ("late", late, 1.0)]
+
+        assert app.predict_ensemble(random_walk_ohlcv(10)) == "up"
+        assert app.predict_ensemble(random_walk_ohlcv(10)) == "up"
+        assert len(calls) == 1
+
+
+class TestLlmStreaming:
+    """
+    Streamed answers are closed after the first word
+    """
+
+    class FakeStream:
+        def __init__(self, pieces, delay):
+            self.pieces, self.delay, self.closed, self.sent = pieces, delay, False, 0
+
+        def __enter__(self):
+            return self
+
+        def __exit__(self, *_):
+            self.closed = True
+
+        def __iter__(self):
+            for piece in self.pieces:
+                self.sent += 1
+                yield ChatCompletionChunk(id="0", created=0, model="model", object="chat.completion.chunk", choices=[
+                    ChunkChoice(index=0, delta=ChoiceDelta(content=piece))
+                ])
+                time.sleep(self.delay)
+
+    @pytest.mark.parametrize("api, pieces, expected, received", [
+        ("LLM", ["U", "P.", " It", " looks", " bullish"], "up", 3),
+        ("PROBABILITY_LLM", ["8", "5", ".5", " percent", " because"], "up", 4),
+        ("PROBABILITY_LLM", ["1", "0"], "down", 2),
+    ])
+    def test_early_termination(self, monkeypatch, api, pieces, expected, received):
+        monkeypatch.setenv("DEFAULT_PREDICTION_API", api)
+        monkeypatch.setenv("LLM_BASE_URL", "http://127.0.0.1:9/v1")
+        monkeypatch.setenv("LLM_API_KEY", "key")
+        monkeypatch.setenv("LLM_MODEL", "model")
+        monkeypatch.setenv("LLM_STREAM", "true")
+        monkeypatch.setenv("LLM_CACHE_SIZE", "0")
+        app = PredictionApp()
+        fake_stream = self.FakeStream(pieces, delay=0.05)
+
+        def create(stream=False, **_):
+            assert stream
+            return fake_stream
+
+        monkeypatch.setattr(app.llm_client.chat.completions, "create", create)
+
+        assert app.predict_up_or_down(random_walk_ohlcv(10)) == expected
+        assert fake_stream.closed
+        assert fake_stream.sent == received
+
+
+class TestLlmStub:
+    """
+    LLM backends against the local OpenAI-compatible stub server
+    """
+
+    @pytest.fixture
+    def use_stub(self, monkeypatch):
+        def use_stub(server, api="LLM", **variables):
+            for key, value in {"DEFAULT_PREDICTION_API": api, "LLM_BASE_URL": server.base_url, "LLM_API_KEY": "stub",
+                               "LLM_MODEL": "stub", "LLM_CACHE_SIZE": "0", "LLM_MAX_RETRIES": "0",
+                               **variables}.items():
+                monkeypatch.setenv(key, str(value))
+            return PredictionApp().predict_up_or_down
+
+        return use_stub
+
+    def test_scripted_answers_and_errors(self, use_stub):
+        with StubLlmServer(responses=["UP", "85.5 percent"]) as server:
+            assert use_stub(server)(TestData.DEFAULT_DATA_TO_TEST_API_UP) == "up"
+            assert use_stub(server, "PROBABILITY_LLM")(TestData.DEFAULT_DATA_TO_TEST_API_UP) == "up"
+
+        with StubLlmServer(error_rate=1.0) as server:
+            assert use_stub(server)(TestData.DEFAULT_DATA_TO_TEST_API_UP) == "hold"
+            assert server.errors == 1
+
+    def test_streaming_cuts_tail_latency(self, use_stub):
+        with StubLlmServer(responses=["DOWN because of the long explanation that follows"], chunk_delay=0.1) as server:
+            started = time.perf_counter()
+            assert use_stub(server, LLM_STREAM="true")(TestData.DEFAULT_DATA_TO_TEST_API_DOWN) == "down"
+            assert time.perf_counter() - started < 0.5
+
+    def test_benchmark_batches(self):
+        with StubLlmServer(responses=["UP", "DOWN"], latency="uniform:0.01,0.02") as server:
+            result = benchmark(server, predictions=16, concurrency=8, overrides={"LLM_BATCH_LINGER": 0.05,
+                                                                                "LLM_BATCH_MAX": 8})
+
+        assert result["outcomes"] == {"up": 8, "down": 8}
+        assert result["provider_requests"] < 16
+
+
+class TestTelemetry:
+    """
+    Dashboard stores are bounded, sequenced and return snapshots
+    """
+
+    def test_ring_buffer(self):
+        ring = RingBuffer(3)
+        for value in range(1, 6):
+            assert ring.append(value) == value
+
+        assert ring.snapshot() == [3, 4, 5]
+        assert ring.since(3) == [(4, 4), (5, 5)]
+        assert ring.since(5) == []
+        assert ring.latest() == 5 and len(ring) == 3
+
+    def test_dashboard_reads_are_snapshots(self):
+        before = dashboard.get_info_messages()
+        sequence = dashboard._info_messages.sequence
+        dashboard.add_info_message("telemetry test")
+
+        assert "telemetry test" not in before
+        assert dashboard.get_info_messages_since(sequence) == [(sequence + 1, "telemetry test")]
+
+    def test_dashboard_sends_only_new_entries(self):
+        for index in range(12):
+            dashboard.add_info_message(f"message {index}")
+        dashboard.add_transaction_cost(1.5)
+        dashboard.add_memory_messages("RSS 100 MB")
+
+        extend_data, messages, memory, _, cursor = dashboard.update_dashboard(0, None)
+        assert extend_data[0]["y"][0][-1] == 1.5
+        assert len(messages) == 10 and memory == "RSS 100 MB"
+        with pytest.raises(PreventUpdate):
+            dashboard.update_dashboard(1, dict(cursor))
+
+        dashboard.add_info_message("message 12")
+        extend_data, patch, memory, metrics, cursor = dashboard.update_dashboard(2, dict(cursor))
+        assert extend_data is no_update and memory is no_update and metrics is no_update
+        assert isinstance(patch, Patch) and cursor["shown"] == 10
+
+    def test_push_events_wait_for_new_entries(self):
+        cursor = {"costs": dashboard._transaction_costs.sequence, "info": dashboard._info_messages.sequence,
+                  "memory": dashboard._memory_messages.sequence, "metrics": dashboard._stage_metrics.sequence,
+                  "shown": 0}
+        events = dashboard.push_events(cursor, heartbeat=0.2)
+        assert next(events).startswith(": keep-alive")
+
+        threading.Timer(0.05, dashboard.add_transaction_cost, args=(7.0,)).start()
+        started = time.perf_counter()
+        event = json.loads(next(events).split("data: ")[1])
+
+        assert time.perf_counter() - started < 0.2
+        assert event["costs"][-1][1] == 7.0 and "info" not in event
+        assert cursor["costs"] == event["cursor"]["costs"]
+
+        for index in range(3):
+            dashboard.add_info_message(f"pushed {index}")
+        event = json.loads(next(events).split("data: ")[1])
+        assert [message for _, message in event["info"]] == ["pushed 0", "pushed 1", "pushed 2"]
+        assert event["cursor"]["shown"] == 3
+
+        dashboard.add_info_message("pushed 3")
+        event = json.loads(next(events).split("data: ")[1])
+        assert [message for _, message in event["info"]] == ["pushed 3"] and event["cursor"]["shown"] == 4
+
+    def test_shared_ring_across_processes(self, tmp_path):
+        path = tmp_path / "bot.ring"
+        subprocess.run([sys.executable, "-c", (
+            "from telemetry import SharedRing\n"
+            f"ring = SharedRing({str(path)!r}, capacity=4, slot_size=32, writer=True)\n"
+            "for index in range(6): ring.append(SharedRing.INFO, f'message {index} ' + 'x' * 40)\n"
+        )], check=True, cwd=os.path.dirname(os.path.abspath(__file__)))
+
+        entries = SharedRing(path).since(0)
+        assert [sequence for sequence, _, _ in entries] == [3, 4, 5, 6]
+        assert entries[-1][2] == "message 5 " + "x" * 6
+
+    def test_out_of_process_dashboard_aggregates_bots(self, tmp_path):
+        for name in ("bot-a", "bot-b"):
+            integration = OutputIntegration("shared", str(tmp_path), name)
+            integration.output("\t[INFO]\thello from", name)
+            integration.handle_memory_data(f"{name} RSS 64 MB")
+        dashboard.follow_shared_telemetry(str(tmp_path), interval=0.02)
+
+        deadline = time.perf_counter() + 2
+        while time.perf_counter() < deadline and "bot-b: bot-b RSS 64 MB" not in (
+                dashboard._memory_messages.latest() or ""):
+            time.sleep(0.02)
+
+        assert "[bot-a] \t[INFO]\thello from bot-a" in dashboard.get_info_messages()
+        assert dashboard._memory_messages.latest() == "bot-a: bot-a RSS 64 MB | bot-b: bot-b RSS 64 MB"
+
+    def test_restarted_bot_ring(self, tmp_path):
+        first = OutputIntegration("shared", str(tmp_path), "bot-r")
+        for index in range(50):
+            first.output("before restart", index)
+        reader = SharedRing(tmp_path / "bot-r.ring")
+        dashboard.follow_shared_telemetry(str(tmp_path), interval=0.02)
+
+        def wait_for(message):
+            deadline = time.perf_counter() + 2
+            while time.perf_counter() < deadline and message not in dashboard.get_info_messages():
+                time.sleep(0.02)
+            return message in dashboard.get_info_messages()
+
+        assert wait_for("[bot-r] before restart 49")
+        OutputIntegration("shared", str(tmp_path), "bot-r").output("after restart")
+
+        # The old mapping stays readable, the follower switches to the new generation
+        assert reader.is_replaced() and reader.since(49) == [(50, SharedRing.INFO, "before restart 49")]
+        assert wait_for("[bot-r] after restart")
+        assert not list(tmp_path.glob("*.tmp"))
+
+
+class TestMetrics:
+    """
+    Cycle stages are timed per pair and exposed as Prometheus text and on the dashboard
+    """
+
+    def test_histogram_quantiles(self):
+        histogram = LatencyHistogram()
+        for milliseconds in range(1, 1001):
+            histogram.observe(milliseconds / 1000)
+
+        for q in (0.5, 0.95, 0.99):
+            assert histogram.quantile(q) == pytest.approx(q, rel=0.25)
+        assert LatencyHistogram().quantile(0.5) is None
+
+    def test_async_cycle_stages(self, main_env):
+        bot = AsyncTradingBot(prediction_api=lambda _: "up", output_integration=OutputIntegration("dashboard"))
+        asyncio.run(bot.exchange.close())
+        bot.exchange = FakeAsyncExchange(delay=0.05)
+        bot.metrics = Metrics()
+
+        assert asyncio.run(bot.cycle())
+        bot.cancel_order_counter = bot.cancel_order_limit - 1
+        asyncio.run(bot.run_if_open_orders([{"id": "1"}, {"id": "2"}]))
+
+        stages = {stage for stage, _ in bot.metrics.histograms}
+        assert stages == {"cycle", "fetch_open_orders", "fetch_ohlcv", "predict", "fetch_balance",
+                          "fetch_order_book", "create_order", "cancel_order"}
+        assert bot.metrics.histograms["fetch_balance", (("pair", "XMR/USDT"),)].quantile(0.5) >= 0.04
+        assert bot.metrics.counters["cancels", (("pair", "XMR/USDT"),)] == 2
+
+        bot.output_metrics()
+        assert "fetch_order_book XMR/USDT" in dashboard._stage_metrics.latest()
+
+    def test_bot_outputs_own_pair(self, main_env):
+        bot = AsyncTradingBot(prediction_api=lambda _: "up", output_integration=OutputIntegration("dashboard"))
+        asyncio.run(bot.exchange.close())
+        bot.metrics = Metrics()
+        bot.metrics.observe("predict", 0.1, pair="ETH/USDT")
+        bot.count("cancels")
+        summaries = []
+        bot.metrics_output = summaries.append
+
+        bot.output_metrics()
+        assert summaries == [{"cancels XMR/USDT": "1"}]
+
+        dashboard.add_stage_metrics({"predict ETH/USDT": "p50 100.0 ms"})
+        dashboard.add_stage_metrics({"cancels XMR/USDT": "1"})
+        assert "predict ETH/USDT" in dashboard._stage_metrics.latest()
+
+    def test_cycle_excludes_backoff(self, main_env, monkeypatch):
+        bot = AsyncTradingBot(prediction_api=lambda _: None, output_integration=OutputIntegration("console"))
+        asyncio.run(bot.exchange.close())
+        bot.exchange = FakeAsyncExchange(delay=0.0)
+        bot.metrics = Metrics()
+        monkeypatch.setattr(bot, "backoff_delay", lambda: 0.3)
+
+        asyncio.run(bot.cycle())
+
+        assert bot.metrics.counters["sleeps", (("pair", "XMR/USDT"),)] == 1
+        assert bot.metrics.histograms["cycle", (("pair", "XMR/USDT"),)].quantile(0.5) < 0.1
+
+    def test_prometheus_endpoint(self):
+        metrics = Metrics()
+        metrics.observe("predict", 0.2, pair="XMR/USDT")
+        metrics.increment("order_rejections", pair="XMR/USDT", reason="invalid")
+        server = serve_metrics(0, metrics=metrics)
+
+        with urllib.request.urlopen(f"http://127.0.0.1:{server.server_address[1]}/metrics") as response:
+            text = response.read().decode()
+        server.shutdown()
+
+        assert 'autotrader_stage_duration_seconds_bucket{stage="predict",pair="XMR/USDT",le="+Inf"} 1' in text
+        assert 'autotrader_stage_duration_seconds_count{stage="predict",pair="XMR/USDT"} 1' in text
+        assert 'autotrader_order_rejections_total{pair="XMR/USDT",reason="invalid"} 1' in text
+
+
+class TestMemoryMonitor:
+    """
+    RSS sampling is the default (no tracing), tracemalloc reports allocation growth per call site
+    """
+
+    def test_rss_by_default(self, main_env, monkeypatch):
+        monkeypatch.setenv("MEMORY_SAMPLE_INTERVAL", "3600")
+        messages = []
+        bot = AsyncTradingBot(prediction_api=lambda _: "hold", output_integration=OutputIntegration("console"))
+        asyncio.run(bot.exchange.close())
+        bot.memory_output = messages.append
+
+        bot.output_memory_monitor()
+        bot.output_memory_monitor()
+        current, peak = read_rss()
+
+        assert bot.memory_monitor.mode == "rss" and not tracemalloc.is_tracing()
+        assert 0 < current <= peak
+        assert len(messages) == 1 and messages[0].startswith("\t[RSS]\t")
+
+    def test_tracemalloc_diff(self):
+        monitor = MemoryMonitor(mode="tracemalloc", interval=0, max_memory=0)
+        try:
+            assert "Top allocations" not in monitor.sample()
+            retained = [bytearray(1024) for _ in range(2000)]
+            message = monitor.sample()
+        finally:
+            tracemalloc.stop()
+
+        assert "peaked over MAX" in message and len(retained) == 2000
+        assert "test_app_cicd.py:" in message.split("Top allocations since last sample:")[1]
+
+
+class TestCandleScheduler:
+    """
+    Cycles follow candle closes, open orders are polled in between within the rate-limit headroom
+    """
+
+    def test_wakeups(self):
+        scheduler = CandleScheduler("1m", offset=2, poll_interval=10)
+        now = 1000 * 60 + 30
+
+        assert scheduler.start_cycle(now) and scheduler.next_close == 1001 * 60 + 2
+        assert scheduler.delay(False, now) == 32 and scheduler.delay(True, now) == 10
+        assert not scheduler.start_cycle(now + 10)
+        assert scheduler.delay(True, now + 30) == 2
+        assert scheduler.start_cycle(1001 * 60 + 2.5) and scheduler.next_close == 1002 * 60 + 2
+        shared = CandleScheduler("1m", poll_interval=1, rate_limit=2, headroom=0.25)
+        assert shared.poll_interval == 8
+        shared.share_budget(bots=3)
+        assert shared.poll_interval == 24
+
+    def test_polls_only_look_for_fills(self, main_env):
+        bot = AsyncTradingBot(prediction_api=lambda _: "hold", output_integration=OutputIntegration("console"))
+        asyncio.run(bot.exchange.close())
+        bot.exchange = FakeAsyncExchange(delay=0.0)
+        open_orders = [{"id": "1"}]
+
+        async def fetch_open_orders(symbol):
+            return open_orders
+
+        bot.exchange.fetch_open_orders = fetch_open_orders
+        assert asyncio.run(bot.cycle()) and bot.cancel_order_counter == 1
+        assert 0 < bot.next_cycle_delay() <= 10
+
+        assert asyncio.run(bot.cycle()) and bot.cancel_order_counter == 1
+
+        open_orders.clear()
+        assert asyncio.run(bot.cycle()) and bot.cancel_order_counter == 0
+        assert bot.next_cycle_delay() > 0 and not bot.has_open_orders
+
+    def test_polls_right_after_placement(self, main_env):
+        bot = AsyncTradingBot(prediction_api=lambda _: "up", output_integration=OutputIntegration("console"))
+        asyncio.run(bot.exchange.close())
+        bot.exchange = FakeAsyncExchange(delay=0.0)
+
+        assert asyncio.run(bot.cycle()) and bot.exchange.orders
+        assert bot.has_open_orders and 0 < bot.next_cycle_delay() <= bot.scheduler.poll_interval
+
+
+class TestResilience:
+    """
+    Network errors are retried with backoff, failing endpoints are cut off by their circuit breaker
+    """
+
+    def test_backoff(self):
+        backoff = Backoff(base=0.1, cap=1.0, generator=random.Random(7))
+
+        assert all(0 <= backoff.delay(0) <= 0.1 for _ in range(100))
+        assert all(0 <= backoff.delay(10) <= 1.0 for _ in range(100))
+        assert max(backoff.delay(3) for _ in range(100)) > 0.4
+
+    def test_retries_network_errors(self):
+        resilience = Resilience(max_attempts=3, backoff=Backoff(base=0.001), metrics=Metrics(), pair="XMR/USDT")
+        outcomes = [ccxt.RequestTimeout("timeout"), ccxt.RateLimitExceeded("429"), "ok"]
+
+        def request():
+            outcome = outcomes.pop(0)
+            if isinstance(outcome, Exception):
+                raise outcome
+            return outcome
+
+        assert resilience.call("fetch_balance", request) == "ok"
+        assert resilience.metrics.counters["retries", (("endpoint", "fetch_balance"), ("pair", "XMR/USDT"))] == 2
+
+        def rejected():
+            raise ccxt.InsufficientFunds("no funds")
+
+        for _ in range(10):
+            with pytest.raises(ccxt.InsufficientFunds):
+                resilience.call("create_order", rejected)
+        assert resilience.states() == {"fetch_balance": "closed", "create_order": "closed"}
+
+    def test_circuit_half_open_probe(self):
+        resilience = Resilience(max_attempts=1, failure_threshold=2, reset_timeout=0.05, metrics=Metrics())
+        calls = []
+
+        async def fetch_order_book(fail):
+            calls.append(fail)
+            if fail:
+                raise ccxt.ExchangeNotAvailable("maintenance")
+            return {"bids": [], "asks": []}
+
+        async def scenario():
+            for _ in range(2):
+                with pytest.raises(ccxt.ExchangeNotAvailable):
+                    await resilience.call_async("fetch_order_book", fetch_order_book, True)
+            with pytest.raises(CircuitOpenError):
+                await resilience.call_async("fetch_order_book", fetch_order_book, False)
+            assert len(calls) == 2
+
+            await asyncio.sleep(0.06)
+            with pytest.raises(ccxt.ExchangeNotAvailable):
+                await resilience.call_async("fetch_order_book", fetch_order_book, True)
+            assert resilience.states()["fetch_order_book"] == CircuitBreaker.OPEN
+
+            await asyncio.sleep(0.06)
+            return await resilience.call_async("fetch_order_book", fetch_order_book, False)
+
+        assert asyncio.run(scenario()) == {"bids": [], "asks": []}
+        assert resilience.states()["fetch_order_book"] == CircuitBreaker.CLOSED
+        assert resilience.metrics.counters["circuit_opens", (("endpoint", "fetch_order_book"),)] == 2
+        assert 'autotrader_circuit_state{endpoint="fetch_order_book"} 0' in resilience.metrics.render()
+
+    def test_cancelled_probe_released(self):
+        resilience = Resilience(max_attempts=1, failure_threshold=1, reset_timeout=0.05, metrics=Metrics())
+
+        async def unavailable():
+            raise ccxt.ExchangeNotAvailable("maintenance")
+
+        async def hanging():
+            await asyncio.sleep(10)
+
+        async def scenario():
+            with pytest.raises(ccxt.ExchangeNotAvailable):
+                await resilience.call_async("fetch_balance", unavailable)
+            await asyncio.sleep(0.06)
+            with pytest.raises(asyncio.TimeoutError):
+                await asyncio.wait_for(resilience.call_async("fetch_balance", hanging), timeout=0.01)
+
+            await asyncio.sleep(0.06)
+            return await resilience.call_async("fetch_balance", asyncio.sleep, 0, "ok")
+
+        assert asyncio.run(scenario()) == "ok"
+        assert resilience.states()["fetch_balance"] == CircuitBreaker.CLOSED
+
+    def test_breaker_shared_across_threads(self):
+        resilience = Resilience(metrics=Metrics())
+        barrier = threading.Barrier(8)
+
+        def breaker(_):
+            barrier.wait()
+            return resilience.breaker("cancel_order")
+
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            breakers = set(map(id, executor.map(breaker, range(8))))
+
+        assert breakers == {id(resilience.breaker("cancel_order"))}
+
+
+class TestAccountBook:
+    """
+    Open orders and balances come from the local book, the exchange is asked only when the book is due
+    """
+
+    def test_optimistic_updates(self):
+        book = AccountBook("XMR", "USDT", reconcile_interval=3600)
+        assert book.orders_due() and book.balance_due()
+
+        book.reconcile_orders([])
+        book.reconcile_balance({"XMR": {"free": 2.0, "used": 0.0}, "USDT": {"free": 300.0}})
+        book.record_order({"id": "1", "amount": None}, "limit", "buy", 1.0, 100.0)
+        book.record_order({"id": "2"}, "limit", "sell", 0.5, 110.0)
+
+        assert book.orders_due() and not book.balance_due()
+        assert book.balance == {"XMR": {"free": 1.5, "used": 0.5}, "USDT": {"free": 200.0, "used": 100.0}}
+        assert book.orders["1"]["amount"] == 1.0 and book.orders["2"]["side"] == "sell"
+
+        book.record_fill({"id": "2", "status": "closed"})
+        assert list(book.orders) == ["1"] and book.balance_due()
+
+        book.reconcile_balance({"XMR": {"free": 1.5, "used": 0.0}, "USDT": {"free": 255.0, "used": 100.0}})
+        book.reconcile_orders([])
+        assert not book.orders and not book.orders_due() and book.balance_due()
+
+    def test_shared_balances(self):
+        books = [AccountBook("XMR", "USDT", 3600), AccountBook("BTC", "USDT", 3600), AccountBook("ETH", "USDT", 3600)]
+        AccountBook.share_balances(books)
+        for book in books:
+            book.reconcile_balance({book.base_asset: {"free": 1.0}, "USDT": {"free": 300.0}})
+
+        books[0].record_order({"id": "1"}, "limit", "buy", 1.0, 200.0)
+        assert not books[0].balance_due() and books[1].balance_due() and books[2].balance_due()
+        assert books[0].balance["USDT"]["free"] == 100.0
+
+    def test_fewer_private_requests(self, main_env, monkeypatch):
+        monkeypatch.setenv("ACCOUNT_RECONCILE_INTERVAL", "3600")
+        predictions = ["hold"] * 5 + ["up"] * 3
+        bot = AsyncTradingBot(prediction_api=lambda _: predictions.pop(0),
+                              output_integration=OutputIntegration("console"))
+        asyncio.run(bot.exchange.close())
+        bot.exchange = FakeAsyncExchange(delay=0.0)
+        bot.metrics = Metrics()
+        calls = []
+
+        async def fetch_open_orders(symbol):
+            calls.append("fetch_open_orders")
+            return list(bot.account.orders.values())
+
+        async def fetch_balance():
+            calls.append("fetch_balance")
+            return {"XMR": {"free": 2.0}, "USDT": {"free": 300.0}}
+
+        bot.exchange.fetch_open_orders, bot.exchange.fetch_balance = fetch_open_orders, fetch_balance
+        assert bot.scheduler.poll_interval == 10
+
+        async def scenario():
+            for _ in range(6):
+                await bot.cycle(is_candle_closed=True)
+            # Polls while an order is open ask the exchange
+            await bot.cycle(is_candle_closed=False)
+            bot.account.record_fill({"id": "1"})
+            await bot.cycle(is_candle_closed=False)
+
+        asyncio.run(scenario())
+
+        assert calls == ["fetch_open_orders", "fetch_balance", "fetch_open_orders", "fetch_balance"]
+        assert len(bot.exchange.orders) == 2 and bot.account.balance["USDT"]["used"] == pytest.approx(150.0)
+        assert bot.metrics.counters["requests_saved", (("pair", "XMR/USDT"), ("request", "fetch_open_orders"))] == 6
+
+    @staticmethod
+    def private_calls(has_fills, reconcile_interval):
+        bot = AsyncTradingBot(prediction_api=lambda _: "up", output_integration=OutputIntegration("console"))
+        asyncio.run(bot.exchange.close())
+        bot.exchange = FakeAsyncExchange(delay=0.0)
+        bot.account.reconcile_interval = reconcile_interval
+        calls = []
+
+        async def fetch_open_orders(symbol):
+            calls.append("fetch_open_orders")
+            return list(bot.account.orders.values())
+
+        async def fetch_balance():
+            calls.append("fetch_balance")
+            return {"XMR": {"free": 2.0}, "USDT": {"free": 300.0}}
+
+        bot.exchange.fetch_open_orders, bot.exchange.fetch_balance = fetch_open_orders, fetch_balance
+        feed = SimulatedFeed(random_walk_ohlcv(30), "XMR/USDT", has_fills=has_fills)
+        asyncio.run(bot.main_event_driven(feed))
+        return calls, len(bot.exchange.orders)
+
+    def test_fill_feed_saves_polls(self, main_env):
+        baseline, baseline_orders = self.private_calls(has_fills=False, reconcile_interval=0)
+        calls, orders = self.private_calls(has_fills=True, reconcile_interval=300)
+
+        # Same orders (placed, cancelled after CANCEL_ORDER_LIMIT candles, placed again), several times fewer calls
+        assert orders == baseline_orders == 10
+        assert calls.count("fetch_open_orders") == 1 and len(calls) * 3 <= len(baseline)
+
+
+class FakeSyncExchange:
+    """
+    Offline stand-in for a sync ccxt exchange without bulk cancel endpoints, every cancel takes `delay` seconds
+    """
+
+    has = {"cancelAllOrders": False, "cancelOrders": "emulated"}
+    rateLimit = 0
+
+    def __init__(self, delay):
+        self.delay = delay
+
+    def cancel_order(self, id, symbol):
+        time.sleep(self.delay)
+        if id == "gone":
+            raise ccxt.OrderNotFound(f"order {id} not found")
+        return {"id": id}
+
+
+class TestCancellation:
+    """
+    Open orders are cancelled in one bulk request where the exchange has one, concurrently otherwise
+    """
+
+    def test_bulk_cancel(self, main_env):
+        bot = AsyncTradingBot(prediction_api=lambda _: "hold", output_integration=OutputIntegration("console"))
+        asyncio.run(bot.exchange.close())
+        bot.exchange = FakeAsyncExchange(delay=0.0)
+        bot.exchange.has = {"cancelAllOrders": False, "cancelOrders": True}
+        requests = []
+
+        async def cancel_orders(ids, symbol):
+            requests.append(ids)
+            return [{"id": order_id} for order_id in ids]
+
+        bot.exchange.cancel_orders = cancel_orders
+        bot.account.reconcile_orders([{"id": str(i)} for i in range(5)])
+        bot.cancel_order_counter = bot.cancel_order_limit - 1
+
+        assert asyncio.run(bot.run_if_open_orders(bot.account.open_orders()))
+        assert requests == [["0", "1", "2", "3", "4"]] and not bot.account.orders
+
+        bot.exchange.has["cancelAllOrders"] = True
+        assert bot.bulk_cancel_endpoint(is_all=True) == "cancel_all_orders"
+        assert bot.bulk_cancel_endpoint(is_all=False) == "cancel_orders"
+
+    def test_concurrent_fallback(self, main_env):
+        bot = TradingBot(prediction_api=lambda _: "hold", output_integration=OutputIntegration("console"),
+                         exchange=FakeSyncExchange(delay=0.2))
+        bot.account.reconcile_orders([{"id": "1"}, {"id": "2"}, {"id": "gone"}, {"id": "3"}])
+        started = time.perf_counter()
+
+        results = bot.cancel_orders(["1", "2", "gone", "3"], is_all=True)
+        bot.output_cancel_results(results)
+
+        assert time.perf_counter() - started < 0.35
+        assert results["1"] is None and results["3"] is None and isinstance(results["gone"], ccxt.OrderNotFound)
+        assert list(bot.account.orders) == ["gone"]
+
+
+class TestMarketsCache:
+    """
+    Cached markets are loaded without network and supply precision and limits to orders
+    """
+
+    MARKET = {
+        "id": "XMR-USDT", "symbol": "XMR/USDT", "base": "XMR", "quote": "USDT", "baseId": "XMR", "quoteId": "USDT",
+        "type": "spot", "spot": True, "precision": {"amount": 0.0001, "price": 0.01},
+        "limits": {"amount": {"min": 0.001}, "cost": {"min": 1.0}}
+    }
+
+    def test_versioned_file(self, tmp_path):
+        exchange = ccxt.kucoin()
+        exchange.set_markets({"XMR/USDT": self.MARKET})
+        cache = MarketsCache(tmp_path, "kucoin", ttl=3600)
+        cache.save(exchange)
+
+        restored = ccxt.kucoin()
+        assert MarketsCache(tmp_path, "kucoin").load(restored) and not cache.is_expired()
+        assert restored.amount_to_precision("XMR/USDT", 1.234567) == "1.2345"
+
+        payload = json.loads((tmp_path / "kucoin_markets.json").read_text())
+        (tmp_path / "kucoin_markets.json").write_text(json.dumps({**payload, "version": MarketsCache.VERSION + 1}))
+        assert not MarketsCache(tmp_path, "kucoin").load(ccxt.kucoin())
+
+    def test_orders_use_limits(self, main_env, monkeypatch, tmp_path):
+        cached = ccxt.kucoin()
+        cached.set_markets({"XMR/USDT": self.MARKET})
+        MarketsCache(tmp_path, "kucoin").save(cached)
+        monkeypatch.setenv("MARKETS_CACHE_DIR", str(tmp_path))
+        monkeypatch.setenv("MARKETS_CACHE_TTL", "0")
+
+        exchange = ccxt.kucoin()
+        orders = []
+        exchange.create_order = lambda **order: orders.append(order) or {"id": str(len(orders))}
+        exchange.load_markets = lambda reload=False: exchange.markets
+        bot = TradingBot(prediction_api=lambda _: "hold", output_integration=OutputIntegration("console"),
+                         exchange=exchange)
+        bot.metrics = Metrics()
+
+        assert bot.order("limit", "buy", 1.234567, 123.456789) == {"id": "1"}
+        assert orders[0]["amount"] == 1.2345 and orders[0]["price"] == 123.46
+        assert bot.order("limit", "buy", 0.00001, 100.0) == {} and bot.order("limit", "sell", 0.005, 100.0) == {}
+        assert bot.metrics.counters["order_rejections", (("pair", "XMR/USDT"), ("reason", "too_small"))] == 2
+
+        fetched_at = bot.markets_cache.fetched_at
+        bot.refresh_markets()
+        deadline = time.monotonic() + 5
+        while bot.markets_cache.is_refreshing and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert bot.markets_cache.fetched_at > fetched_at
+
+    def test_shared_exchange_refreshed_once(self, tmp_path):
+        exchange = ccxt.kucoin()
+        exchange.set_markets({"XMR/USDT": self.MARKET})
+        caches = [MarketsCache(tmp_path, "kucoin", ttl=3600) for _ in range(2)]
+
+        assert caches[0].start_refresh(exchange) and not caches[1].start_refresh(exchange)
+        exchange.load_markets = lambda reload=False: exchange.markets
+        caches[0].refresh(exchange)
+
+        assert not caches[1].start_refresh(exchange) and not caches[1].is_expired()
+        assert [path.name for path in tmp_path.iterdir()] == ["kucoin_markets.json"]
+
+    def test_cold_start_loads_in_cycle(self, main_env, monkeypatch, tmp_path):
+        monkeypatch.setenv("MARKETS_CACHE_DIR", str(tmp_path))
+        exchange = ccxt.kucoin()
+        loads = []
+
+        def load_markets(reload=False):
+            loads.append(threading.current_thread().name)
+            exchange.set_markets({"XMR/USDT": self.MARKET})
+            return exchange.markets
+
+        exchange.load_markets = load_markets
+        bot = TradingBot(prediction_api=lambda _: "hold", output_integration=OutputIntegration("console"),
+                         exchange=exchange)
+        bot.refresh_markets()
+
+        assert loads == [threading.current_thread().name] and bot.market["symbol"] == "XMR/USDT"
+        assert MarketsCache(tmp_path, "kucoin").load(ccxt.kucoin())
+
+    def test_failed_refresh_backs_off(self, tmp_path):
+        exchange = ccxt.kucoin()
+        cache = MarketsCache(tmp_path, "kucoin", ttl=3600)
+        cache.RETRY_BACKOFF = Backoff(base=0.1, cap=0.1, generator=random.Random(7))
+        attempts = []
+
+        def load_markets(reload=False):
+            attempts.append(reload)
+            raise ccxt.ExchangeNotAvailable("maintenance")
+
+        exchange.load_markets = load_markets
+        for _ in range(3):
+            if cache.start_refresh(exchange):
+                with pytest.raises(ccxt.ExchangeNotAvailable):
+                    cache.refresh(exchange)
+        assert attempts == [True]
+
+        time.sleep(0.11)
+        assert cache.start_refresh(exchange)
@@ -1,23 +1,32 @@
 # Python default library ---------
 import sys
-import tracemalloc
+import threading
+from contextlib import contextmanager
+from concurrent.futures import Future, ThreadPoolExecutor
 from datetime import datetime
 from os import getenv
-from time import sleep
-from typing import Any, Callable, Literal, Mapping, Self, Collection
+from time import perf_counter, sleep
+from typing import Any, Callable, ContextManager, Iterator, Literal, Mapping, Self, Collection
 # --------------------------------
 
 # External modules ---------------
 import ccxt
-from ccxt.base.errors import InvalidOrder
+from ccxt.base.errors import InsufficientFunds, InvalidOrder
 from ccxt import Exchange
 from dotenv import load_dotenv
 # --------------------------------
 
 
 # Own modules --------------------
+from account_book import AccountBook
+from candle_store import CandleStore
 from config import GeneralParameters
 from integrate_dashboard import OutputIntegration
+from markets_cache import MarketsCache
+from memory_monitor import MemoryMonitor
+from resilience import Resilience
+from scheduler import CandleScheduler
+from telemetry import METRICS, Metrics, serve_metrics
 # --------------------------------
 
 
@@ -30,22 +39,24 @@ class TradingBot:
 
     # Default maximum RAM capacity (in MB)
     DEFAULT_MAX_RAM: int = GeneralParameters.DEFAULT_MAX_RAM_MB
-    SQ_1024: int = 1024 * 1024
+
+    # Concurrent cancels on exchanges without bulk cancel endpoints (shared by all bots of the process)
+    CANCEL_EXECUTOR: ThreadPoolExecutor = ThreadPoolExecutor(max_workers=8, thread_name_prefix="cancel")
 
     def __init__(
             self: Self,
             prediction_api: Callable[[Any], str],
             output_integration: OutputIntegration | None = None,
-            env_file_path: str | None = None
+            env_file_path: str | None = None,
+            exchange: Exchange | None = None
     ) -> None:
         """
 
         :param env_file_path: filename of .env file to use for app
         :param prediction_api: function
+        :param exchange: already instantiated exchange to share (created from .env variables, if None)
         """
 
-        tracemalloc.start()
-
         # If .env filepath is supplied, use it. Or else '.env' is used.
         env_file_path = env_file_path or ".env"
         load_dotenv(dotenv_path=env_file_path)
@@ -63,6 +74,7 @@ class TradingBot:
             self.user_output = output_integration.output
             self.handle_data = output_integration.handle_data
             self.memory_output = output_integration.handle_memory_data
+            self.metrics_output = output_integration.handle_metrics_data
 
         else:
             sys.exit(f"No valid exchange name provided\n"
@@ -72,7 +84,8 @@ class TradingBot:
         self.algorithm_trust_percentage: float = float(getenv("ALGORITHM_TRUST_PERCENTAGE"))
         self.data_vector_length: int = int(getenv("DATA_VECTOR_LENGTH"))
         self.premium: float = float(getenv("PREMIUM_OVER_EXCHANGE_FEES")) + self.fee
-        self.min_transaction_value_in_base: float = float(getenv("MIN_TRANSACTION_VALUE_IN_BASE"))
+        # Exchange limits of the pair apply too, when its markets are known
+        self.min_transaction_value_in_base: float = float(getenv("MIN_TRANSACTION_VALUE_IN_BASE") or 0)
 
         # Timeframe of data
         self.timeframe: str = getenv("TIMEFRAME")
@@ -81,26 +94,24 @@ class TradingBot:
         self.cancel_order_limit: int = int(getenv("CANCEL_ORDER_LIMIT")) or 3
         self.cancel_order_counter: int = 0
 
-        # Times to retry after failure
-        self.retries_before_sleep_limit: int = int(getenv("RETRIES_BEFORE_SLEEP_LIMIT")) or 4
-        self.retries_before_sleep_counter: int = 0
+        # Failed cycles in a row (pauses after failures grow with it)
+        self.consecutive_failures: int = 0
 
-        # Optimal sleep time also works
+        # Longest pause after errors (and pause between cycles in `fixed` schedule). Optimal sleep time also works
         self.base_sleep_time: int = int(getenv("BASE_SLEEP_TIME")) or \
                                     min(max(self.data_vector_length // 2,
                                             self.cancel_order_limit),
                                         5) * 60
 
         # Instantiate the Exchange class
-        self.exchange: Exchange = getattr(ccxt, self.exchange_name)()
+        self.exchange: Exchange = exchange or self.create_exchange()
 
-        # Set sandbox mode to True or False (currently, True is not supported on kucoin)
-        self.exchange.set_sandbox_mode(enabled=False)
+        # Cycles right after candle closes (`candle`, default) or every `BASE_SLEEP_TIME` seconds (`fixed`)
+        self.scheduler: CandleScheduler | None = CandleScheduler.from_env(self.timeframe, self.exchange) \
+            if (getenv("SCHEDULE") or "candle").lower() == "candle" else None
 
-        # Set your API keys
-        self.exchange.apiKey = self.exchange_api_key
-        self.exchange.secret = self.exchange_secret
-        self.exchange.password = self.exchange_password  # it's called `passphrase` on KuCoin
+        # Whether the last cycle found open orders (None if it failed)
+        self.has_open_orders: bool | None = None
 
         # Set the symbol you want to trade on KuCoin
         self.symbol: str = getenv("TRADING_PAIR")
@@ -108,8 +119,76 @@ class TradingBot:
         self.base_asset: str = pair_lst[0]
         self.quote_asset: str = pair_lst[1]
 
+        # Local open orders and balances (the exchange is asked only when the book is due)
+        self.account: AccountBook = AccountBook.from_env(self.base_asset, self.quote_asset)
+
         self.predict_up_or_down: Callable[[Any], str] = prediction_api
 
+        # RSS samples by default, tracemalloc (slow) only when diagnosing
+        self.memory_monitor: MemoryMonitor = MemoryMonitor.from_env(max_memory=self.DEFAULT_MAX_RAM)
+
+        # Stage latencies and counters (shared by all bots of the process, labelled by pair)
+        self.metrics: Metrics = METRICS
+        # Backoff pauses so far, left out of the `cycle` stage (see `timed_cycle`)
+        self.slept_seconds: float = 0.0
+        metrics_port: str | None = getenv("METRICS_PORT")
+        if metrics_port:
+            serve_metrics(int(metrics_port), getenv("METRICS_HOST") or "127.0.0.1")
+
+        # Retries with backoff and a circuit breaker per endpoint (exchange requests and the predictor)
+        self.resilience: Resilience = Resilience.from_env(cap=self.base_sleep_time, metrics=self.metrics,
+                                                          pair=self.symbol)
+
+        # Optional local candle store (only new candles are downloaded every cycle)
+        candle_store_dir: str | None = getenv("CANDLE_STORE_DIR")
+        self.candle_store: CandleStore | None = CandleStore(
+            directory=candle_store_dir,
+            exchange_name=self.exchange_name,
+            symbol=self.symbol,
+            timeframe=self.timeframe
+        ) if candle_store_dir else None
+
+        # Optional markets cache (precision and limits of the pair are known at startup, without downloading markets)
+        markets_cache_dir: str | None = getenv("MARKETS_CACHE_DIR")
+        self.markets_cache: MarketsCache | None = MarketsCache(
+            directory=markets_cache_dir,
+            exchange_name=self.exchange_name,
+            ttl=float(getenv("MARKETS_CACHE_TTL") or 86400)
+        ) if markets_cache_dir else None
+        if self.markets_cache:
+            self.markets_cache.load(self.exchange)
+
+    def create_exchange(self: Self) -> Exchange:
+        """
+        Instantiate and authenticate the ccxt exchange
+
+        :return: Exchange instance
+        """
+
+        exchange: Exchange = getattr(ccxt, self.exchange_name)()
+
+        # Set sandbox mode to True or False (currently, True is not supported on kucoin)
+        exchange.set_sandbox_mode(enabled=False)
+
+        # Set your API keys
+        exchange.apiKey = self.exchange_api_key
+        exchange.secret = self.exchange_secret
+        exchange.password = self.exchange_password  # it's called `passphrase` on KuCoin
+        return exchange
+
+    def fetch_data(self: Self) -> Any:
+        """
+        Get the latest `data_vector_length` candles (from the local store, if there is one)
+
+        :return: ccxt OHLCV rows or a float array view of shape (n, 6)
+        """
+
+        if self.candle_store:
+            return self.timed_call("fetch_ohlcv", self.candle_store.sync, self.exchange, self.data_vector_length)
+
+        return self.timed_call("fetch_ohlcv", self.exchange.fetch_ohlcv, self.symbol, self.timeframe,
+                               limit=self.data_vector_length)
+
     def order(self: Self,
               order_type: Literal["market", "limit"],
               buy_or_sell: Literal["buy", "sell"],
@@ -125,35 +204,158 @@ class TradingBot:
         :return:
         """
         try:
-            transaction_cost: float = round(amount * float(price), 2)
-            self.user_output(f"\t[INFO]\t⭐️ Trying to {buy_or_sell} {self.base_asset} with "
-                  f"total transaction value ≈ {transaction_cost} {self.quote_asset}.")
-            if amount > self.min_transaction_value_in_base:
-                order_id: Mapping[str, Any] = self.exchange.create_order(
-                    symbol=self.symbol,
-                    type=order_type,
-                    side=buy_or_sell,
-                    amount=amount,
-                    price=price
-                )
-            else:
-                raise ValueError("\t[INFO]\t⛔️ Won't process order (transaction too small).\n")
+            amount, price, transaction_cost = self.check_order(buy_or_sell, amount, price)
+            # Not retried, a timed out request may still have placed the order
+            order_id: Mapping[str, Any] = self.timed_call(
+                "create_order",
+                self.exchange.create_order,
+                retry=False,
+                symbol=self.symbol,
+                type=order_type,
+                side=buy_or_sell,
+                amount=amount,
+                price=price
+            )
+
+        except (InvalidOrder, InsufficientFunds, ValueError) as error:
+            self.output_order_rejection(error)
+            return {}
+
+        return self.output_placed_order(order_id, order_type, buy_or_sell, amount, price, transaction_cost)
 
-        except InvalidOrder as error:
+    def check_order(self: Self,
+                    buy_or_sell: Literal["buy", "sell"],
+                    amount: float,
+                    price: float | None) -> tuple[float, float | None, float]:
+        """
+        Round an order to the pair's precision and check that it can be placed (shared by the sync and async bots)
+
+        :param buy_or_sell: side
+        :param amount: in base asset
+        :param price: in quote asset
+        :return: (amount, price, transaction cost in quote asset)
+        :raises ValueError: the order is too small
+        """
+
+        amount, price = self.round_order(amount, price)
+        transaction_cost: float = round(amount * float(price), 2)
+        self.user_output(f"\t[INFO]\t⭐️ Trying to {buy_or_sell} {self.base_asset} with "
+                         f"total transaction value ≈ {transaction_cost} {self.quote_asset}.")
+        if self.is_too_small(amount, price):
+            raise ValueError("\t[INFO]\t⛔️ Won't process order (transaction too small).\n")
+
+        return amount, price, transaction_cost
+
+    def output_order_rejection(self: Self, error: Exception) -> None:
+        """
+        Report an order that wasn't placed
+
+        :param error: `InvalidOrder`, `InsufficientFunds` or `ValueError` (too small) from `check_order`
+        :return: None
+        """
+
+        # Balances of the book were stale (e.g. another pair of the account spent them)
+        if isinstance(error, InsufficientFunds):
+            self.count("order_rejections", reason="insufficient_funds")
+            self.account.invalidate_balance()
+            self.user_output(f"\t[ERROR]\tInsufficient funds:\n\t\t{error}.\n")
+
+        elif isinstance(error, InvalidOrder):
+            self.count("order_rejections", reason="invalid")
             self.user_output(f"\t[ERROR]\tInvalid order:\n\t\t{error}.\n")
-            return {}
 
-        except ValueError as error:
+        else:
+            self.count("order_rejections", reason="too_small")
             self.user_output(str(error))
-            return {}
 
-        else:
+    def output_placed_order(self: Self,
+                            order: Mapping[str, Any],
+                            order_type: Literal["market", "limit"],
+                            buy_or_sell: Literal["buy", "sell"],
+                            amount: float,
+                            price: float,
+                            transaction_cost: float) -> Mapping[str, Any]:
+        """
+        Report an order accepted by the exchange and add it to the account book
+
+        :param order: ccxt order returned by `create_order`
+        :param order_type: `limit` or `market`
+        :param buy_or_sell: side
+        :param amount: in base asset
+        :param price: in quote asset
+        :param transaction_cost: in quote asset
+        :return: the order
+        """
+
+        self.user_output(f"[ACTION DONE]\t🤝 Place a limit {buy_or_sell} order"
+                         f" of {self.base_asset.lower()}{amount} x"
+                         f" {self.quote_asset.lower()}{price} ≈ {self.quote_asset.lower()}{transaction_cost}")
+        self.account.record_order(order, order_type, buy_or_sell, amount, price)
+        # Fills of the new order are polled for right away, not only after the next candle close
+        self.has_open_orders = True
+        self.handle_data(transaction_cost)
+        return order
+
+    @property
+    def market(self: Self) -> Mapping[str, Any] | None:
+        """Exchange market of the pair (precision and limits), None until markets are loaded"""
+
+        return (getattr(self.exchange, "markets", None) or {}).get(self.symbol)
+
+    def round_order(self: Self, amount: float, price: float | None) -> tuple[float, float | None]:
+        """
+        Round an order to the pair's precision (amount down, so it never exceeds the balance), if markets are known
+
+        :param amount: in base asset
+        :param price: in quote asset
+        :return: (amount, price), amount is 0 if it's under the amount precision
+        """
 
-            self.user_output(f"[ACTION DONE]\t🤝 Place a limit {buy_or_sell} order"
-                  f" of {self.base_asset.lower()}{amount} x"
-                  f" {self.quote_asset.lower()}{price} ≈ {self.quote_asset.lower()}{transaction_cost}")
-            self.handle_data(transaction_cost)
-            return order_id
+        if self.market is None:
+            return amount, price
+
+        if price is not None:
+            price = float(self.exchange.price_to_precision(self.symbol, price))
+        try:
+            return float(self.exchange.amount_to_precision(self.symbol, amount)), price
+        except InvalidOrder:
+            return 0.0, price
+
+    def is_too_small(self: Self, amount: float, price: float | None) -> bool:
+        """
+        Whether an order is under `MIN_TRANSACTION_VALUE_IN_BASE` or the pair's minimum amount or cost
+
+        :param amount: in base asset
+        :param price: in quote asset
+        :return: bool
+        """
+
+        limits: Mapping[str, Any] = (self.market or {}).get("limits") or {}
+        min_amount: float = (limits.get("amount") or {}).get("min") or 0.0
+        min_cost: float = (limits.get("cost") or {}).get("min") or 0.0
+        return amount <= self.min_transaction_value_in_base or amount < min_amount or \
+            (price is not None and amount * price < min_cost)
+
+    def refresh_markets(self: Self) -> None:
+        """
+        Refresh expired cached markets in a background thread (cycles go on with the cached ones),
+        load them before the cycle if nothing is cached
+
+        :return: None
+        """
+
+        if self.markets_cache and self.markets_cache.start_refresh(self.exchange):
+            # Nothing cached: loaded right away, a background load would race the lazy one of the first request
+            if self.markets_cache.fetched_at is None:
+                self.run_markets_refresh()
+            else:
+                threading.Thread(target=self.run_markets_refresh, name="markets", daemon=True).start()
+
+    def run_markets_refresh(self: Self) -> None:
+        try:
+            self.markets_cache.refresh(self.exchange)
+        except Exception as error:
+            self.user_output(f"\t[WARNING]\tCould not refresh markets:\n\t\t{error}.\n")
 
     def prepare_order(self: Self) -> tuple[float | None, float | None, float | None, float | None]:
         """
@@ -165,35 +367,58 @@ class TradingBot:
         self.user_output("\n\t[INFO]\tFetch the current info for the symbol.")
 
         # Get current balance
-        balance = self.exchange.fetch_balance()
-        base_asset_balance = balance[self.base_asset]["free"]
-        quote_asset_balance = balance[self.quote_asset]["free"]
-        self.user_output(f"\t[INFO]\t💰 {self.base_asset} balance: {base_asset_balance}")
-        self.user_output(f"\t[INFO]\t💵 {self.quote_asset} balance: {quote_asset_balance}")
+        balance: Mapping[str, Any] = self.get_balance()
 
         try:
-            orderbook: Mapping[str, Any] = self.exchange.fetch_order_book(symbol=self.symbol)
-            all_bids, all_asks = orderbook["bids"], orderbook["asks"]
-            bid: Any = all_bids[0][0] if len(all_bids) > 0 else None
-            ask: Any = all_asks[0][0] if len(all_asks) > 0 else None
-            if not ask:
-                raise Exception("Ask price is None")
-            if not bid:
-                raise Exception("Bid price is None")
+            orderbook: Mapping[str, Any] = self.timed_call("fetch_order_book", self.exchange.fetch_order_book,
+                                                           symbol=self.symbol)
+            bid, ask = self.best_bid_ask(orderbook)
 
         except BaseException as error:
             self.user_output(f"\t[WARNING]\t...Retrying because of some error:\n\t\t{error}.\n")
-            self.retries_before_sleep_counter += 1
-            if self.retries_before_sleep_counter == self.retries_before_sleep_limit:
-                self.retries_before_sleep_counter = 0
-                self.self_sleep()
+            self.self_sleep()
             return None, None, None, None
 
-        # Check the current bid and ask prices
-        bid: float = float(bid)
-        ask: float = float(ask)
+        return self.quote_order(balance, bid, ask)
+
+    @staticmethod
+    def best_bid_ask(orderbook: Mapping[str, Any]) -> tuple[float, float]:
+        """
+        Top of the order book
+
+        :param orderbook: ccxt order book (or its top only)
+        :return: (bid, ask)
+        """
+
+        all_bids, all_asks = orderbook["bids"], orderbook["asks"]
+        bid: Any = all_bids[0][0] if len(all_bids) > 0 else None
+        ask: Any = all_asks[0][0] if len(all_asks) > 0 else None
+        if not ask:
+            raise Exception("Ask price is None")
+        if not bid:
+            raise Exception("Bid price is None")
+
+        return float(bid), float(ask)
+
+    def quote_order(self: Self,
+                    balance: Mapping[str, Any],
+                    bid: float,
+                    ask: float) -> tuple[float, float, float, float]:
+        """
+        Prices and amounts of the next buy and sell orders (shared by the sync and async bots)
+
+        :param balance: ccxt balance (at least the pair's assets)
+        :param bid: best bid
+        :param ask: best ask
+        :return: (price_buy, price_sell, amount_buy, amount_sell)
+        """
+
+        base_asset_balance = balance[self.base_asset]["free"]
+        quote_asset_balance = balance[self.quote_asset]["free"]
+        self.user_output(f"\t[INFO]\t💰 {self.base_asset} balance: {base_asset_balance}")
+        self.user_output(f"\t[INFO]\t💵 {self.quote_asset} balance: {quote_asset_balance}")
         self.user_output(f"\t[INFO]\tBid ≈ {round(bid, 4)} {self.quote_asset}"
-              f", Ask ≈ {round(ask, 4)} {self.quote_asset}\n")
+                         f", Ask ≈ {round(ask, 4)} {self.quote_asset}\n")
 
         # Price is ALWAYS in quote asset (2nd item in trading pair `1st/2nd`)
         mean_price: float = (ask + bid) / 2
@@ -217,23 +442,97 @@ class TradingBot:
         :param open_orders:
         :return: bool, if the while cycle of orders should be skipped to the next iteration
         """
-        self.user_output("\t[INFO]\t🛑 There are open orders.")
+        if self.is_cancel_due():
+            results: dict[str, BaseException | None] = self.cancel_orders(
+                [order.get("id") for order in open_orders], is_all=True
+            )
+            self.output_cancel_results(results)
+            return True
+
+        return False
+
+    def is_cancel_due(self: Self) -> bool:
+        """
+        Count a cycle with open orders, they are cancelled every `cancel_order_limit` counted cycles
+
+        :return: bool, if open orders should be cancelled now
+        """
 
+        self.user_output("\t[INFO]\t🛑 There are open orders.")
         self.cancel_order_counter += 1
         self.user_output(f"\t[INFO]\t💪🏻 Current open orders counter:"
-              f" {self.cancel_order_counter}.")
+                         f" {self.cancel_order_counter}.")
 
         if self.cancel_order_counter == self.cancel_order_limit:
             self.cancel_order_counter = 0
-            for order in open_orders:
-                order_id_to_cancel: str = order.get("id")
-                self.exchange.cancel_order(id=order_id_to_cancel, symbol=self.symbol)
-                self.user_output(f"[ACTION DONE]\t☑️ Order"
-                      f" cancelled with id: {order_id_to_cancel}")
             return True
 
         return False
 
+    def bulk_cancel_endpoint(self: Self, is_all: bool) -> str | None:
+        """
+        Bulk cancel endpoint the exchange supports natively (emulated ones cancel one by one)
+
+        :param is_all: all open orders of the pair are cancelled
+        :return: `cancel_all_orders`, `cancel_orders` or None
+        """
+
+        has: Mapping[str, Any] = getattr(self.exchange, "has", None) or {}
+        if is_all and has.get("cancelAllOrders") is True:
+            return "cancel_all_orders"
+        if has.get("cancelOrders") is True:
+            return "cancel_orders"
+        return None
+
+    def cancel_orders(self: Self,
+                      order_ids: Collection[str],
+                      is_all: bool = False) -> dict[str, BaseException | None]:
+        """
+        Cancel orders of the pair in one request (`cancel_all_orders` / `cancel_orders`, where the exchange has them),
+        or with concurrent `cancel_order` requests
+
+        :param order_ids: ccxt order ids
+        :param is_all: `order_ids` are all open orders of the pair
+        :return: order id -> None if cancelled, else the error
+        """
+
+        if not order_ids:
+            return {}
+
+        endpoint: str | None = self.bulk_cancel_endpoint(is_all)
+        if endpoint is None:
+            futures: dict[str, Future] = {
+                order_id: self.CANCEL_EXECUTOR.submit(self.timed_call, "cancel_order", self.exchange.cancel_order,
+                                                      id=order_id, symbol=self.symbol)
+                for order_id in order_ids
+            }
+            return {order_id: future.exception() for order_id, future in futures.items()}
+
+        # `cancel_all_orders(symbol)` or `cancel_orders(ids, symbol)`, a failure is the same for every order
+        args: tuple[Any, ...] = (self.symbol,) if endpoint == "cancel_all_orders" else (list(order_ids), self.symbol)
+        try:
+            self.timed_call(endpoint, getattr(self.exchange, endpoint), *args)
+        except Exception as error:
+            return dict.fromkeys(order_ids, error)
+        return dict.fromkeys(order_ids)
+
+    def output_cancel_results(self: Self, results: Mapping[str, BaseException | None]) -> None:
+        """
+        Report cancels per order and update the account book (orders that failed to cancel stay in it)
+
+        :param results: order id -> None if cancelled, else the error
+        :return: None
+        """
+
+        for order_id, error in results.items():
+            if error is None:
+                self.account.record_cancel(order_id)
+                self.count("cancels")
+                self.user_output(f"[ACTION DONE]\t☑️ Order cancelled with id: {order_id}")
+            else:
+                self.count("cancel_failures")
+                self.user_output(f"\t[WARNING]\tCould not cancel order with id: {order_id}:\n\t\t{error}.\n")
+
     def run_if_not_open_orders(self: Self) -> bool:
         """
         Try to make new orders, if there aren't any.
@@ -243,94 +542,165 @@ class TradingBot:
         self.user_output("\t[INFO]\t🟢 No open orders.")
         self.cancel_order_counter = 0
 
-        data: Any = self.exchange.fetch_ohlcv(
-            self.symbol, self.timeframe, limit=self.data_vector_length)
+        data: Any = self.fetch_data()
         self.user_output("\t[INFO]\t📊 Got data: "
               f"({self.data_vector_length} x {self.timeframe}).")
 
         try:
             # Check if it is bullish up or bearish down before buying
-            prediction_main: Any = self.predict_up_or_down(data)
-            # prediction_support: Any = self.predict_up_or_down(data)
-            if prediction_main:
-                self.user_output("\t[AI]\t🤖 Got prediction.")
-
-            else:
-                self.user_output("\t[AI]\t🤖 Could not get prediction.")
-                self.retries_before_sleep_counter += 1
-                if self.retries_before_sleep_counter == self.retries_before_sleep_limit:
-                    self.retries_before_sleep_counter = 0
-                    self.self_sleep()
+            prediction_main: Any = self.timed_call("predict", self.predict_up_or_down, data,
+                                                   retry=False, is_failure=lambda prediction: not prediction)
+            side: Literal["buy", "sell", "hold"] | None = self.order_side(prediction_main)
+            if side is None:
+                self.self_sleep()
                 return True
 
-            # If bullish
-            if prediction_main == "up":
-                self.user_output(f"\t[AI]\t🤖 Is bullish on {self.base_asset}.")
-
-                price_buy, _, amount_buy, _ = self.prepare_order()
+            if side != "hold":
+                price_buy, price_sell, amount_buy, amount_sell = self.prepare_order()
                 if amount_buy is None:
                     return True
 
-                # Place a limit buy order
+                # Place a limit order
                 new_order: Mapping[str, Any] = self.order(
                     order_type="limit",
-                    buy_or_sell="buy",
-                    amount=amount_buy,
-                    price=price_buy
+                    buy_or_sell=side,
+                    amount=amount_buy if side == "buy" else amount_sell,
+                    price=price_buy if side == "buy" else price_sell
                 )
                 if new_order:
-                    self.user_output(f"\t[ORDER]\tBuy order id: {new_order.get("id")}")
+                    self.user_output(f"\t[ORDER]\t{side.capitalize()} order id: {new_order.get("id")}")
 
-            # If bearish
-            elif prediction_main == "down":
-                self.user_output(f"\t[AI]\t🤖 Is bearish on {self.base_asset}.")
+        except BaseException as error:
+            self.default_sleep_message(error, "ProbablyAIButCouldBeAnything")
+            self.self_sleep()
+            return True
 
-                _, price_sell, _, amount_sell = self.prepare_order()
-                if amount_sell is None:
-                    return True
+        return False
 
-                # Place a limit sell order
-                new_order: Mapping[str, Any] = self.order(
-                    order_type="limit",
-                    buy_or_sell="sell",
-                    amount=amount_sell,
-                    price=price_sell
-                )
+    def order_side(self: Self, prediction: Any) -> Literal["buy", "sell", "hold"] | None:
+        """
+        What to do on a prediction (shared by the sync and async bots)
 
-                if new_order:
-                    self.user_output(f"\t[ORDER]\tSell order id: {new_order.get("id")}")
+        :param prediction: "up", "down" or "hold" (anything else is a failed prediction)
+        :return: "buy", "sell", "hold" (no order), or None without a valid prediction
+        """
+
+        if not prediction:
+            self.user_output("\t[AI]\t🤖 Could not get prediction.")
+            return None
 
-            # If indecisive
-            elif prediction_main == "hold":
+        self.user_output("\t[AI]\t🤖 Got prediction.")
+        match prediction:
+            case "up":
+                self.user_output(f"\t[AI]\t🤖 Is bullish on {self.base_asset}.")
+                return "buy"
+            case "down":
+                self.user_output(f"\t[AI]\t🤖 Is bearish on {self.base_asset}.")
+                return "sell"
+            case "hold":
                 self.user_output(f"\t[AI]\t🤖 Is hold on {self.base_asset}.")
                 self.user_output("\t[INFO]\t😎 Doing nothing.")
+                return "hold"
 
-            else:
-                self.self_sleep()
-                return True
+        return None
 
-        except BaseException as error:
-            self.retries_before_sleep_counter += 1
-            if self.retries_before_sleep_counter == self.retries_before_sleep_limit:
-                self.retries_before_sleep_counter = 0
-                self.default_sleep_message(error, "ProbablyAIButCouldBeAnything")
-                self.self_sleep()
-            return True
+    def get_open_orders(self: Self) -> Collection[Any]:
+        """
+        Open orders of the pair, from the local book (fetched from the exchange only if the book is due)
 
-        return False
+        :return: ccxt orders
+        """
+
+        if self.account.orders_due():
+            self.account.reconcile_orders(
+                self.timed_call("fetch_open_orders", self.exchange.fetch_open_orders, self.symbol)
+            )
+        else:
+            self.count("requests_saved", request="fetch_open_orders")
+        return self.account.open_orders()
+
+    def get_balance(self: Self) -> Mapping[str, Any]:
+        """
+        Balances of the pair's assets, from the local book (fetched from the exchange only if the book is due)
+
+        :return: asset -> {`free`, `used`}
+        """
+
+        if self.account.balance_due():
+            self.account.reconcile_balance(self.timed_call("fetch_balance", self.exchange.fetch_balance))
+        else:
+            self.count("requests_saved", request="fetch_balance")
+        return self.account.balance
+
+    def timed_call(self: Self,
+                   stage: str,
+                   function: Callable[..., Any],
+                   *args: Any,
+                   retry: bool = True,
+                   is_failure: Callable[[Any], bool] | None = None,
+                   **kwargs: Any) -> Any:
+        """
+        Call a request of a stage through its circuit breaker (with retries), timed
+
+        :param stage: stage (and endpoint) name
+        :param function: request
+        :param retry: retry network errors with backoff
+        :param is_failure: marks a returned result as failure
+        :return: result of the request
+        """
+
+        with self.timed(stage):
+            return self.resilience.call(stage, function, *args, retry=retry, is_failure=is_failure, **kwargs)
+
+    def timed(self: Self, stage: str) -> ContextManager[None]:
+        """
+        Time a stage of the cycle for this pair
+
+        :param stage: stage name (e.g. `fetch_ohlcv`)
+        :return: context manager
+        """
+
+        return self.metrics.timer(stage, pair=self.symbol)
+
+    @contextmanager
+    def timed_cycle(self: Self) -> Iterator[None]:
+        """
+        Time the work of a cycle for this pair as `cycle` (backoff pauses taken inside it are left out)
+
+        :return: context manager
+        """
+
+        started: float = perf_counter()
+        slept_before: float = self.slept_seconds
+        try:
+            yield
+        finally:
+            elapsed: float = perf_counter() - started - (self.slept_seconds - slept_before)
+            self.metrics.observe("cycle", elapsed, pair=self.symbol)
+
+    def count(self: Self, name: str, amount: float = 1.0, **labels: str) -> None:
+        """
+        Increase a counter (e.g. `retries`, `sleeps`) for this pair
+
+        :param name: counter name
+        :param amount: increment
+        :param labels: extra labels
+        :return: None
+        """
+
+        self.metrics.increment(name, amount, pair=self.symbol, **labels)
+
+    def output_metrics(self: Self) -> None:
+        # Only this pair's rows: metrics are shared by all bots of the process, each bot outputs its own
+        self.metrics_output(self.metrics.summary(pair=self.symbol))
 
     def get_memory(self: Self) -> tuple[int, int]:
-        current, peak = tracemalloc.get_traced_memory()
-        return current // self.SQ_1024, peak // self.SQ_1024
+        return self.memory_monitor.get_memory()
 
-    def output_memory_monitor(
-            self: Self,
-            max_memory: int | float = DEFAULT_MAX_RAM
-    ) -> None:
-        current, peak = self.get_memory()
-        is_maxed: str = " (peaked over MAX, restart recommended)" if peak > max_memory else ""
-        msg = f"\t[TRCM]\t🚦 Current memory usage: {current} MB, peak usage: {peak} MB{is_maxed}"
-        self.memory_output(msg)
+    def output_memory_monitor(self: Self) -> None:
+        msg: str | None = self.memory_monitor.sample()
+        if msg:
+            self.memory_output(msg)
 
     def main(self: Self, infinite_loop_condition: bool) -> None:
         """
@@ -352,6 +722,8 @@ class TradingBot:
 
         while infinite_loop_condition:
             self.output_memory_monitor()
+            self.output_metrics()
+            self.refresh_markets()
 
             try:
                 # Market Data Print
@@ -359,51 +731,104 @@ class TradingBot:
                 self.user_output(f"\n\t[INFO]\t⌚️ Current time:"
                       f" {current_time.strftime('%B %d, %Y %I:%M:%S %p')}")
 
-                # Check if there are any open orders
-                self.user_output("\t[INFO]\t👀 Checking for open orders for trading pair")
-                open_orders: Collection[Any] = self.exchange.fetch_open_orders(self.symbol)
-                if not open_orders:
-                    do_cycle_continue: bool = self.run_if_not_open_orders()
-                    if do_cycle_continue:
-                        continue
+                with self.timed_cycle():
+                    self.has_open_orders = None
+                    is_candle_closed: bool = self.scheduler.start_cycle() if self.scheduler else True
 
-                else:
-                    do_cycle_continue: bool = self.run_if_open_orders(open_orders=open_orders)
+                    # Check if there are any open orders
+                    self.user_output("\t[INFO]\t👀 Checking for open orders for trading pair")
+                    open_orders: Collection[Any] = self.get_open_orders()
+                    self.has_open_orders = bool(open_orders)
+                    if not open_orders:
+                        do_cycle_continue: bool = self.run_if_not_open_orders()
 
-                    if do_cycle_continue:
-                        continue
+                    elif is_candle_closed:
+                        do_cycle_continue: bool = self.run_if_open_orders(open_orders=open_orders)
 
-                self.self_sleep()
+                    # Polls between candle closes only look for fills
+                    else:
+                        do_cycle_continue: bool = False
+
+                if do_cycle_continue:
+                    continue
+
+                self.wait_for_next_cycle()
 
             except KeyboardInterrupt:
                 self.user_output("[END]\tEND `main` module on KeyboardInterrupt.")
                 break
 
             except ccxt.NetworkError as error:
+                self.count("cycle_errors", error="network")
                 self.default_sleep_message(error, "NetworkError")
                 self.self_sleep()
                 continue
 
             except ccxt.ExchangeError as error:
+                self.count("cycle_errors", error="exchange")
                 self.default_sleep_message(error, "ExchangeError")
                 self.self_sleep()
                 continue
 
             except Exception as error:
+                self.count("cycle_errors", error="other")
                 self.default_sleep_message(error, "Some other")
                 self.self_sleep()
                 continue
 
         self.user_output("[END]\t👋🏻 END `main` module.")
 
+    def next_cycle_delay(self: Self) -> float:
+        """
+        Seconds until the next cycle: the next candle close or open orders poll
+        (`BASE_SLEEP_TIME` in `fixed` schedule, a backoff if the last cycle failed)
+
+        :return: seconds
+        """
+
+        if self.has_open_orders is None:
+            return self.backoff_delay()
+
+        self.consecutive_failures = 0
+        if self.scheduler is None:
+            return self.base_sleep_time
+
+        return self.scheduler.delay(self.has_open_orders)
+
+    def backoff_delay(self: Self) -> float:
+        """
+        Pause after a failure: exponential backoff with jitter, growing with failures in a row
+        (milliseconds after a blip, at most `BASE_SLEEP_TIME`)
+
+        :return: seconds
+        """
+
+        delay: float = self.resilience.backoff.delay(self.consecutive_failures)
+        self.consecutive_failures += 1
+        return delay
+
+    def wait_for_next_cycle(self: Self) -> None:
+        """
+        Invoke time.sleep until the next cycle is due.
+
+        :return: None
+        """
+
+        delay: float = self.next_cycle_delay()
+        self.user_output(f"\t[INFO]\t🙈 Pause for {round(delay, 1)} seconds.")
+        sleep(delay)
+
     def self_sleep(self: Self) -> None:
         """
-        Invoke time.sleep with needed extra logic.
+        Invoke time.sleep after a failure (see `backoff_delay`).
 
         :return: None
         """
-        self.user_output(f"\t[INFO]\t🙈 Pause for {self.base_sleep_time} seconds.")
-        sleep(self.base_sleep_time)
+        delay: float = self.backoff_delay()
+        self.count("sleeps")
+        self.user_output(f"\t[INFO]\t🙈 Pause for {round(delay, 3)} seconds.")
+        sleep(delay)
+        self.slept_seconds += delay
 
     def default_sleep_message(self: Self, error: Any, tag: str) -> None:
         """
@@ -413,5 +838,5 @@ class TradingBot:
         :param tag: str
         :return: None
         """
-        self.user_output(f"\t[ERROR]\t🙈 Retrying after sleep ({self.base_sleep_time} seconds). "
+        self.user_output(f"\t[ERROR]\t🙈 Retrying after backoff. "
               f"{tag} exception:\n\t\t{error}.\n")
\ No newline at end of file